@@ -1,5 +1,12 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from backend.config import (
+    CLAIMS_DELTA_REFRESH_INTERVAL,
+    DB_WRITER_ENABLED,
+    SHARED_CLAIMS_DIR,
+    WRITE_BEHIND_ENABLED,
+)
 from backend.routes import claims, analytics, data
 from backend.services.data_service import DataService
 
@@ -20,8 +27,33 @@ app.include_router(data.router, prefix="/api/data", tags=["data"])
 @app.on_event("startup")
 async def startup_event():
     print("Starting ClaimsIQ API...")
+    if DB_WRITER_ENABLED:
+        DataService.start_db_writer()
+    if WRITE_BEHIND_ENABLED:
+        # Replays journaled updates before the cache reads the table
+        replayed = DataService.start_write_behind()
+        print(f"Write-behind enabled ({replayed} journaled claim updates replayed)")
+    if SHARED_CLAIMS_DIR:
+        DataService.start_shared_store(SHARED_CLAIMS_DIR)
     DataService.refresh_cache()
     print("Data cache loaded successfully")
+    app.state.risk_aging_task = asyncio.create_task(DataService.run_risk_aging_schedule())
+    if SHARED_CLAIMS_DIR:
+        app.state.shared_store_task = asyncio.create_task(DataService.run_shared_store_watch())
+    elif CLAIMS_DELTA_REFRESH_INTERVAL > 0:
+        app.state.delta_refresh_task = asyncio.create_task(DataService.run_delta_refresh_schedule())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task_name in ("risk_aging_task", "shared_store_task", "delta_refresh_task"):
+        task = getattr(app.state, task_name, None)
+        if task is not None:
+            task.cancel()
+    # Write-behind flushes through the writer thread, so stop it first
+    DataService.stop_write_behind()
+    DataService.stop_db_writer()
+    # Only writes a file if no write reached the table since the claims were read
+    DataService.save_snapshot_file()
 
 @app.get("/")
 async def root():
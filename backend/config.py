@@ -7,3 +7,54 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///claimsiq.db")
 API_PORT = int(os.getenv("API_PORT", 8000))
 API_HOST = os.getenv("API_HOST", "localhost")
 DEBUG = os.getenv("DEBUG", "False") == "True"
+RISK_RULES_PATH = os.getenv(
+    "RISK_RULES_PATH",
+    os.path.join(os.path.dirname(__file__), "risk_rules.json"),
+)
+
+# Connection pool for the shared database engine (see backend/database.py)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+# Negative values are KiB, so -65536 is a 64 MiB page cache per connection
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -65536))
+
+# Optional write-behind persistence for claim updates (see backend/services/write_behind.py)
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "False") == "True"
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", 0.25))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", 500))
+WRITE_BEHIND_JOURNAL_PATH = os.getenv("WRITE_BEHIND_JOURNAL_PATH", "claimsiq_writes.journal")
+# Failed flushes after which an update is moved to the journal's dead-letter file
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", 5))
+
+# Optional single writer thread for all database writes (see backend/services/db_writer.py)
+DB_WRITER_ENABLED = os.getenv("DB_WRITER_ENABLED", "False") == "True"
+DB_WRITER_MAX_BATCH = int(os.getenv("DB_WRITER_MAX_BATCH", 64))
+
+# Streaming claims load: rows fetched per chunk, and the peak memory the load
+# aims to stay under (0 disables the budget)
+CLAIMS_LOAD_CHUNK_ROWS = int(os.getenv("CLAIMS_LOAD_CHUNK_ROWS", 50_000))
+CLAIMS_LOAD_MEMORY_BUDGET_MB = int(os.getenv("CLAIMS_LOAD_MEMORY_BUDGET_MB", 0))
+
+# Optional on-disk copy of the typed claims cache for fast warm starts; enabling
+# it adds the change_seq column and its triggers to the claims table if missing
+# (see backend/services/snapshot_file.py)
+CLAIMS_SNAPSHOT_ENABLED = os.getenv("CLAIMS_SNAPSHOT_ENABLED", "False") == "True"
+CLAIMS_SNAPSHOT_PATH = os.getenv("CLAIMS_SNAPSHOT_PATH", "claimsiq_claims.snapshot")
+
+# Optional claims snapshot shared by all API worker processes on one host
+# (see backend/services/shared_store.py); empty disables it
+SHARED_CLAIMS_DIR = os.getenv("SHARED_CLAIMS_DIR", "")
+SHARED_CLAIMS_POLL_INTERVAL = float(os.getenv("SHARED_CLAIMS_POLL_INTERVAL", 2.0))
+# Changed rows workers fold in as deltas before the table is re-read into a new shared version
+SHARED_CLAIMS_MAX_DELTA_ROWS = int(os.getenv("SHARED_CLAIMS_MAX_DELTA_ROWS", 10_000))
+
+# Seconds between incremental refreshes of the claims cache from rows whose
+# change_seq moved past the last watermark; 0 disables. Enabling it adds the
+# change_seq column and its triggers to the claims table if missing.
+CLAIMS_DELTA_REFRESH_INTERVAL = float(os.getenv("CLAIMS_DELTA_REFRESH_INTERVAL", 0))
+# change_seq numbers below the watermark each delta refresh re-reads on
+# PostgreSQL, where a number is taken before its transaction commits
+CLAIMS_DELTA_LOOKBACK = int(os.getenv("CLAIMS_DELTA_LOOKBACK", 1_000))
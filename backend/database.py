@@ -0,0 +1,167 @@
+"""
+Shared SQLAlchemy engines for ClaimsIQ.
+
+Every database caller goes through get_engine(), so the process holds one
+engine and one connection pool per URL instead of building a new pool per
+query. SQLite connections get WAL journaling and larger caches when they are
+opened, and pool checkouts are counted for the metrics endpoint.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+from backend.config import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    SQLITE_CACHE_SIZE,
+    SQLITE_MMAP_SIZE,
+)
+
+
+class PoolMetrics:
+    """Connection pool counters for one engine."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.total_hold_seconds = 0.0
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        started = connection_record.info.pop("checked_out_at", None)
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(self.checked_out - 1, 0)
+            if started is not None:
+                self.total_hold_seconds += time.perf_counter() - started
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "avg_hold_ms": (
+                    round(self.total_hold_seconds / self.checkins * 1000, 3) if self.checkins else 0.0
+                ),
+            }
+
+
+_engines: Dict[str, Engine] = {}
+_metrics: Dict[str, PoolMetrics] = {}
+_lock = threading.Lock()
+
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    """Return the process-wide engine for a database URL (DATABASE_URL by default)."""
+    url = url or DATABASE_URL
+    engine = _engines.get(url)
+    if engine is not None:
+        return engine
+
+    with _lock:
+        engine = _engines.get(url)
+        if engine is None:
+            engine = _create_engine(url)
+            _engines[url] = engine
+        return engine
+
+
+def pool_metrics(url: Optional[str] = None) -> Dict[str, Any]:
+    """Checkout counters and current pool state for an engine."""
+    url = url or DATABASE_URL
+    engine = _engines.get(url)
+    metrics = _metrics.get(url)
+    if engine is None or metrics is None:
+        return {"url": _display_url(url), "initialized": False}
+
+    report: Dict[str, Any] = {
+        "url": _display_url(url),
+        "initialized": True,
+        "pool": type(engine.pool).__name__,
+        **metrics.snapshot(),
+    }
+    if isinstance(engine.pool, QueuePool):
+        report.update(
+            pool_size=engine.pool.size(),
+            idle=engine.pool.checkedin(),
+            overflow=engine.pool.overflow(),
+        )
+    return report
+
+
+def dispose_engines() -> None:
+    """Close every pooled connection and forget the engines."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _metrics.clear()
+
+
+def _create_engine(url: str) -> Engine:
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    in_memory = is_sqlite and parsed.database in (None, "", ":memory:")
+
+    options: Dict[str, Any] = {"pool_pre_ping": not is_sqlite}
+    if not in_memory:
+        # In-memory SQLite keeps its single shared connection
+        options.update(
+            poolclass=QueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    if is_sqlite:
+        options["connect_args"] = {"check_same_thread": False}
+
+    engine = create_engine(url, **options)
+    metrics = PoolMetrics()
+    event.listen(engine, "connect", metrics.on_connect)
+    event.listen(engine, "checkout", metrics.on_checkout)
+    event.listen(engine, "checkin", metrics.on_checkin)
+    if is_sqlite:
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+    _metrics[url] = metrics
+    return engine
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size={int(SQLITE_CACHE_SIZE)}")
+    finally:
+        cursor.close()
+
+
+def _display_url(url: str) -> str:
+    return make_url(url).render_as_string(hide_password=True)
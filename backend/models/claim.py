@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Date, DateTime
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -16,6 +16,9 @@ class Claim(Base):
     provider_id = Column(String)
     procedure_codes = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Set by database triggers on every insert/update; the cache's delta refresh
+    # reads rows past its watermark
+    change_seq = Column(Integer, index=True)
 
 class Provider(Base):
     __tablename__ = "providers"
@@ -39,11 +39,13 @@ class ClaimsListResponse(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 class RiskAnalysisResponse(BaseModel):
     high_risk_count: int
     distribution: dict
     top_risks: List[ClaimResponse]
+    next_cursor: Optional[str] = None
 
 class ProviderMetrics(BaseModel):
     provider_id: str
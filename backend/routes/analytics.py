@@ -1,16 +1,89 @@
-from fastapi import APIRouter
+import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+from typing import List, Optional
 from backend.services.analytics_service import AnalyticsService
 from backend.models.schema import RiskAnalysisResponse
 
 router = APIRouter()
 
 @router.get("/analytics/risks")
-async def get_risk_analysis():
+async def get_risk_analysis(
+    limit: int = Query(10, ge=1, le=500),
+    after: Optional[str] = Query(None)
+):
     distribution = AnalyticsService.get_risk_distribution()
-    high_risk_claims = AnalyticsService.get_high_risk_claims(limit=10)
+    try:
+        high_risk_claims, next_cursor = AnalyticsService.get_high_risk_page(limit=limit, after=after)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     
     return {
         "high_risk_count": distribution["high"],
         "distribution": distribution,
-        "top_risks": high_risk_claims
+        "top_risks": high_risk_claims,
+        "next_cursor": next_cursor
     }
+
+
+@router.get("/analytics/risks/histogram")
+async def get_risk_histogram(
+    edges: str = Query("0,0.1,0.2,0.3,0.4,0.5,0.6,0.7,0.8,0.9,1.0", description="Comma-separated, increasing bucket edges")
+):
+    try:
+        return AnalyticsService.get_risk_histogram([float(edge) for edge in edges.split(",") if edge.strip()])
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/analytics/risks/simulate")
+async def simulate_risk_thresholds(
+    threshold: Optional[float] = Query(None, ge=0),
+    medium: float = Query(0.4, ge=0),
+    high: float = Query(0.7, ge=0),
+    group_by: Optional[str] = Query(None, description="Break results down by 'status' or 'provider'")
+):
+    try:
+        return AnalyticsService.simulate_risk_thresholds(
+            threshold=threshold,
+            medium=medium,
+            high=high,
+            group_by=group_by
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post("/analytics/score")
+async def score_claims(request: Request):
+    """
+    Score claims that have not been persisted yet.
+
+    Accepts a JSON array of claim objects, or NDJSON (one claim per line)
+    when sent with an application/x-ndjson content type.
+    """
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            claims = await _read_ndjson(request)
+        else:
+            claims = json.loads(await request.body())
+            if isinstance(claims, dict) and isinstance(claims.get("claims"), list):
+                claims = claims["claims"]
+            if not isinstance(claims, list):
+                raise ValueError("Expected a JSON array of claims")
+        # Results are plain JSON types already; skip the generic encoder
+        return JSONResponse(AnalyticsService.score_batch(claims))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+async def _read_ndjson(request: Request) -> List[dict]:
+    claims: List[dict] = []
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        claims.extend(json.loads(line) for line in lines if line.strip())
+    if buffer.strip():
+        claims.append(json.loads(buffer))
+    return claims
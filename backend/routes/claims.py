@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Query, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, Query, HTTPException
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, validator
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from backend.services.claims_service import ClaimsService
 from backend.models.schema import SummaryResponse, ClaimsListResponse
 
@@ -24,25 +26,76 @@ class UpdateClaimNotesRequest(BaseModel):
     note: Optional[str] = None
 
 
+def _split_list(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()] or None
+
+
 @router.get("/claims/summary", response_model=SummaryResponse)
 async def get_summary():
     return ClaimsService.get_summary()
 
-@router.get("/claims", response_model=ClaimsListResponse)
-async def get_claims(
+def claim_filter_params(
     status: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
+    reasons: Optional[str] = Query(None, description="Comma-separated risk rule ids; matches claims that fired any of them"),
+    time_range: Optional[str] = Query(None, description="Preset window back from today, e.g. 7d, 30d, 90d, 1y or all"),
+    date_start: Optional[str] = Query(None, description="Alias of start_date"),
+    date_end: Optional[str] = Query(None, description="Alias of end_date"),
+    amount_min: Optional[float] = Query(None),
+    amount_max: Optional[float] = Query(None),
+    risk_levels: Optional[str] = Query(None, description="Comma-separated risk bands: low, medium, high"),
+    provider_id: Optional[str] = Query(None),
+    diagnosis_code: Optional[str] = Query(None),
+    patient_state: Optional[str] = Query(None),
+    search: Optional[str] = Query(None, description="Case-insensitive text matched against id, patient, provider, status and diagnosis")
+) -> Dict[str, Any]:
+    """Filter query parameters shared by the claim list and facet endpoints."""
+    return {
+        "status": status,
+        "start_date": start_date or date_start,
+        "end_date": end_date or date_end,
+        "reasons": _split_list(reasons),
+        "time_range": time_range,
+        "amount_min": amount_min,
+        "amount_max": amount_max,
+        "risk_levels": _split_list(risk_levels),
+        "provider_id": provider_id,
+        "diagnosis_code": diagnosis_code,
+        "patient_state": patient_state,
+        "search": search,
+    }
+
+@router.get("/claims", response_model=ClaimsListResponse)
+async def get_claims(
+    filters: Dict[str, Any] = Depends(claim_filter_params),
     limit: int = Query(100),
-    offset: int = Query(0)
+    offset: int = Query(0),
+    sort: Optional[str] = Query(None, description="Column to sort by: id, claim_date, claim_amount, risk_score, status or provider_id"),
+    direction: str = Query("asc", description="asc or desc"),
+    after: Optional[str] = Query(None, description="next_cursor of the previous page (needs the same sort and direction)")
 ):
-    return ClaimsService.filter_claims(
-        status=status,
-        start_date=start_date,
-        end_date=end_date,
-        limit=limit,
-        offset=offset
-    )
+    try:
+        return ClaimsService.filter_claims(
+            limit=limit,
+            offset=offset,
+            sort=sort,
+            direction=direction,
+            after=after,
+            **filters
+        )
+    except ClaimsService.InvalidFilterError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@router.get("/claims/facets")
+async def get_claim_facets(filters: Dict[str, Any] = Depends(claim_filter_params)):
+    """Claim counts per status, provider, diagnosis, state... among the filtered claims."""
+    try:
+        return ClaimsService.get_claim_facets(**filters)
+    except ClaimsService.InvalidFilterError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 @router.get("/providers")
 async def get_providers():
@@ -52,11 +105,17 @@ async def get_providers():
 @router.put("/claims/{claim_id}/status")
 async def update_claim_status(claim_id: str, payload: UpdateClaimStatusRequest):
     try:
-        updated_claim, quick_stats = ClaimsService.update_claim_status(
+        claim_row, updates, pending = await run_in_threadpool(
+            ClaimsService.submit_status_update,
             claim_id=claim_id,
             status=payload.status,
             reason=payload.reason,
         )
+        # Await the commit on the event loop instead of parking a threadpool worker on it
+        updated_rows = await asyncio.wrap_future(pending)
+        updated_claim, quick_stats = await run_in_threadpool(
+            ClaimsService.complete_status_update, claim_id, claim_row, updates, updated_rows
+        )
         return {
             "success": True,
             "claim": updated_claim,
@@ -73,7 +132,11 @@ async def update_claim_status(claim_id: str, payload: UpdateClaimStatusRequest):
 @router.put("/claims/{claim_id}/notes")
 async def update_claim_notes(claim_id: str, payload: UpdateClaimNotesRequest):
     try:
-        updated_claim = ClaimsService.update_claim_notes(claim_id, payload.note)
+        updates, pending = await run_in_threadpool(ClaimsService.submit_notes_update, claim_id, payload.note)
+        updated_rows = await asyncio.wrap_future(pending)
+        updated_claim = await run_in_threadpool(
+            ClaimsService.complete_notes_update, claim_id, updates, updated_rows
+        )
         return {"success": True, "claim": updated_claim}
     except ClaimsService.NotFoundError as exc:
         raise HTTPException(status_code=404, detail=str(exc))
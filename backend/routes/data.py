@@ -9,6 +9,7 @@ from pydantic import BaseModel
 import sys
 import os
 
+from backend.database import pool_metrics
 from backend.services.data_service import DataService
 
 # Add scripts directory to path so we can import load_sample_data
@@ -128,23 +129,18 @@ async def clear_database():
 
     WARNING: This will delete all data!
     """
-    from sqlalchemy import create_engine, text
+    from sqlalchemy import text
 
-    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///claimsiq.db")
+    def delete_all(conn):
+        # Delete all claims
+        claims_deleted = conn.execute(text("DELETE FROM claims")).rowcount
 
-    try:
-        engine = create_engine(DATABASE_URL)
-
-        with engine.connect() as conn:
-            # Delete all claims
-            result_claims = conn.execute(text("DELETE FROM claims"))
-            claims_deleted = result_claims.rowcount
-
-            # Delete all providers
-            result_providers = conn.execute(text("DELETE FROM providers"))
-            providers_deleted = result_providers.rowcount
+        # Delete all providers
+        providers_deleted = conn.execute(text("DELETE FROM providers")).rowcount
+        return claims_deleted, providers_deleted
 
-            conn.commit()
+    try:
+        claims_deleted, providers_deleted = DataService.run_write(delete_all)
 
         DataService.refresh_cache()
 
@@ -160,3 +156,31 @@ async def clear_database():
             status_code=500,
             detail=f"Error clearing database: {str(e)}"
         )
+
+
+@router.get("/pool-metrics")
+async def get_pool_metrics():
+    """
+    Connection pool usage for the shared database engine.
+
+    Reports checkouts, connections currently in use and the peak since startup.
+    """
+    return pool_metrics()
+
+
+@router.get("/write-metrics")
+async def get_write_metrics():
+    """
+    Queue depth and latency of the write-behind queue and the writer thread.
+
+    Each section reports {"enabled": false} when that feature is off.
+    """
+    return DataService.get_write_metrics()
+
+
+@router.get("/load-progress")
+async def get_load_progress():
+    """
+    Progress of the streaming claims load: rows loaded, total and peak memory estimate.
+    """
+    return DataService.get_load_progress() or {"rows_loaded": 0, "total_rows": 0, "chunks": 0, "done": False}
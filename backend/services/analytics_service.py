@@ -1,97 +1,250 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from backend.services.data_service import DataService
+from backend.services.pagination import decode_cursor, encode_cursor
+from backend.services.claim_indexes import SortedScoreIndex
+from backend.services.risk_rules import (
+    HIGH_RISK_THRESHOLD,
+    MEDIUM_RISK_THRESHOLD,
+    RISK_BANDS,
+    RiskRuleEngine,
+    risk_band_codes,
+)
+
+
+MAX_HISTOGRAM_EDGES = 1001
+MAX_SCORING_BATCH = 100_000
+HISTOGRAM_CACHE_SIZE = 64
+
 
 class AnalyticsService:
+    _score_levels: Optional[Tuple[int, np.ndarray]] = None
+    _histogram_cache: "OrderedDict[Tuple[int, Tuple[float, ...]], Dict]" = OrderedDict()
     
     @staticmethod
     def calculate_risk_score(claim: dict) -> float:
-        score = 0.0
-        amount = claim.get('claim_amount', 0)
-
-        # High amount claims (scaled risk)
-        if amount > 10000:
-            score += 0.4
-        elif amount > 5000:
-            score += 0.3
-        elif amount > 2000:
-            score += 0.1
-
-        # Check if claim is pending
-        if claim.get('status') == 'pending':
-            score += 0.2
-
-        # Check if flagged
-        if claim.get('status') == 'flagged':
-            score += 0.3
-
-        # Days pending (if claim date exists)
-        if claim.get('claim_date'):
-            try:
-                if isinstance(claim['claim_date'], str):
-                    claim_date = pd.to_datetime(claim['claim_date'])
-                else:
-                    claim_date = claim['claim_date']
-                days_pending = (datetime.now() - claim_date).days
-                if days_pending > 30:
-                    score += 0.3
-                elif days_pending > 14:
-                    score += 0.15
-            except:
-                pass
-
-        # Unknown provider check
-        providers_df = DataService.get_providers()
-        if not providers_df.empty and claim.get('provider_id'):
-            if claim['provider_id'] not in providers_df['id'].values:
-                score += 0.2
-
-        return round(min(score, 1.0), 2)
-    
+        score, _ = AnalyticsService.evaluate_claim(claim)
+        return score
+
+    @staticmethod
+    def evaluate_claim(claim: dict) -> Tuple[float, int]:
+        """Score a single claim, returning (score, rule-hit bitmask)."""
+        scores, hits = AnalyticsService.evaluate_claims(pd.DataFrame([claim]))
+        return float(scores[0]), int(hits[0])
+
+    @staticmethod
+    def score_claims(claims_df: pd.DataFrame, now: Optional[datetime] = None) -> np.ndarray:
+        """Vectorized risk scores for a whole claims frame."""
+        scores, _ = AnalyticsService.evaluate_claims(claims_df, now=now)
+        return scores
+
+    @staticmethod
+    def evaluate_claims(claims_df: pd.DataFrame, now: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Run the current risk rules over a claims frame in one vectorized pass.
+
+        Returns (scores, hits), where hits is a per-claim bitmask of fired rules.
+        """
+        ruleset = RiskRuleEngine.get_ruleset()
+        return ruleset.evaluate(claims_df, now or datetime.now(), DataService.risk_references())
+
+    @staticmethod
+    def score_batch(claims: List[dict]) -> Dict:
+        """Score unsaved claim records with the live rules in one vectorized pass."""
+        if len(claims) > MAX_SCORING_BATCH:
+            raise ValueError(f"At most {MAX_SCORING_BATCH} claims can be scored per request")
+        if not all(isinstance(claim, dict) for claim in claims):
+            raise ValueError("Each claim must be a JSON object")
+
+        ruleset = RiskRuleEngine.get_ruleset()
+        claims_df = pd.DataFrame.from_records(claims) if claims else pd.DataFrame()
+        scores, hits = ruleset.evaluate(claims_df, datetime.now(), DataService.risk_references())
+        bands = risk_band_codes(scores)
+
+        # Few distinct rule combinations occur in practice; decode each once
+        decoded: Dict[int, Tuple[List[str], List[str]]] = {}
+        for mask in np.unique(hits).tolist():
+            decoded[mask] = (ruleset.rule_ids_for(mask), ruleset.labels_for(mask))
+
+        ids = claims_df["id"].tolist() if "id" in claims_df.columns else [None] * len(claims)
+        results = [
+            {
+                "id": None if pd.isna(claim_id) else claim_id,
+                "risk_score": score,
+                "risk_level": RISK_BANDS[band],
+                "rule_hits": decoded[mask][0],
+                "reasons": decoded[mask][1],
+            }
+            for claim_id, score, band, mask in zip(ids, scores.tolist(), bands.tolist(), hits.tolist())
+        ]
+        return {"count": len(results), "rules_version": ruleset.version, "results": results}
+
+    @staticmethod
+    def explain_risk(claim: dict, hits: Optional[int] = None) -> List[str]:
+        """Reason labels for the rules a claim triggers."""
+        if hits is None:
+            _, hits = AnalyticsService.evaluate_claim(claim)
+        return RiskRuleEngine.get_ruleset().labels_for(int(hits))
+
+    @staticmethod
+    def reason_mask(rule_ids: List[str]) -> int:
+        """Bitmask for filtering the cached _risk_hits column by rule ids."""
+        return RiskRuleEngine.get_ruleset().bits_for(rule_ids)
+
     @staticmethod
     def get_risk_distribution():
-        claims_df = DataService.get_claims()
-        
-        if claims_df.empty:
-            return {"low": 0, "medium": 0, "high": 0}
-        
-        claims_with_risk = claims_df.copy()
-        claims_with_risk['risk_score'] = claims_with_risk.apply(
-            lambda row: AnalyticsService.calculate_risk_score(row.to_dict()), 
-            axis=1
-        )
-        
-        low = len(claims_with_risk[claims_with_risk['risk_score'] < 0.4])
-        medium = len(claims_with_risk[(claims_with_risk['risk_score'] >= 0.4) & (claims_with_risk['risk_score'] < 0.7)])
-        high = len(claims_with_risk[claims_with_risk['risk_score'] >= 0.7])
-        
-        return {"low": low, "medium": medium, "high": high}
+        return DataService.get_risk_band_counts()
     
     @staticmethod
-    def get_high_risk_claims(limit: int = 10):
-        claims_df = DataService.get_claims()
-        
+    def get_risk_histogram(edges: List[float]) -> Dict:
+        """Count claims per caller-supplied score bucket.
+
+        Buckets are [edges[i], edges[i+1]) with the last one closed on the
+        right. Scores are multiples of 0.01, so the per-version work is one
+        bincount over hundredths; each histogram then only bins those levels.
+        Results are cached per data version.
+        """
+        edges = [float(edge) for edge in edges]
+        if len(edges) < 2 or len(edges) > MAX_HISTOGRAM_EDGES:
+            raise ValueError(f"Provide between 2 and {MAX_HISTOGRAM_EDGES} bucket edges")
+        if any(not np.isfinite(edge) for edge in edges) or any(b <= a for a, b in zip(edges, edges[1:])):
+            raise ValueError("Bucket edges must be finite and strictly increasing")
+
+        snapshot = DataService.get_snapshot()
+        claims_df = snapshot.claims
         if claims_df.empty:
-            return []
-        
-        claims_with_risk = claims_df.copy()
-        claims_with_risk['risk_score'] = claims_with_risk.apply(
-            lambda row: AnalyticsService.calculate_risk_score(row.to_dict()), 
-            axis=1
-        )
-        
-        high_risk = claims_with_risk[claims_with_risk['risk_score'] >= 0.7]
-        high_risk_sorted = high_risk.sort_values('risk_score', ascending=False).head(limit)
-
-        records = []
-        for _, row in high_risk_sorted.iterrows():
-            clean_row = {}
-            for key, value in row.to_dict().items():
-                if pd.isna(value):
-                    clean_row[key] = None
-                else:
-                    clean_row[key] = value
-            if clean_row.get("risk_score") is not None:
-                clean_row["risk_score"] = round(float(clean_row["risk_score"]), 2)
-            records.append(clean_row)
+            return {"edges": edges, "counts": [0] * (len(edges) - 1), "below": 0, "above": 0, "total": 0}
+
+        version = snapshot.version
+        key = (version, tuple(edges))
+        cache = AnalyticsService._histogram_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        level_counts = AnalyticsService._score_level_counts(claims_df, version)
+        levels = np.arange(len(level_counts)) / 100
+
+        bucket = np.digitize(levels, edges)
+        bucket[levels == edges[-1]] = len(edges) - 1
+        binned = np.bincount(bucket, weights=level_counts, minlength=len(edges) + 1).astype(np.int64)
+
+        result = {
+            "edges": edges,
+            "counts": binned[1:len(edges)].tolist(),
+            "below": int(binned[0]),
+            "above": int(binned[len(edges)]),
+            "total": int(level_counts.sum()),
+        }
+        cache[key] = result
+        while len(cache) > HISTOGRAM_CACHE_SIZE:
+            cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def simulate_risk_thresholds(
+        threshold: Optional[float] = None,
+        medium: float = MEDIUM_RISK_THRESHOLD,
+        high: float = HIGH_RISK_THRESHOLD,
+        group_by: Optional[str] = None,
+    ) -> Dict:
+        """Answer what-if cutoff questions with binary searches over sorted scores.
+
+        Reports how many claims would be at or above ``threshold`` and how the
+        low/medium/high bands would split with the given edges, optionally
+        broken down by status or provider.
+        """
+        if medium > high:
+            raise ValueError("medium cutoff must not exceed the high cutoff")
+        group_columns = {"status": "status", "provider": "provider_id"}
+        if group_by is not None and group_by not in group_columns:
+            raise ValueError(f"group_by must be one of {sorted(group_columns)}")
+
+        def summarize(sorted_scores: np.ndarray) -> Dict:
+            total = len(sorted_scores)
+            medium_up = SortedScoreIndex.count_at_least(sorted_scores, medium)
+            high_up = SortedScoreIndex.count_at_least(sorted_scores, high)
+            summary = {
+                "total": total,
+                "bands": {"low": total - medium_up, "medium": medium_up - high_up, "high": high_up},
+            }
+            if threshold is not None:
+                summary["at_or_above"] = SortedScoreIndex.count_at_least(sorted_scores, threshold)
+            return summary
+
+        score_index = DataService.get_score_index()
+        sorted_scores = score_index.scores if score_index is not None else np.zeros(0)
+        result = {"threshold": threshold, "medium": medium, "high": high, **summarize(sorted_scores)}
+        if group_by is not None:
+            groups = score_index.groups[group_columns[group_by]] if score_index is not None else {}
+            result["breakdown"] = {str(key): summarize(scores) for key, scores in groups.items()}
+        return result
+
+    @staticmethod
+    def _score_level_counts(claims_df: pd.DataFrame, version: int) -> np.ndarray:
+        """Claim counts per score hundredth for the given data version."""
+        cached = AnalyticsService._score_levels
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        points = np.rint(claims_df['risk_score'].to_numpy(dtype=float) * 100).astype(np.int64)
+        counts = np.bincount(points, minlength=101)
+        AnalyticsService._score_levels = (version, counts)
+        return counts
+
+    @staticmethod
+    def get_high_risk_claims(limit: int = 10):
+        records, _ = AnalyticsService.get_high_risk_page(limit=limit)
         return records
+
+    @staticmethod
+    def get_high_risk_page(limit: int = 10, after: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Return one page of high-risk claims ranked by score, plus the next cursor.
+
+        Ranking is score descending, then cache position, so the order is total
+        and a cursor of (score, position) resumes exactly where a page ended.
+        Only the selected rows are sorted and materialized.
+        """
+        claims_df = DataService.get_claims()
+
+        if claims_df.empty or limit <= 0:
+            return [], None
+
+        scores = claims_df['risk_score'].to_numpy(dtype=float)
+        eligible = scores >= HIGH_RISK_THRESHOLD
+        if after:
+            after_score, after_position = decode_cursor(after, 2)
+            if not isinstance(after_score, (int, float)) or not isinstance(after_position, int):
+                raise ValueError("Malformed cursor")
+            positions = np.arange(len(scores))
+            eligible &= (scores < after_score) | ((scores == after_score) & (positions > after_position))
+
+        candidates = np.flatnonzero(eligible)
+        has_more = len(candidates) > limit
+        if has_more:
+            candidate_scores = scores[candidates]
+            cutoff_index = len(candidates) - limit
+            cutoff = np.partition(candidate_scores, cutoff_index)[cutoff_index]
+            above = candidates[candidate_scores > cutoff]
+            ties = candidates[candidate_scores == cutoff][: limit - len(above)]
+            candidates = np.concatenate([above, ties])
+
+        ranked = candidates[np.lexsort((candidates, -scores[candidates]))]
+        records = AnalyticsService._records_at(claims_df, ranked)
+
+        next_cursor = None
+        if has_more:
+            last = int(ranked[-1])
+            next_cursor = encode_cursor(float(scores[last]), last)
+        return records, next_cursor
+
+    @staticmethod
+    def _records_at(claims_df: pd.DataFrame, positions: np.ndarray) -> List[dict]:
+        """Build JSON-friendly records for the given row positions, column-wise."""
+        public_columns = [column for column in claims_df.columns if not str(column).startswith("_")]
+        page = claims_df.iloc[positions][public_columns].astype(object)
+        page = page.where(page.notna(), None)
+        if 'risk_score' in page.columns:
+            page['risk_score'] = [None if score is None else round(float(score), 2) for score in page['risk_score']]
+        return page.to_dict('records')
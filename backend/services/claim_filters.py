@@ -0,0 +1,241 @@
+"""
+Filter planning for claim list queries.
+
+Filters are compiled into one boolean mask over the typed cache columns
+(categorical codes, datetime64 nanoseconds, the rule-hit bitmask), so a
+query never copies the claims frame or parses its dates. Only the row
+positions of the requested page are ever turned back into rows.
+"""
+
+import re
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.services.claim_indexes import ClaimBitmapIndex, SortedPositions
+from backend.services.risk_rules import RISK_BANDS, risk_band_codes
+
+# Columns the free-text search looks in
+SEARCH_COLUMNS = ("id", "patient_id", "provider_id", "status", "diagnosis_code")
+
+_TIME_RANGE = re.compile(r"^(\d+)([dwmy])$")
+_TIME_RANGE_DAYS = {"d": 1, "w": 7, "m": 30, "y": 365}
+
+
+class ClaimFilterError(ValueError):
+    """Raised when a filter value cannot be applied."""
+
+
+class ClaimFilters(NamedTuple):
+    status: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    reason_mask: int = 0
+    time_range: Optional[str] = None
+    amount_min: Optional[float] = None
+    amount_max: Optional[float] = None
+    risk_levels: Tuple[str, ...] = ()
+    provider_id: Optional[str] = None
+    diagnosis_code: Optional[str] = None
+    patient_state: Optional[str] = None
+    search: Optional[str] = None
+
+
+def claim_mask(
+    claims_df: pd.DataFrame,
+    filters: ClaimFilters,
+    now: Optional[datetime] = None,
+    date_order: Optional[SortedPositions] = None,
+    bitmaps: Optional[ClaimBitmapIndex] = None,
+) -> Optional[np.ndarray]:
+    """Rows matching every filter, or None when nothing is filtered.
+
+    time_range presets ("7d", "4w", "3m", "1y", "all") count back whole days
+    from the start of today (or of ``now``). Given the claim_date order of
+    the frame, the date filters become one binary-searched slice of it;
+    given its bitmap index, the equality filters are ANDed as bitsets and
+    expanded once.
+    """
+    mask: Optional[np.ndarray] = None
+
+    def narrow(term: np.ndarray) -> None:
+        nonlocal mask
+        mask = term if mask is None else mask & term
+
+    equals = {
+        column: getattr(filters, column)
+        for column in ("status", "provider_id", "diagnosis_code", "patient_state")
+        if getattr(filters, column) and getattr(filters, column) != "all"
+    }
+    words: Optional[np.ndarray] = None
+    for column, value in equals.items():
+        if bitmaps is not None and column in bitmaps.bitsets:
+            bits = bitmaps.bits(column, value)
+            words = bits if words is None else words & bits
+        else:
+            narrow(_equals(claims_df, column, value))
+    if words is not None:
+        narrow(bitmaps.to_mask(words))
+
+    start = _parse_date(filters.start_date) if filters.start_date else None
+    end = _parse_date(filters.end_date) if filters.end_date else None
+    range_start = time_range_start(filters.time_range, now)
+    if range_start is not None and (start is None or range_start > start):
+        start = range_start
+    if start is not None or end is not None:
+        narrow(_date_range(claims_df, "claim_date", start, end, date_order))
+
+    if filters.amount_min is not None or filters.amount_max is not None:
+        amounts = claims_df["claim_amount"].to_numpy(dtype=float, na_value=np.nan)
+        term = ~np.isnan(amounts)
+        if filters.amount_min is not None:
+            term &= amounts >= filters.amount_min
+        if filters.amount_max is not None:
+            term &= amounts <= filters.amount_max
+        narrow(term)
+
+    if filters.risk_levels:
+        unknown = [level for level in filters.risk_levels if level not in RISK_BANDS]
+        if unknown:
+            raise ClaimFilterError(f"Unknown risk level(s): {', '.join(unknown)}")
+        scores = claims_df["risk_score"].to_numpy(dtype=float, na_value=np.nan)
+        codes = [RISK_BANDS.index(level) for level in filters.risk_levels]
+        narrow(np.isin(risk_band_codes(scores), codes) & ~np.isnan(scores))
+
+    if filters.reason_mask:
+        hits = claims_df["_risk_hits"].to_numpy(dtype=np.int64)
+        narrow((hits & filters.reason_mask) != 0)
+
+    if filters.search and filters.search.strip():
+        narrow(_search(claims_df, filters.search.strip()))
+
+    return mask
+
+
+def sorted_page(
+    order: SortedPositions,
+    mask: Optional[np.ndarray],
+    limit: int,
+    start: int = 0,
+    offset: int = 0,
+    descending: bool = False,
+) -> np.ndarray:
+    """Row positions of up to ``limit`` matches, walking an order from entry ``start``.
+
+    The walk is read in growing chunks, so a selective filter costs about as
+    many mask lookups as it takes to fill the page, not a pass over the order.
+    """
+    rows = len(order.positions)
+    offset = max(offset, 0)
+    if mask is None:
+        start += offset
+        return order.walk(start, min(start + limit, rows), descending)
+
+    needed = offset + limit
+    chunk = max(needed * 4, 4096)
+    found = []
+    while start < rows and needed > 0:
+        candidates = order.walk(start, min(start + chunk, rows), descending)
+        hits = candidates[mask[candidates]][:needed]
+        found.append(hits)
+        needed -= len(hits)
+        start += chunk
+        chunk *= 2
+    if not found:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(found)[offset:offset + limit]
+
+
+def time_range_start(time_range: Optional[str], now: Optional[datetime] = None) -> Optional[pd.Timestamp]:
+    """First day covered by a time_range preset, or None for "all"/unset."""
+    if not time_range or time_range == "all":
+        return None
+    match = _TIME_RANGE.match(time_range.strip().lower())
+    if not match:
+        raise ClaimFilterError(f"Invalid time_range '{time_range}'")
+    days = int(match.group(1)) * _TIME_RANGE_DAYS[match.group(2)]
+    today = pd.Timestamp(now or datetime.now()).normalize()
+    return today - pd.Timedelta(days=days)
+
+
+def page_positions(mask: Optional[np.ndarray], rows: int, offset: int, limit: int) -> Tuple[int, np.ndarray]:
+    """Total matches and the row positions of one page of them."""
+    offset = max(offset, 0)
+    if mask is None:
+        return rows, np.arange(min(offset, rows), min(offset + limit, rows))
+    matches = np.flatnonzero(mask)
+    return len(matches), matches[offset:offset + limit]
+
+
+def _equals(claims_df: pd.DataFrame, column: str, value: str) -> np.ndarray:
+    if column not in claims_df.columns:
+        return np.zeros(len(claims_df), dtype=bool)
+    values = claims_df[column]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Compare integer codes instead of strings
+        code = values.cat.categories.get_indexer([value])[0]
+        if code < 0:
+            return np.zeros(len(claims_df), dtype=bool)
+        return values.cat.codes.to_numpy() == code
+    return (values == value).to_numpy(dtype=bool, na_value=False)
+
+
+def _search(claims_df: pd.DataFrame, query: str) -> np.ndarray:
+    """Case-insensitive substring match in any SEARCH_COLUMNS column."""
+    mask = np.zeros(len(claims_df), dtype=bool)
+    for column in SEARCH_COLUMNS:
+        if column not in claims_df.columns:
+            continue
+        values = claims_df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Match each distinct value once, then broadcast through the codes;
+            # the trailing False is what missing values (code -1) pick up
+            categories = values.cat.categories.astype(str)
+            hits = np.asarray(categories.str.contains(query, case=False, regex=False), dtype=bool)
+            mask |= np.append(hits, False)[values.cat.codes.to_numpy()]
+        else:
+            found = values.astype("string").str.contains(query, case=False, regex=False)
+            mask |= found.to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+def _date_range(
+    claims_df: pd.DataFrame,
+    column: str,
+    start: Optional[pd.Timestamp],
+    end: Optional[pd.Timestamp],
+    order: Optional[SortedPositions] = None,
+) -> np.ndarray:
+    if order is not None and order.keys.dtype == np.int64:
+        # Nanosecond keys: the range is a contiguous run of the order
+        mask = np.zeros(len(claims_df), dtype=bool)
+        mask[order.key_range(
+            start.value if start is not None else None,
+            end.value if end is not None else None,
+        )] = True
+        return mask
+    values = claims_df[column]
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        # Untyped frames (a column with unparseable dates) are parsed here
+        values = pd.to_datetime(values, errors="coerce", format="mixed")
+    nanos = values.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    mask = nanos != np.iinfo(np.int64).min
+    if start is not None:
+        mask &= nanos >= start.value
+    if end is not None:
+        mask &= nanos <= end.value
+    return mask
+
+
+def _parse_date(value: str) -> pd.Timestamp:
+    try:
+        parsed = pd.Timestamp(value)
+    except (TypeError, ValueError) as exc:
+        raise ClaimFilterError(f"Invalid date '{value}'") from exc
+    if parsed is pd.NaT:
+        raise ClaimFilterError(f"Invalid date '{value}'")
+    if parsed.tzinfo is not None:
+        parsed = parsed.tz_convert(None)
+    return parsed.as_unit("ns")
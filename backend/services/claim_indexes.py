@@ -0,0 +1,526 @@
+"""
+Secondary indexes derived from the in-memory claims cache.
+
+DataService owns the instances and keeps them in step with cache writes;
+they are rebuilt from scratch whenever the cache is reloaded or re-scored.
+"""
+
+from typing import Any, Dict, NamedTuple, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+
+class SortedScoreIndex:
+    """Risk scores sorted ascending, overall and per status / provider.
+
+    Threshold questions ("how many claims score >= t") become a binary search
+    instead of a scan. A published index is never changed: single-claim
+    updates re-file a copy that is published with the next snapshot.
+    """
+
+    GROUP_COLUMNS = ("status", "provider_id")
+
+    def __init__(self, claims_df: pd.DataFrame, version: int):
+        self.version = version
+        scores = claims_df["risk_score"].to_numpy(dtype=float)
+        order = np.argsort(scores, kind="stable")
+        self.scores = scores[order]
+        self.groups: Dict[str, Dict[Any, np.ndarray]] = {}
+        for column in self.GROUP_COLUMNS:
+            if column not in claims_df.columns:
+                self.groups[column] = {}
+                continue
+            keys = pd.Series(claims_df[column].to_numpy()[order])
+            self.groups[column] = {
+                key: self.scores[positions]
+                for key, positions in keys.groupby(keys, sort=False).indices.items()
+            }
+
+    @staticmethod
+    def count_at_least(sorted_scores: np.ndarray, threshold: float) -> int:
+        return int(len(sorted_scores) - np.searchsorted(sorted_scores, threshold, side="left"))
+
+    def copy(self, version: int) -> "SortedScoreIndex":
+        """A copy for another data version; moving claims in it leaves this one as it was."""
+        index = SortedScoreIndex.__new__(SortedScoreIndex)
+        index.version = version
+        index.scores = self.scores
+        index.groups = {column: dict(groups) for column, groups in self.groups.items()}
+        return index
+
+    def move(self, old_score: float, new_score: float, old_keys: Dict[str, Any], new_keys: Dict[str, Any]) -> None:
+        """Re-file one claim after its score or group membership changed.
+
+        Arrays are replaced, never written, so only an unpublished copy may be moved.
+        """
+        self.scores = _insert(_remove(self.scores, old_score), new_score)
+        for column, groups in self.groups.items():
+            old_key, new_key = old_keys.get(column), new_keys.get(column, old_keys.get(column))
+            if old_key in groups:
+                remaining = _remove(groups[old_key], old_score)
+                if len(remaining):
+                    groups[old_key] = remaining
+                else:
+                    del groups[old_key]
+            if new_key is not None and not _is_missing(new_key):
+                groups[new_key] = _insert(groups.get(new_key, np.zeros(0)), new_score)
+
+
+class ClaimHashIndex:
+    """Row positions keyed by claim id and by the columns claims are grouped on.
+
+    A single claim is found in O(1) and a provider/policy/diagnosis/procedure
+    group in O(group size). Group keys are compared as strings; missing values
+    are not indexed. Positions refer to the snapshot the index was built for,
+    and stay valid across updates because rows never move. A published index
+    is never changed: updates re-file a copy published with the next snapshot.
+    """
+
+    GROUP_COLUMNS = ("provider_id", "policy_id", "diagnosis_code", "procedure_codes")
+
+    def __init__(self, claims_df: pd.DataFrame, version: int):
+        self.version = version
+        ids = claims_df["id"].to_numpy() if "id" in claims_df.columns else np.zeros(0, dtype=object)
+        self._ids = pd.Index(ids)
+        self.groups: Dict[str, Dict[str, np.ndarray]] = {}
+        for column in self.GROUP_COLUMNS:
+            if column not in claims_df.columns:
+                continue
+            values = claims_df[column]
+            present = np.flatnonzero(values.notna().to_numpy(dtype=bool))
+            keys = pd.Series(values.to_numpy()[present]).astype(str)
+            self.groups[column] = {
+                key: present[positions]
+                for key, positions in keys.groupby(keys, sort=False).indices.items()
+            }
+        self._owned_columns: Set[str] = set()
+
+    def copy(self, version: int) -> "ClaimHashIndex":
+        """A copy for another data version; moving rows in it leaves this one as it was.
+
+        Group dicts are shared until the copy first re-files a row in them.
+        """
+        index = ClaimHashIndex.__new__(ClaimHashIndex)
+        index.version = version
+        index._ids = self._ids
+        index.groups = dict(self.groups)
+        index._owned_columns = set()
+        return index
+
+    def position_of(self, claim_id: Any) -> Optional[int]:
+        """Position of a claim id (the first one if ids repeat), or None."""
+        positions = self.positions("id", claim_id)
+        return int(positions[0]) if len(positions) else None
+
+    def positions(self, column: str, value: Any) -> np.ndarray:
+        """Ascending row positions whose column equals value."""
+        if column == "id":
+            try:
+                loc = self._ids.get_loc(value)
+            except (KeyError, TypeError, pd.errors.InvalidIndexError):
+                return np.zeros(0, dtype=np.int64)
+            if isinstance(loc, slice):
+                return np.arange(len(self._ids), dtype=np.int64)[loc]
+            if isinstance(loc, np.ndarray):
+                return np.flatnonzero(loc)
+            return np.array([loc], dtype=np.int64)
+        if value is None or _is_missing(value):
+            return np.zeros(0, dtype=np.int64)
+        return self.groups.get(column, {}).get(str(value), np.zeros(0, dtype=np.int64))
+
+    def move(self, position: int, column: str, old_value: Any, new_value: Any) -> None:
+        """Re-file one row after its value in an indexed group column changed.
+
+        Only an unpublished copy may be moved.
+        """
+        groups = self.groups.get(column)
+        if groups is None:
+            return
+        if column not in self._owned_columns:
+            groups = self.groups[column] = dict(groups)
+            self._owned_columns.add(column)
+        if old_value is not None and not _is_missing(old_value):
+            old_key = str(old_value)
+            remaining = groups.get(old_key, np.zeros(0, dtype=np.int64))
+            remaining = remaining[remaining != position]
+            if len(remaining):
+                groups[old_key] = remaining
+            else:
+                groups.pop(old_key, None)
+        if new_value is not None and not _is_missing(new_value):
+            new_key = str(new_value)
+            current = groups.get(new_key, np.zeros(0, dtype=np.int64))
+            groups[new_key] = np.insert(current, int(np.searchsorted(current, position)), position)
+
+
+class SortedPositions(NamedTuple):
+    """Row positions in (key, claim id) order for one column.
+
+    The first ``present`` entries have a key, sorted ascending with ties in
+    claim id order; rows without a key follow in claim id order.
+    """
+    positions: np.ndarray
+    keys: np.ndarray
+    ids: np.ndarray
+    present: int
+
+    def resume_after(self, key: Any, claim_id: Any, descending: bool = False) -> int:
+        """How many entries of the walk (see walk) come before or at (key, claim_id)."""
+        if _is_missing(key):
+            return self.present + int(np.searchsorted(self.ids[self.present:], claim_id, side="right"))
+        keys = self.keys[:self.present]
+        lo = int(np.searchsorted(keys, key, side="left"))
+        hi = int(np.searchsorted(keys, key, side="right"))
+        if not descending:
+            return lo + int(np.searchsorted(self.ids[lo:hi], claim_id, side="right"))
+        return self.present - lo - int(np.searchsorted(self.ids[lo:hi], claim_id, side="left"))
+
+    def walk(self, start: int, stop: int, descending: bool = False) -> np.ndarray:
+        """Entries [start, stop) of the sort order, as row positions.
+
+        Descending walks the keyed rows from the largest key down; rows
+        without a key come last either way.
+        """
+        if not descending:
+            return self.positions[start:stop]
+        present = self.present
+        head = self.positions[max(present - stop, 0):max(present - start, 0)][::-1]
+        tail = self.positions[present + max(start - present, 0):present + max(stop - present, 0)]
+        return np.concatenate([head, tail]) if len(tail) else head
+
+    def key_range(self, low: Any = None, high: Any = None) -> np.ndarray:
+        """Row positions with low <= key <= high, in key order; None leaves an end open."""
+        keys = self.keys[:self.present]
+        lo = 0 if low is None else int(np.searchsorted(keys, low, side="left"))
+        hi = self.present if high is None else int(np.searchsorted(keys, high, side="right"))
+        return self.positions[lo:max(lo, hi)]
+
+    def is_key(self, value: Any) -> bool:
+        """Whether a value (one read back from a cursor, say) is in this order's key space."""
+        if value is None:
+            return True
+        if isinstance(value, bool):
+            return False
+        if self.keys.dtype == np.int64:
+            return isinstance(value, int)
+        if self.keys.dtype.kind == "f":
+            return isinstance(value, (int, float))
+        return isinstance(value, str)
+
+    def key_of(self, value: Any) -> Any:
+        """A column value in this order's key space (None when missing)."""
+        if value is None or _is_missing(value):
+            return None
+        if self.keys.dtype == np.int64:
+            return pd.Timestamp(value).as_unit("ns").value
+        if self.keys.dtype.kind == "f":
+            return float(value)
+        return str(value)
+
+
+class ClaimSortIndex:
+    """Presorted row positions for the columns claim lists can be sorted by.
+
+    Each column's order is built on first use and then patched in place when
+    single claims change, so a sorted page costs a binary search plus the
+    rows on the page, however deep it is. Keys are floats for numbers,
+    nanoseconds for dates and strings otherwise; claim ids break ties.
+    """
+
+    COLUMNS = ("id", "claim_date", "claim_amount", "risk_score", "status", "provider_id")
+    # Appending more rows than this re-sorts instead of merging row by row
+    MAX_MERGE_ROWS = 10_000
+
+    def __init__(self, version: int):
+        self.version = version
+        self.orders: Dict[str, SortedPositions] = {}
+        self._id_ranks: Optional[np.ndarray] = None
+
+    def order(self, claims_df: pd.DataFrame, column: str) -> SortedPositions:
+        """The order for one column of the frame this index describes."""
+        order = self.orders.get(column)
+        if order is None:
+            ids = claims_df["id"].to_numpy(dtype=object)
+            if self._id_ranks is None:
+                # Claim ids never change, so their ranks serve every column
+                self._id_ranks = _string_ranks(ids)
+            order = _build_order(claims_df[column], ids, self._id_ranks)
+            self.orders[column] = order
+        return order
+
+    def extend(self, claims_df: pd.DataFrame, start: int) -> None:
+        """Merge rows appended to the frame (positions start onwards) into every order."""
+        appended = len(claims_df) - start
+        self._id_ranks = None
+        if appended <= 0:
+            return
+        if appended > self.MAX_MERGE_ROWS:
+            self.orders.clear()
+            return
+        new_rows = claims_df.iloc[start:]
+        ids = new_rows["id"].to_numpy(dtype=object)
+        for column, order in list(self.orders.items()):
+            incoming = _build_order(new_rows[column], ids, _string_ranks(ids))
+            incoming_keys = incoming.keys
+            if incoming_keys.dtype != order.keys.dtype:
+                if not len(incoming_keys):
+                    incoming_keys = incoming_keys.astype(order.keys.dtype)
+                else:
+                    # The appended rows widened the column's type
+                    del self.orders[column]
+                    continue
+            # Entries are merged in (key, id) order, so earlier ones never shift later ones' slots
+            keys = incoming_keys.tolist() + [None] * (len(incoming.ids) - incoming.present)
+            targets = np.array(
+                [order.resume_after(key, claim_id) for key, claim_id in zip(keys, incoming.ids)],
+                dtype=np.int64,
+            )
+            self.orders[column] = SortedPositions(
+                np.insert(order.positions, targets, incoming.positions + start),
+                np.insert(order.keys, targets[:incoming.present], incoming_keys),
+                np.insert(order.ids, targets, incoming.ids),
+                order.present + incoming.present,
+            )
+
+    def move(self, position: int, column: str, claim_id: Any, old_value: Any, new_value: Any) -> None:
+        """Re-file one row after its value in a sorted column changed."""
+        order = self.orders.get(column)
+        if order is None:
+            return
+        old_key, new_key = order.key_of(old_value), order.key_of(new_value)
+        index = order.resume_after(old_key, claim_id) - 1
+        if index < 0 or order.positions[index] != position:
+            # Not where its old value says it should be; rebuild on next use
+            del self.orders[column]
+            return
+        positions = np.delete(order.positions, index)
+        ids = np.delete(order.ids, index)
+        present = order.present
+        keys = order.keys
+        if index < present:
+            keys = np.delete(keys, index)
+            present -= 1
+        remaining = SortedPositions(positions, keys, ids, present)
+
+        target = remaining.resume_after(new_key, claim_id)
+        if not _is_missing(new_key):
+            keys = np.insert(keys, target, new_key)
+            present += 1
+        self.orders[column] = SortedPositions(
+            np.insert(positions, target, position), keys, np.insert(ids, target, claim_id), present
+        )
+
+
+class ClaimBitmapIndex:
+    """One packed bitset per distinct value of the low-cardinality columns.
+
+    Bit ``i`` of word ``i // 64`` is set when row ``i`` holds the value, so
+    multi-column filters are word-wise AND/OR and facet counts a popcount.
+    Values are keyed as strings; missing values are not indexed. A published
+    index is never changed: writers re-file claims in a copy, which replaces
+    the bitsets it touches, and publish it with the next snapshot.
+    """
+
+    COLUMNS = (
+        "status",
+        "patient_gender",
+        "patient_state",
+        "diagnosis_code",
+        "procedure_codes",
+        "provider_id",
+        "denial_reason",
+    )
+
+    def __init__(self, claims_df: pd.DataFrame, version: int):
+        self.version = version
+        self.rows = len(claims_df)
+        self.words = -(-self.rows // 64)
+        self.bitsets: Dict[str, Dict[str, np.ndarray]] = {}
+        for column in self.COLUMNS:
+            if column in claims_df.columns:
+                self.bitsets[column] = _bitsets(claims_df[column], 0, self.words)
+        self._owned_columns: Set[str] = set()
+
+    def copy(self, version: int) -> "ClaimBitmapIndex":
+        """A copy for another data version; re-filing rows in it leaves this one as it was.
+
+        Bitsets and per-column dicts are shared until the copy replaces them.
+        """
+        index = ClaimBitmapIndex.__new__(ClaimBitmapIndex)
+        index.version = version
+        index.rows = self.rows
+        index.words = self.words
+        index.bitsets = dict(self.bitsets)
+        index._owned_columns = set()
+        return index
+
+    def bits(self, column: str, value: Any) -> np.ndarray:
+        """Bitset of the rows whose column equals value (all clear if none do)."""
+        words = self.bitsets.get(column, {}).get(str(value))
+        return words if words is not None else np.zeros(self.words, dtype=np.uint64)
+
+    def any_of(self, column: str, values: Any) -> np.ndarray:
+        """Bitset of the rows whose column equals any of values."""
+        words = np.zeros(self.words, dtype=np.uint64)
+        for value in values:
+            words |= self.bits(column, value)
+        return words
+
+    def to_mask(self, words: np.ndarray) -> np.ndarray:
+        """Expand a bitset into one bool per row."""
+        return np.unpackbits(words.view(np.uint8), bitorder="little")[:self.rows].view(bool)
+
+    def from_mask(self, mask: np.ndarray) -> np.ndarray:
+        """Pack one bool per row into a bitset."""
+        packed = np.zeros(self.words * 8, dtype=np.uint8)
+        packed[:-(-self.rows // 8)] = np.packbits(mask, bitorder="little")
+        return packed.view(np.uint64)
+
+    @staticmethod
+    def count(words: np.ndarray) -> int:
+        return int(_popcount(words).sum())
+
+    def facet_counts(self, column: str, within: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Rows per value of a column, optionally only those set in ``within``."""
+        counts = {}
+        for value, words in self.bitsets.get(column, {}).items():
+            count = self.count(words if within is None else words & within)
+            if count:
+                counts[value] = count
+        return counts
+
+    def move(self, position: int, column: str, old_value: Any, new_value: Any) -> None:
+        """Re-file one row after its value in an indexed column changed.
+
+        Only an unpublished copy may be moved.
+        """
+        bitsets = self.bitsets.get(column)
+        if bitsets is None:
+            return
+        if column not in self._owned_columns:
+            bitsets = self.bitsets[column] = dict(bitsets)
+            self._owned_columns.add(column)
+        word, bit = position >> 6, np.uint64(1) << np.uint64(position & 63)
+        if old_value is not None and not _is_missing(old_value) and str(old_value) in bitsets:
+            words = bitsets[str(old_value)].copy()
+            words[word] &= ~bit
+            bitsets[str(old_value)] = words
+        if new_value is not None and not _is_missing(new_value):
+            words = bitsets.get(str(new_value))
+            words = np.zeros(self.words, dtype=np.uint64) if words is None else words.copy()
+            words[word] |= bit
+            bitsets[str(new_value)] = words
+
+    def extend(self, claims_df: pd.DataFrame, start: int) -> None:
+        """Index rows appended to the frame (positions start onwards).
+
+        Every bitset is replaced by a longer one, so only an unpublished copy may be extended.
+        """
+        self.rows = len(claims_df)
+        words = -(-self.rows // 64)
+        for column in self.COLUMNS:
+            if column not in claims_df.columns:
+                continue
+            bitsets = self.bitsets.get(column, {})
+            appended = _bitsets(claims_df[column].iloc[start:], start, words)
+            grown_bitsets = {}
+            for value in bitsets.keys() | appended.keys():
+                current = bitsets.get(value, np.zeros(0, dtype=np.uint64))
+                grown = np.zeros(words, dtype=np.uint64)
+                grown[:len(current)] = current
+                if value in appended:
+                    grown |= appended[value]
+                grown_bitsets[value] = grown
+            self.bitsets[column] = grown_bitsets
+            self._owned_columns.add(column)
+        self.words = words
+
+
+def _bitsets(values: pd.Series, start: int, words: int) -> Dict[str, np.ndarray]:
+    """Bitsets of ``words`` words for values found at positions start onwards."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy().astype(np.int64)
+        uniques = values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    matrix = np.zeros((len(uniques), words), dtype=np.uint64)
+    present = np.flatnonzero(codes >= 0)
+    positions = (present + start).astype(np.uint64)
+    # Each (value, position) pair is a distinct bit, so adding them sets them
+    np.add.at(
+        matrix.reshape(-1),
+        codes[present] * words + (positions >> np.uint64(6)).astype(np.int64),
+        np.left_shift(np.uint64(1), positions & np.uint64(63)),
+    )
+    return {str(value): matrix[row] for row, value in enumerate(uniques) if matrix[row].any()}
+
+
+def _build_order(values: pd.Series, ids: np.ndarray, id_ranks: np.ndarray) -> SortedPositions:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories.astype(str).to_numpy(dtype=object)
+        category_order = np.argsort(categories, kind="stable")
+        ranks = np.empty(len(categories), dtype=np.int64)
+        ranks[category_order] = np.arange(len(categories))
+        codes = values.cat.codes.to_numpy()
+        missing = codes < 0
+        key_ranks = np.where(missing, -1, ranks[np.maximum(codes, 0)] if len(categories) else -1)
+        keys = categories[np.maximum(codes, 0)] if len(categories) else np.empty(len(codes), dtype=object)
+    elif pd.api.types.is_datetime64_any_dtype(values):
+        keys = values.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        missing = keys == np.iinfo(np.int64).min
+        key_ranks = keys
+    elif pd.api.types.is_numeric_dtype(values):
+        keys = values.to_numpy(dtype=float, na_value=np.nan)
+        missing = np.isnan(keys)
+        key_ranks = keys
+    else:
+        missing = values.isna().to_numpy(dtype=bool)
+        keys = values.astype(str).to_numpy(dtype=object)
+        key_ranks = _string_ranks(keys)
+
+    present_positions = np.flatnonzero(~missing)
+    missing_positions = np.flatnonzero(missing)
+    present_positions = present_positions[np.lexsort((id_ranks[present_positions], key_ranks[present_positions]))]
+    missing_positions = missing_positions[np.argsort(id_ranks[missing_positions], kind="stable")]
+    positions = np.concatenate([present_positions, missing_positions]).astype(np.int64)
+    return SortedPositions(positions, keys[present_positions], ids[positions], len(present_positions))
+
+
+def _string_ranks(values: np.ndarray) -> np.ndarray:
+    """Dense sort rank of each string (equal strings share a rank)."""
+    # Fixed-width unicode sorts in C, in the same code point order as str
+    strings = values.astype(str)
+    order = np.argsort(strings, kind="stable")
+    ordered = strings[order]
+    starts = np.ones(len(values), dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[order] = np.cumsum(starts) - 1
+    return ranks
+
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    """Set bits per uint64 word."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    # NumPy < 2.0
+    return np.unpackbits(words.view(np.uint8)).reshape(*words.shape, 64).sum(axis=-1)
+
+
+def _remove(sorted_scores: np.ndarray, score: float) -> np.ndarray:
+    position = int(np.searchsorted(sorted_scores, score, side="left"))
+    if position < len(sorted_scores) and sorted_scores[position] == score:
+        return np.delete(sorted_scores, position)
+    return sorted_scores
+
+
+def _insert(sorted_scores: np.ndarray, score: float) -> np.ndarray:
+    return np.insert(sorted_scores, int(np.searchsorted(sorted_scores, score, side="right")), score)
+
+
+def _is_missing(value: Any) -> bool:
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
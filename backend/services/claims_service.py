@@ -1,9 +1,14 @@
 import math
+import numpy as np
 import pandas as pd
-from typing import Optional, List, Dict, Any
+from concurrent.futures import Future
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
-from backend.services.data_service import DataService
+from backend.services.data_service import ClaimsSnapshot, DataService
 from backend.services.analytics_service import AnalyticsService
+from backend.services.claim_filters import ClaimFilterError, ClaimFilters, claim_mask, page_positions, sorted_page
+from backend.services.claim_indexes import ClaimBitmapIndex, ClaimSortIndex
+from backend.services.pagination import decode_cursor, encode_cursor
 
 DEFAULT_CLAIM_TEMPLATE: Dict[str, Any] =  {
     "id": "",
@@ -36,6 +41,9 @@ class ClaimsService:
 
     class InvalidStatusError(Exception):
         """Raised when an unsupported status update is requested."""
+
+    class InvalidFilterError(Exception):
+        """Raised when a claims filter value cannot be applied."""
     
     @staticmethod
     def get_summary():
@@ -66,69 +74,160 @@ class ClaimsService:
     
     @staticmethod
     def filter_claims(status: Optional[str] = None, start_date: Optional[str] = None, 
-                     end_date: Optional[str] = None, limit: int = 100, offset: int = 0):
-        claims_df = DataService.get_claims()
+                     end_date: Optional[str] = None, limit: int = 100, offset: int = 0,
+                     reasons: Optional[List[str]] = None, time_range: Optional[str] = None,
+                     amount_min: Optional[float] = None, amount_max: Optional[float] = None,
+                     risk_levels: Optional[List[str]] = None, provider_id: Optional[str] = None,
+                     diagnosis_code: Optional[str] = None, patient_state: Optional[str] = None,
+                     search: Optional[str] = None, sort: Optional[str] = None,
+                     direction: str = "asc", after: Optional[str] = None):
+        """One page of claims matching the filters.
+
+        With ``sort`` the page comes from the presorted order of that column
+        (ties broken by claim id) and ``next_cursor`` resumes right after it;
+        passing it back as ``after`` pages without counting skipped rows.
+        """
+        snapshot = DataService.get_snapshot()
+        claims_df = snapshot.claims
         
         if claims_df.empty:
             return {"claims": [], "total": 0, "page": 0, "page_size": limit}
-        
-        filtered_df = claims_df.copy()
-        
-        if status and status != 'all':
-            filtered_df = filtered_df[filtered_df['status'] == status]
-        
-        if start_date:
-            filtered_df['claim_date'] = pd.to_datetime(filtered_df['claim_date'])
-            filtered_df = filtered_df[filtered_df['claim_date'] >= pd.to_datetime(start_date)]
-        
-        if end_date:
-            filtered_df['claim_date'] = pd.to_datetime(filtered_df['claim_date'])
-            filtered_df = filtered_df[filtered_df['claim_date'] <= pd.to_datetime(end_date)]
-        
-        filtered_df['risk_score'] = filtered_df.apply(
-            lambda row: AnalyticsService.calculate_risk_score(row.to_dict()), 
-            axis=1
+
+        if sort is not None and (sort not in ClaimSortIndex.COLUMNS or sort not in claims_df.columns):
+            raise ClaimsService.InvalidFilterError(f"Cannot sort by '{sort}'")
+        if direction not in ("asc", "desc"):
+            raise ClaimsService.InvalidFilterError(f"Invalid sort direction '{direction}'")
+        if after and sort is None:
+            raise ClaimsService.InvalidFilterError("A cursor needs a sort column")
+
+        mask = ClaimsService._match_claims(
+            snapshot,
+            status=status,
+            start_date=start_date,
+            end_date=end_date,
+            reasons=reasons,
+            time_range=time_range,
+            amount_min=amount_min,
+            amount_max=amount_max,
+            risk_levels=risk_levels,
+            provider_id=provider_id,
+            diagnosis_code=diagnosis_code,
+            patient_state=patient_state,
+            search=search,
         )
-        
-        total = len(filtered_df)
-        page_data = filtered_df.iloc[offset:offset+limit]
-        
-        claims_list = []
-        for _, row in page_data.iterrows():
-            normalized = ClaimsService._normalize_claim_row(row.to_dict())
-            claims_list.append(normalized)
+
+        next_cursor = None
+        if sort is None:
+            total, positions = page_positions(mask, len(claims_df), offset, limit)
+        else:
+            descending = direction == "desc"
+            order = DataService.get_sort_order(sort, snapshot)
+            start = 0
+            if after:
+                try:
+                    cursor_sort, cursor_direction, key, claim_id = decode_cursor(after, 4)
+                except ValueError as exc:
+                    raise ClaimsService.InvalidFilterError(str(exc)) from exc
+                if (cursor_sort, cursor_direction) != (sort, direction):
+                    raise ClaimsService.InvalidFilterError("Cursor does not match the requested sort")
+                if not order.is_key(key) or not isinstance(claim_id, (str, int)):
+                    raise ClaimsService.InvalidFilterError("Malformed cursor")
+                try:
+                    start, offset = order.resume_after(key, claim_id, descending), 0
+                except (TypeError, ValueError) as exc:
+                    # Claim ids of another type than the cursor's do not compare
+                    raise ClaimsService.InvalidFilterError("Malformed cursor") from exc
+            total = len(claims_df) if mask is None else int(np.count_nonzero(mask))
+            # One row past the page tells whether there is a next one
+            positions = sorted_page(order, mask, limit + 1, start, offset, descending)
+            if len(positions) > limit:
+                positions = positions[:limit]
+                last = int(positions[-1])
+                next_cursor = encode_cursor(
+                    sort, direction, order.key_of(claims_df[sort].iloc[last]), claims_df["id"].iloc[last]
+                )
+
+        # Only the requested page is materialized and normalized
+        page_data = claims_df.take(positions)
+        claims_list = [ClaimsService._normalize_claim_row(row) for row in page_data.to_dict("records")]
         
         return {
             "claims": claims_list,
             "total": total,
             "page": offset // limit,
-            "page_size": limit
+            "page_size": limit,
+            "next_cursor": next_cursor
         }
     
+    @staticmethod
+    def get_claim_facets(**filters: Any) -> Dict[str, Any]:
+        """Claims per value of each bitmap-indexed column, among those matching the filters.
+
+        Takes the filter arguments of filter_claims.
+        """
+        snapshot = DataService.get_snapshot()
+        if snapshot.claims.empty:
+            return {"total": 0, "facets": {}}
+        bitmaps = DataService.get_bitmap_index(snapshot)
+
+        mask = ClaimsService._match_claims(snapshot, bitmaps=bitmaps, **filters)
+        within = bitmaps.from_mask(mask) if mask is not None else None
+        return {
+            "total": len(snapshot.claims) if within is None else bitmaps.count(within),
+            "facets": {column: bitmaps.facet_counts(column, within) for column in bitmaps.bitsets},
+        }
+
+    @staticmethod
+    def _match_claims(
+        snapshot: ClaimsSnapshot,
+        reasons: Optional[List[str]] = None,
+        risk_levels: Optional[List[str]] = None,
+        bitmaps: Optional[ClaimBitmapIndex] = None,
+        **criteria: Any,
+    ) -> Optional[np.ndarray]:
+        """Mask of the snapshot's claims matching the filters (None when unfiltered)."""
+        claims_df = snapshot.claims
+        reason_mask = 0
+        if reasons:
+            try:
+                reason_mask = AnalyticsService.reason_mask(reasons)
+            except ValueError as exc:
+                raise ClaimsService.InvalidFilterError(str(exc)) from exc
+        filters = ClaimFilters(reason_mask=reason_mask, risk_levels=tuple(risk_levels or ()), **criteria)
+
+        date_order = None
+        if "claim_date" in claims_df.columns and (
+            filters.start_date or filters.end_date or filters.time_range not in (None, "", "all")
+        ):
+            date_order = DataService.get_sort_order("claim_date", snapshot)
+        if bitmaps is None:
+            bitmaps = DataService.get_bitmap_index(snapshot)
+        try:
+            return claim_mask(claims_df, filters, date_order=date_order, bitmaps=bitmaps)
+        except ClaimFilterError as exc:
+            raise ClaimsService.InvalidFilterError(str(exc)) from exc
+
     @staticmethod
     def get_provider_metrics():
         claims_df = DataService.get_claims()
-        providers_df = DataService.get_providers()
+        provider_index = DataService.get_provider_index()
 
         if claims_df.empty:
             return []
         
-        provider_metrics = claims_df.groupby('provider_id').agg({
+        provider_metrics = claims_df.groupby('provider_id', observed=True).agg({
             'id': 'count',
             'status': lambda x: (x == 'approved').sum() / len(x) if len(x) > 0 else 0,
             'claim_amount': 'mean'
         }).reset_index()
         
         provider_metrics.columns = ['provider_id', 'total_claims', 'approval_rate', 'avg_claim_amount']
+        provider_metrics['provider_id'] = provider_metrics['provider_id'].astype(object)
         
-        if not providers_df.empty:
-            provider_metrics = provider_metrics.merge(
-                providers_df[['id', 'name']], 
-                left_on='provider_id', 
-                right_on='id', 
-                how='left'
-            )
-            provider_metrics['name'] = provider_metrics['name'].fillna('Unknown Provider')
+        if provider_index.ids:
+            provider_keys = provider_metrics['provider_id']
+            provider_metrics['id'] = provider_keys.where(provider_keys.isin(provider_index.ids))
+            provider_metrics['name'] = provider_keys.map(provider_index.names).fillna('Unknown Provider')
         else:
             provider_metrics['name'] = 'Provider ' + provider_metrics['provider_id']
         
@@ -154,6 +253,20 @@ class ClaimsService:
         reason: Optional[str] = None,
     ) -> Dict:
         """Update a claim's status and persist the change."""
+        claim_row, updates, pending = ClaimsService.submit_status_update(claim_id, status, reason)
+        return ClaimsService.complete_status_update(claim_id, claim_row, updates, pending.result())
+
+    @staticmethod
+    def submit_status_update(
+        claim_id: str,
+        status: str,
+        reason: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], "Future[int]"]:
+        """Validate a status change and submit its database write.
+
+        Returns the claim row it was computed from, the column updates and the
+        pending write; pass them to complete_status_update once it resolves.
+        """
 
         allowed_statuses = {"approved", "pending", "denied", "flagged"}
         normalized_status = status.lower()
@@ -162,15 +275,12 @@ class ClaimsService:
                 f"Unsupported status '{status}'. Allowed values: {sorted(allowed_statuses)}"
             )
 
-        claims_df = DataService.get_claims()
-        if claims_df.empty:
+        snapshot = DataService.get_snapshot()
+        position = DataService.find_claim_position(claim_id, snapshot)
+        if position is None:
             raise ClaimsService.NotFoundError(f"Claim {claim_id} not found")
 
-        match = claims_df[claims_df["id"] == claim_id]
-        if match.empty:
-            raise ClaimsService.NotFoundError(f"Claim {claim_id} not found")
-
-        claim_row = match.iloc[0].to_dict()
+        claim_row = snapshot.claims.iloc[position].to_dict()
 
         processed_ts = datetime.utcnow()
         processed_iso = processed_ts.isoformat()
@@ -200,45 +310,60 @@ class ClaimsService:
                 if pd.isna(approved_amount) or approved_amount is None:
                     updates["approved_amount"] = float(claim_row.get("claim_amount", 0.0))
 
-        updated_rows = DataService.update_claim_record(claim_id, updates)
+        return claim_row, updates, DataService.submit_claim_record(claim_id, updates)
+
+    @staticmethod
+    def complete_status_update(
+        claim_id: str,
+        claim_row: Dict[str, Any],
+        updates: Dict[str, Any],
+        updated_rows: int,
+    ) -> Dict:
+        """Apply a committed status change to the cache and build the response."""
         if updated_rows == 0:
             raise ClaimsService.NotFoundError(f"Claim {claim_id} not found")
 
         refreshed_claim = {**claim_row, **updates}
-        refreshed_claim["risk_score"] = AnalyticsService.calculate_risk_score(refreshed_claim)
+        refreshed_claim["risk_score"], refreshed_claim["_risk_hits"] = AnalyticsService.evaluate_claim(refreshed_claim)
         normalized_claim = ClaimsService._normalize_claim_row(refreshed_claim)
 
-        claims_df_updated = claims_df.copy()
-        for column, value in updates.items():
-            if column in claims_df_updated.columns:
-                claims_df_updated.loc[claims_df_updated["id"] == claim_id, column] = value
-
-        quick_stats = ClaimsService._build_quick_stats(normalized_claim, claims_df_updated)
+        cache_updates = {
+            **updates,
+            "risk_score": normalized_claim["risk_score"],
+            "_risk_hits": refreshed_claim["_risk_hits"],
+            "processor_notes": normalized_claim.get("processor_notes"),
+        }
+        snapshot = DataService.update_claim_cache(claim_id, cache_updates) or DataService.get_snapshot()
 
-        cache_updates = {**updates, "risk_score": normalized_claim["risk_score"], "processor_notes": normalized_claim.get("processor_notes")}
-        DataService.update_claim_cache(claim_id, cache_updates)
+        quick_stats = ClaimsService._build_quick_stats(normalized_claim, snapshot)
 
         return normalized_claim, quick_stats
 
     @staticmethod
     def update_claim_notes(claim_id: str, note: Optional[str]) -> Dict:
+        updates, pending = ClaimsService.submit_notes_update(claim_id, note)
+        return ClaimsService.complete_notes_update(claim_id, updates, pending.result())
+
+    @staticmethod
+    def submit_notes_update(claim_id: str, note: Optional[str]) -> Tuple[Dict[str, Any], "Future[int]"]:
+        """Submit a processor-notes write; see complete_notes_update."""
         cleaned_note = note.strip() if isinstance(note, str) else None
+        updates = {"processor_notes": cleaned_note or None}
+        return updates, DataService.submit_claim_record(claim_id, updates)
 
-        updated_rows = DataService.update_claim_record(
-            claim_id,
-            {"processor_notes": cleaned_note or None},
-        )
+    @staticmethod
+    def complete_notes_update(claim_id: str, updates: Dict[str, Any], updated_rows: int) -> Dict:
+        """Apply committed processor notes to the cache and return the claim."""
         if updated_rows == 0:
             raise ClaimsService.NotFoundError(f"Claim {claim_id} not found")
 
-        DataService.update_claim_cache(claim_id, {"processor_notes": cleaned_note or None})
-
-        claims_df = DataService.get_claims()
-        match = claims_df[claims_df["id"] == claim_id]
-        if match.empty:
+        snapshot = DataService.update_claim_cache(claim_id, updates)
+        snapshot = snapshot or DataService.get_snapshot()
+        position = DataService.find_claim_position(claim_id, snapshot)
+        if position is None:
             raise ClaimsService.NotFoundError(f"Claim {claim_id} not found")
 
-        return ClaimsService._normalize_claim_row(match.iloc[0].to_dict())
+        return ClaimsService._normalize_claim_row(snapshot.claims.iloc[position].to_dict())
 
     @staticmethod
     def _normalize_claim_row(claim: Dict[str, Any]) -> Dict[str, Any]:
@@ -260,8 +385,17 @@ class ClaimsService:
                 return default
             return str(value)
 
+        risk_hits = (claim or {}).get("_risk_hits")
+        if risk_hits is not None and pd.isna(risk_hits):
+            risk_hits = None
+
         data: Dict[str, Any] = dict(DEFAULT_CLAIM_TEMPLATE)
-        data.update(claim or {})
+        # Underscore-prefixed columns are cache internals, not claim fields
+        data.update({key: value for key, value in (claim or {}).items() if not str(key).startswith("_")})
+        # Typed datetime and nullable columns hold NaT / pd.NA for missing values
+        for key, value in data.items():
+            if value is pd.NaT or value is pd.NA:
+                data[key] = None
 
         data["id"] = safe_str(data.get("id"))
 
@@ -315,11 +449,7 @@ class ClaimsService:
         data["processor_notes"] = safe_str(data.get("processor_notes"), "")
         data["days_to_process"] = safe_float(data.get("days_to_process"))
 
-        reasons: list[str] = []
-        if amount > 5000:
-            reasons.append("Amount > $5,000")
-        if data["status"] == "pending" and days_pending > 30:
-            reasons.append("Pending > 30 days")
+        reasons: list[str] = AnalyticsService.explain_risk(data, risk_hits)
         if data["denial_reason"]:
             reasons.append(data["denial_reason"])
 
@@ -337,25 +467,22 @@ class ClaimsService:
         return data
 
     @staticmethod
-    def _build_quick_stats(claim: Dict, claims_df: pd.DataFrame) -> Dict:
+    def _build_quick_stats(claim: Dict, snapshot: ClaimsSnapshot) -> Dict:
         default_stats = {
             "provider_summary": "No provider history available.",
             "similar_summary": "No similar claims found.",
             "days_pending_label": "0 days pending",
         }
 
+        claims_df = snapshot.claims
         if not claim or claims_df.empty:
             return default_stats
 
-        provider_id = claim.get("provider_id")
-        provider_claims = (
-            claims_df[claims_df["provider_id"] == provider_id]
-            if "provider_id" in claims_df.columns
-            else pd.DataFrame()
-        )
-        total_claims = int(len(provider_claims))
-        if not provider_claims.empty and "status" in provider_claims.columns:
-            status_series = provider_claims["status"].astype(str).str.lower()
+        # Group lookups go through the hash index: O(group size), not O(claims)
+        provider_positions = DataService.find_claim_positions("provider_id", claim.get("provider_id"), snapshot)
+        total_claims = int(len(provider_positions))
+        if total_claims and "status" in claims_df.columns:
+            status_series = claims_df["status"].iloc[provider_positions].astype(str).str.lower()
             approvals = int((status_series == "approved").sum())
         else:
             approvals = 0
@@ -372,25 +499,16 @@ class ClaimsService:
         diagnosis_code = claim.get("diagnosis_code")
         procedure_code = claim.get("procedure_codes")
 
-        same_diagnosis = 0
-        same_procedure = 0
-        if diagnosis_code and "diagnosis_code" in claims_df.columns:
-            same_diagnosis = int(
-                claims_df[
-                    (claims_df["diagnosis_code"].astype(str) == str(diagnosis_code))
-                    & (claims_df["id"] != claim_id)
-                ].shape[0]
-            )
-        if procedure_code and (
-            "procedure_codes" in claims_df.columns or "procedure_code" in claims_df.columns
-        ):
-            procedure_column = "procedure_codes" if "procedure_codes" in claims_df.columns else "procedure_code"
-            same_procedure = int(
-                claims_df[
-                    (claims_df[procedure_column].astype(str) == str(procedure_code))
-                    & (claims_df["id"] != claim_id)
-                ].shape[0]
-            )
+        claim_ids = claims_df["id"].to_numpy()
+
+        def count_others(column: str, value: Any) -> int:
+            if not value:
+                return 0
+            positions = DataService.find_claim_positions(column, value, snapshot)
+            return int((claim_ids[positions] != claim_id).sum())
+
+        same_diagnosis = count_others("diagnosis_code", diagnosis_code)
+        same_procedure = count_others("procedure_codes", procedure_code)
 
         similar_parts = []
         if same_diagnosis:
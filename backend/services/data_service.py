@@ -1,42 +1,1088 @@
+import asyncio
+import os
+import threading
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
-from backend.config import DATABASE_URL
-from typing import Optional, Dict, Any
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import inspect, text
+from backend.config import (
+    CLAIMS_DELTA_LOOKBACK,
+    CLAIMS_DELTA_REFRESH_INTERVAL,
+    CLAIMS_LOAD_CHUNK_ROWS,
+    CLAIMS_LOAD_MEMORY_BUDGET_MB,
+    CLAIMS_SNAPSHOT_ENABLED,
+    CLAIMS_SNAPSHOT_PATH,
+    DB_WRITER_MAX_BATCH,
+    SHARED_CLAIMS_MAX_DELTA_ROWS,
+    SHARED_CLAIMS_POLL_INTERVAL,
+    WRITE_BEHIND_INTERVAL,
+    WRITE_BEHIND_JOURNAL_PATH,
+    WRITE_BEHIND_MAX_ATTEMPTS,
+    WRITE_BEHIND_MAX_BATCH,
+)
+from backend.database import get_engine
+from backend.services.claim_indexes import (
+    ClaimBitmapIndex,
+    ClaimHashIndex,
+    ClaimSortIndex,
+    SortedPositions,
+    SortedScoreIndex,
+)
+from backend.services.db_writer import DatabaseWriter, WriteFn
+from backend.services.risk_rules import RISK_BANDS, RiskRuleEngine, days_since, risk_band_codes
+from backend.services.shared_store import SharedClaimsStore
+from backend.services.snapshot_file import SnapshotFormatError, read_fingerprint, read_snapshot, write_snapshot
+from backend.services.write_behind import WriteBehindQueue
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, Callable, List, NamedTuple, FrozenSet, Tuple, Union
+
+# Typed layout of the claims cache; columns that are absent are skipped
+CATEGORY_COLUMNS = (
+    "status",
+    "provider_id",
+    "diagnosis_code",
+    "diagnosis_description",
+    "procedure_codes",
+    "patient_gender",
+    "patient_state",
+    "denial_reason",
+)
+DATE_COLUMNS = ("claim_date", "processed_date", "created_at")
+NUMERIC_DTYPES = {
+    "claim_amount": "float64",
+    "approved_amount": "float64",
+    "days_to_process": "float32",
+    "patient_age": "Int16",
+}
+# Smallest fetch the streaming loader shrinks to under memory pressure
+MIN_LOAD_CHUNK_ROWS = 1_000
+# Columns computed by materialize_risk_scores rather than read from the table
+DERIVED_COLUMNS = ("risk_score", "_risk_hits", "_risk_age_days")
+
+# Stamp every inserted or updated claim with the next change sequence number,
+# including writes from outside the API (ETL, scripts)
+SQLITE_CHANGE_TRIGGERS = {
+    "claims_change_seq_insert": """
+        CREATE TRIGGER claims_change_seq_insert AFTER INSERT ON claims
+        BEGIN
+            UPDATE claims SET change_seq = (SELECT COALESCE(MAX(change_seq), 0) + 1 FROM claims)
+            WHERE rowid = NEW.rowid;
+        END
+    """,
+    "claims_change_seq_update": """
+        CREATE TRIGGER claims_change_seq_update AFTER UPDATE ON claims
+        BEGIN
+            UPDATE claims SET change_seq = (SELECT COALESCE(MAX(change_seq), 0) + 1 FROM claims)
+            WHERE rowid = NEW.rowid;
+        END
+    """,
+}
+POSTGRES_CHANGE_TRIGGER = (
+    "CREATE SEQUENCE IF NOT EXISTS claims_change_seq",
+    """
+    CREATE OR REPLACE FUNCTION claims_stamp_change_seq() RETURNS trigger AS $$
+    BEGIN
+        NEW.change_seq := nextval('claims_change_seq');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER claims_stamp_change_seq BEFORE INSERT OR UPDATE ON claims
+    FOR EACH ROW EXECUTE FUNCTION claims_stamp_change_seq()
+    """,
+)
+
+
+class ProviderIndex(NamedTuple):
+    """Hashed lookups derived from one providers frame."""
+    source: pd.DataFrame
+    ids: FrozenSet[Any]
+    names: Dict[Any, str]
+
+
+class ClaimsSnapshot(NamedTuple):
+    """One published version of the claims cache.
+
+    Published frames are never written to again; writers publish a new frame
+    that shares every column they did not touch.
+    """
+    version: int
+    claims: pd.DataFrame
+
 
 class DataService:
     _claims_cache: Optional[pd.DataFrame] = None
     _providers_cache: Optional[pd.DataFrame] = None
+    _provider_index: Optional[ProviderIndex] = None
+    _risk_source: Optional[pd.DataFrame] = None
+    _risk_as_of: Optional[date] = None
+    _risk_rules_version: Optional[int] = None
+    _risk_provider_ids: Optional[FrozenSet[Any]] = None
+    _risk_band_counts: Optional[np.ndarray] = None
+    _data_version: int = 0
+    _snapshot: Optional[ClaimsSnapshot] = None
+    _score_index: Optional[SortedScoreIndex] = None
+    _hash_index: Optional[ClaimHashIndex] = None
+    _sort_index: Optional[ClaimSortIndex] = None
+    _bitmap_index: Optional[ClaimBitmapIndex] = None
+    _memory_report: Optional[Dict[str, Any]] = None
+    _load_progress: Optional[Dict[str, Any]] = None
+    _snapshot_file: Optional[str] = CLAIMS_SNAPSHOT_PATH if CLAIMS_SNAPSHOT_ENABLED else None
+    # A file left by an earlier run counts as current until this process writes
+    _snapshot_file_current = _snapshot_file is not None
+    # The typed claims as read and the table fingerprint taken with them
+    _snapshot_source: Optional[Tuple[pd.DataFrame, Dict[str, Any]]] = None
+    _shared_store: Optional[SharedClaimsStore] = None
+    _shared_version = 0
+    _change_tracking = CLAIMS_DELTA_REFRESH_INTERVAL > 0
+    _delta_watermark: Any = None
+    _write_behind: Optional[WriteBehindQueue] = None
+    _writer: Optional[DatabaseWriter] = None
+    _write_lock = threading.RLock()
     
     @staticmethod
     def load_claims_from_csv(filepath: str) -> pd.DataFrame:
-        df = pd.read_csv(filepath)
+        df = DataService._typed_claims(pd.read_csv(filepath))
         DataService._claims_cache = df
         return df
     
     @staticmethod
     def load_claims_from_db() -> pd.DataFrame:
-        engine = create_engine(DATABASE_URL)
+        if DataService._write_behind is not None:
+            # Queued updates must reach the table before it is re-read
+            DataService._write_behind.flush()
+        engine = get_engine()
         try:
-            df = pd.read_sql_table('claims', engine)
-            df = DataService._ensure_claim_columns(df)
-            DataService._claims_cache = df
+            if DataService._shared_store is not None:
+                df = DataService._attach_shared_claims(engine)
+            else:
+                if DataService._change_tracking or DataService._snapshot_file is not None:
+                    # The snapshot file is only trusted against trigger-stamped change_seq
+                    DataService.ensure_change_tracking()
+                if DataService._change_tracking:
+                    # Taken before the read, so rows changed during it are fetched again
+                    DataService._delta_watermark = DataService._max_change_seq(engine)
+                df = DataService._read_typed_claims(engine)
+            df = DataService.materialize_risk_scores(df)
+            DataService.get_hash_index()
+            DataService.get_bitmap_index()
+            if "claim_date" in df.columns:
+                # Date-range filters are the most common query; have their order ready
+                DataService.get_sort_order("claim_date")
             return df
         except Exception as e:
             print(f"Error loading claims from database: {e}")
             return pd.DataFrame()
+
+    @staticmethod
+    def _read_typed_claims(engine) -> pd.DataFrame:
+        """Typed claims from the snapshot file when it is current, else from the table."""
+        df = None
+        fingerprint = None
+        DataService._snapshot_source = None
+        if DataService._snapshot_file is not None:
+            with engine.connect() as conn:
+                fingerprint = DataService.claims_fingerprint(conn)
+                _, missing_triggers = DataService._missing_change_tracking(conn)
+            if fingerprint.get("max_change_seq") is not None and not missing_triggers:
+                df = DataService._load_snapshot_file(fingerprint)
+            else:
+                # Row count and rowid miss in-place edits; only trigger-stamped
+                # change_seq numbers tell the file apart from an edited table
+                print("Claims table has no change_seq triggers, not using a snapshot file")
+                fingerprint = None
+        if df is None:
+            df, raw_bytes = DataService.read_claims_chunked(engine)
+            DataService._record_memory_report(raw_bytes, df)
+            if fingerprint is not None:
+                DataService.save_snapshot_file(df, fingerprint)
+        if fingerprint is not None:
+            DataService._snapshot_source = (df, fingerprint)
+        return df
+
+    @staticmethod
+    def ensure_change_tracking() -> None:
+        """Add claims.change_seq and the triggers that keep it current, if missing."""
+        with get_engine().connect() as conn:
+            has_column, missing = DataService._missing_change_tracking(conn)
+        if has_column and not missing:
+            return
+
+        def migrate(conn) -> None:
+            if not has_column:
+                conn.execute(text("ALTER TABLE claims ADD COLUMN change_seq INTEGER"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS idx_claims_change_seq ON claims(change_seq)"))
+            # Existing rows predate tracking; triggers are created after this
+            conn.execute(text("UPDATE claims SET change_seq = 0 WHERE change_seq IS NULL"))
+            for statement in missing:
+                conn.execute(text(statement))
+
+        DataService.run_write(migrate)
+        print("Enabled change tracking on the claims table (change_seq)")
+
+    @staticmethod
+    def _missing_change_tracking(conn) -> Tuple[bool, List[str]]:
+        """Whether claims has a change_seq column, and the trigger DDL it still lacks.
+
+        Dialects without known triggers report none missing.
+        """
+        columns = {column["name"] for column in inspect(conn).get_columns("claims")}
+        if conn.dialect.name == "sqlite":
+            existing = set(conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'claims'")
+            ).scalars())
+            missing = [sql for name, sql in SQLITE_CHANGE_TRIGGERS.items() if name not in existing]
+        elif conn.dialect.name == "postgresql":
+            found = conn.execute(
+                text("SELECT 1 FROM pg_trigger WHERE tgname = 'claims_stamp_change_seq'")
+            ).first()
+            missing = [] if found else list(POSTGRES_CHANGE_TRIGGER)
+        else:
+            missing = []
+        return "change_seq" in columns, missing
+
+    @staticmethod
+    def _max_change_seq(engine) -> int:
+        with engine.connect() as conn:
+            return int(conn.execute(text("SELECT MAX(change_seq) FROM claims")).scalar() or 0)
+
+    @staticmethod
+    def refresh_delta() -> Dict[str, Any]:
+        """Merge claims changed since the last watermark into the cache.
+
+        Only rows whose change_seq is past the watermark are fetched (on
+        PostgreSQL also the CLAIMS_DELTA_LOOKBACK numbers below it, since a
+        sequence number is taken before its transaction commits). Rows that
+        match the cache (such as this process's own writes) are skipped;
+        changed rows are patched in place and new ones appended, and only
+        those are re-scored while the other scores are current. Deletes are
+        not visible to the delta, so a row count that no longer adds up
+        triggers a full reload instead.
+        """
+        result: Dict[str, Any] = {"updated": 0, "appended": 0, "reloaded": False}
+        watermark = DataService._delta_watermark
+        if watermark is None or DataService._claims_cache is None:
+            return result
+        if DataService._write_behind is not None:
+            # A queued update must not be overwritten by the row it replaces
+            DataService._write_behind.flush()
+
+        fingerprint = None
+        engine = get_engine()
+        with engine.connect() as conn:
+            # One read transaction, so the count, the rows and the fingerprint agree
+            total = int(conn.execute(text("SELECT COUNT(*) FROM claims")).scalar() or 0)
+            changed = pd.read_sql_query(
+                text("SELECT * FROM claims WHERE change_seq > :since"),
+                conn,
+                params={"since": watermark - DataService._delta_lookback(engine)},
+            )
+            if DataService._snapshot_file is not None:
+                fingerprint = DataService.claims_fingerprint(conn)
+        if changed.empty:
+            if total != len(DataService.get_claims()):
+                DataService.load_claims_from_db()
+                result["reloaded"] = True
+            return result
+        next_watermark = max(watermark, int(changed["change_seq"].max()))
+        changed = DataService.optimize_claim_dtypes(DataService._ensure_claim_columns(changed))
+
+        with DataService._write_lock:
+            df = DataService.get_claims()
+            hash_index = DataService.get_hash_index()
+            positions = np.array(
+                [
+                    -1 if position is None else position
+                    for position in map(hash_index.position_of, changed["id"].tolist())
+                ],
+                dtype=np.int64,
+            )
+            existing = positions >= 0
+            base_columns = [
+                column for column in df.columns
+                if column not in DERIVED_COLUMNS or column in changed.columns
+            ]
+            if total != len(df) + int((~existing).sum()) or set(changed.columns) - set(base_columns):
+                DataService.load_claims_from_db()
+                result["reloaded"] = True
+                return result
+
+            updated_rows = changed[existing].reset_index(drop=True)
+            differs = DataService._rows_differ(df, positions[existing], updated_rows)
+            updated_rows = updated_rows[differs]
+            updated_positions = positions[existing][differs]
+            new_rows = changed[~existing]
+            merged = df[base_columns]
+            now = datetime.now()
+            # Claims the delta leaves alone keep their scores while those are current
+            incremental = (
+                DataService._risk_source is df
+                and "_risk_hits" in df.columns
+                and DataService._risk_rules_version == RiskRuleEngine.get_ruleset().version
+                and DataService._risk_provider_ids is DataService.get_provider_ids()
+                and DataService._risk_as_of == now.date()
+            )
+            if len(updated_rows) or len(new_rows):
+                sort_index = DataService._sort_index
+                if sort_index is not None and sort_index.version != DataService._snapshot.version:
+                    sort_index = None
+                bitmap_index = DataService._bitmap_index
+                if bitmap_index is not None and bitmap_index.version != DataService._snapshot.version:
+                    bitmap_index = None
+                if bitmap_index is not None:
+                    # Readers may still hold the published index, so changes go into a copy
+                    bitmap_index = bitmap_index.copy(bitmap_index.version)
+                if len(updated_rows):
+                    if sort_index is not None:
+                        # Corrected dates, amounts, statuses... are re-filed where they now sort
+                        for column in list(sort_index.orders):
+                            if column not in updated_rows.columns or column in DERIVED_COLUMNS:
+                                continue
+                            old_values = df[column].iloc[updated_positions].to_numpy(dtype=object)
+                            new_values = updated_rows[column].to_numpy(dtype=object)
+                            claim_ids = updated_rows["id"].to_numpy(dtype=object)
+                            for position, claim_id, old, new in zip(updated_positions, claim_ids, old_values, new_values):
+                                if not (old == new or (pd.isna(old) and pd.isna(new))):
+                                    sort_index.move(int(position), column, claim_id, old, new)
+                    if bitmap_index is not None:
+                        for column in ClaimBitmapIndex.COLUMNS:
+                            if column not in updated_rows.columns or column not in df.columns:
+                                continue
+                            old_values = df[column].iloc[updated_positions].to_numpy(dtype=object)
+                            new_values = updated_rows[column].to_numpy(dtype=object)
+                            for position, old, new in zip(updated_positions, old_values, new_values):
+                                if not (old == new or (pd.isna(old) and pd.isna(new))):
+                                    bitmap_index.move(int(position), column, old, new)
+                    if not len(new_rows):
+                        # Rows stay where they are, so a copy of the hash index only needs re-filing
+                        hash_index = hash_index.copy(hash_index.version)
+                        for column in ClaimHashIndex.GROUP_COLUMNS:
+                            if column in updated_rows.columns and column in df.columns:
+                                old_values = df[column].iloc[updated_positions].to_numpy(dtype=object)
+                                new_values = updated_rows[column].to_numpy(dtype=object)
+                                for position, old, new in zip(updated_positions, old_values, new_values):
+                                    if not (old == new or (pd.isna(old) and pd.isna(new))):
+                                        hash_index.move(int(position), column, old, new)
+                    merged = DataService.with_claim_rows(merged, updated_positions, updated_rows)
+                if len(new_rows):
+                    new_rows = new_rows.reindex(columns=base_columns)
+                    merged = DataService._concat_typed_chunks([
+                        {column: merged[column] for column in base_columns},
+                        {column: new_rows[column] for column in base_columns},
+                    ])
+                if incremental:
+                    scored = DataService._score_delta(df, merged, updated_positions, now)
+                    DataService._publish(scored, hash_index=hash_index if not len(new_rows) else None)
+                else:
+                    scored = DataService.materialize_risk_scores(
+                        merged, now=now, hash_index=hash_index if not len(new_rows) else None
+                    )
+                DataService.get_hash_index()
+                if sort_index is not None:
+                    if incremental and "risk_score" in sort_index.orders:
+                        old_scores = df["risk_score"].to_numpy(dtype=float)[updated_positions]
+                        new_scores = scored["risk_score"].to_numpy(dtype=float)[updated_positions]
+                        claim_ids = scored["id"].to_numpy(dtype=object)[updated_positions]
+                        for position, claim_id, old, new in zip(updated_positions, claim_ids, old_scores, new_scores):
+                            if old != new:
+                                sort_index.move(int(position), "risk_score", claim_id, old, new)
+                    else:
+                        sort_index.orders.pop("risk_score", None)
+                    sort_index.extend(scored, len(df))
+                    sort_index.version = DataService._snapshot.version
+                    DataService._sort_index = sort_index
+                if bitmap_index is not None:
+                    bitmap_index.extend(scored, len(df))
+                    bitmap_index.version = DataService._snapshot.version
+                    DataService._bitmap_index = bitmap_index
+            if fingerprint is not None:
+                # The merged claims now match the table as it was fingerprinted
+                DataService._snapshot_source = (merged, fingerprint)
+            result.update(updated=len(updated_rows), appended=len(new_rows))
+
+        DataService._delta_watermark = next_watermark
+        return result
+
+    @staticmethod
+    def _score_delta(
+        df: pd.DataFrame, merged: pd.DataFrame, updated_positions: np.ndarray, now: datetime
+    ) -> pd.DataFrame:
+        """Score only the claims a delta patched or appended. Callers hold the write lock.
+
+        ``merged`` is ``df`` without its risk columns, patched at
+        ``updated_positions`` and with new rows appended; every other claim
+        keeps the score it has in ``df``. Returns the scored frame, to publish.
+        """
+        appended = len(merged) - len(df)
+        rescored = np.concatenate([updated_positions, np.arange(len(df), len(merged))]).astype(np.int64)
+        rows = merged.iloc[rescored].copy(deep=False)
+        if "claim_date" in rows.columns:
+            rows["_risk_age_days"] = days_since(rows["claim_date"], now)
+        else:
+            rows["_risk_age_days"] = np.nan
+        scores, hits = RiskRuleEngine.get_ruleset().evaluate(rows, now, DataService.risk_references())
+
+        risk_scores = np.append(df["risk_score"].to_numpy(dtype=float), np.zeros(appended))
+        risk_hits = np.append(df["_risk_hits"].to_numpy(dtype=np.int64), np.zeros(appended, dtype=np.int64))
+        risk_ages = np.append(df["_risk_age_days"].to_numpy(dtype=float), np.full(appended, np.nan))
+        patched = len(updated_positions)
+        DataService._shift_risk_bands(risk_scores[updated_positions], scores[:patched])
+        DataService._shift_risk_bands(np.empty(0), scores[patched:])
+        risk_scores[rescored] = scores
+        risk_hits[rescored] = hits
+        risk_ages[rescored] = rows["_risk_age_days"].to_numpy(dtype=float)
+
+        scored = merged.copy(deep=False)
+        scored["_risk_age_days"] = risk_ages
+        scored["risk_score"] = risk_scores
+        scored["_risk_hits"] = risk_hits
+        DataService._risk_source = scored
+        return scored
+
+    @staticmethod
+    def _delta_lookback(engine) -> int:
+        """How far below the watermark a delta refresh re-reads change_seq numbers.
+
+        PostgreSQL takes a sequence number before its transaction commits, so
+        a slow transaction can commit a number below one already read.
+        SQLite stamps rows inside its single writer, so nothing lands late.
+        """
+        return CLAIMS_DELTA_LOOKBACK if engine.dialect.name == "postgresql" else 0
+
+    @staticmethod
+    def _rows_differ(df: pd.DataFrame, positions: np.ndarray, rows: pd.DataFrame) -> np.ndarray:
+        """Which fetched rows differ from the cached rows at positions.
+
+        change_seq and the re-materialized risk columns are not compared.
+        """
+        differs = np.zeros(len(rows), dtype=bool)
+        for column in rows.columns:
+            if column == "change_seq" or column in DERIVED_COLUMNS:
+                continue
+            if column not in df.columns:
+                differs[:] = True
+                break
+            differs |= DataService._values_differ(df[column].iloc[positions], rows[column])
+        return differs
+
+    @staticmethod
+    def _values_differ(cached: pd.Series, fetched: pd.Series) -> np.ndarray:
+        """Elementwise inequality of two aligned columns; missing equals missing.
+
+        Empty strings count as missing: the cache keeps "" where the table
+        stores NULL (processor_notes, for one), and both mean no value.
+        """
+        cached_values = cached.to_numpy(dtype=object)
+        fetched_values = fetched.to_numpy(dtype=object)
+        # pd.NA has no truth value, so missing values are set aside before comparing
+        cached_missing = pd.isna(cached_values)
+        fetched_missing = pd.isna(fetched_values)
+        cached_values = np.where(cached_missing, None, cached_values)
+        fetched_values = np.where(fetched_missing, None, fetched_values)
+        cached_missing |= cached_values == ""
+        fetched_missing |= fetched_values == ""
+        return ~((cached_values == fetched_values) | (cached_missing & fetched_missing))
+
+    @staticmethod
+    async def run_delta_refresh_schedule(interval: float = CLAIMS_DELTA_REFRESH_INTERVAL) -> None:
+        """Fold changed claims into the cache every few seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                result = await asyncio.to_thread(DataService.refresh_delta)
+                if result["updated"] or result["appended"]:
+                    print(f"Delta refresh: {result['updated']} claims updated, {result['appended']} added")
+            except Exception as e:
+                print(f"Error refreshing claims delta: {e}")
+
+    @staticmethod
+    def start_shared_store(directory: str) -> None:
+        """Share one memory-mapped claims snapshot with the other worker processes.
+
+        Workers fold writes into their cache as change_seq deltas, so this
+        turns change tracking on.
+        """
+        DataService._shared_store = SharedClaimsStore(directory)
+        DataService._shared_version = 0
+        DataService._change_tracking = True
+
+    @staticmethod
+    def _attach_shared_claims(engine) -> pd.DataFrame:
+        """Map the shared snapshot, publishing it first if it is missing or stale."""
+        store = DataService._shared_store
+        with store.lock():
+            if DataService._change_tracking:
+                # Under the store lock, so only one worker migrates the table
+                DataService.ensure_change_tracking()
+            with engine.connect() as conn:
+                fingerprint = DataService.claims_fingerprint(conn)
+            if store.current_fingerprint() != fingerprint:
+                DataService._publish_shared_claims(engine, fingerprint)
+        attached = store.attach()
+        if attached is None:
+            raise RuntimeError(f"No shared claims snapshot in {store.directory}")
+        version, df, fingerprint = attached
+        DataService._shared_version = version
+        if DataService._change_tracking:
+            # Taken before the publisher's read, so rows changed during it are fetched again
+            DataService._delta_watermark = fingerprint.get("max_change_seq") or 0
+        print(f"Claims cache: {len(df)} rows mapped from shared snapshot v{version}")
+        return df
+
+    @staticmethod
+    def _publish_shared_claims(engine, fingerprint: Optional[Dict[str, Any]] = None) -> int:
+        """Re-read the table into a new shared version. Callers hold the store lock."""
+        store = DataService._shared_store
+        # Cleared before reading, so writes that land during the read ask again
+        store.clear_dirty()
+        if fingerprint is None:
+            with engine.connect() as conn:
+                fingerprint = DataService.claims_fingerprint(conn)
+        df, raw_bytes = DataService.read_claims_chunked(engine)
+        DataService._record_memory_report(raw_bytes, df)
+        version = store.publish(df, fingerprint)
+        print(f"Published shared claims snapshot v{version}")
+        return version
+
+    @staticmethod
+    def sync_shared_store() -> bool:
+        """Catch this worker up with writes made by any worker.
+
+        Writes are folded in as change_seq deltas on top of the mapped
+        snapshot. Only once more than SHARED_CLAIMS_MAX_DELTA_ROWS rows have
+        changed since it (or rows were deleted) does one worker re-read the
+        table into a new shared version, which every worker then attaches to.
+        Returns whether this worker's claims changed.
+        """
+        store = DataService._shared_store
+        if store is None:
+            return False
+        engine = get_engine()
+        if store.is_dirty():
+            with store.lock(blocking=False) as acquired:
+                # Whoever holds the lock is already checking
+                if acquired and store.is_dirty():
+                    if DataService._write_behind is not None:
+                        DataService._write_behind.flush()
+                    if DataService._shared_delta_too_large(engine):
+                        DataService._publish_shared_claims(engine)
+        if store.current_version() != DataService._shared_version:
+            DataService.load_claims_from_db()
+            return True
+        watermark = DataService._delta_watermark
+        if watermark is None:
+            return False
+        if not DataService._delta_lookback(engine) and DataService._max_change_seq(engine) <= watermark:
+            # Without a lookback window, nothing at or below the watermark can still change
+            return False
+        result = DataService.refresh_delta()
+        return bool(result["updated"] or result["appended"] or result["reloaded"])
+
+    @staticmethod
+    def _shared_delta_too_large(engine) -> bool:
+        """Whether the table has drifted too far from the shared version for deltas.
+
+        Clears the dirty mark first, so writes that land during the check ask again.
+        Callers hold the store lock.
+        """
+        store = DataService._shared_store
+        store.clear_dirty()
+        published = store.current_fingerprint()
+        published_seq = (published or {}).get("max_change_seq")
+        if published_seq is None:
+            return True
+        with engine.connect() as conn:
+            fingerprint = DataService.claims_fingerprint(conn)
+            if fingerprint["columns"] != published["columns"] or fingerprint["rows"] < published["rows"]:
+                # Deletes and schema changes are not visible to the delta
+                return True
+            changed = conn.execute(
+                text("SELECT COUNT(*) FROM claims WHERE change_seq > :seq"), {"seq": published_seq}
+            ).scalar()
+        return int(changed or 0) > SHARED_CLAIMS_MAX_DELTA_ROWS
+
+    @staticmethod
+    async def run_shared_store_watch(interval: float = SHARED_CLAIMS_POLL_INTERVAL) -> None:
+        """Keep this worker on the latest shared claims snapshot."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(DataService.sync_shared_store)
+            except Exception as e:
+                print(f"Error syncing shared claims snapshot: {e}")
     
+    @staticmethod
+    def read_claims_chunked(
+        engine,
+        chunk_rows: int = CLAIMS_LOAD_CHUNK_ROWS,
+        memory_budget_mb: int = CLAIMS_LOAD_MEMORY_BUDGET_MB,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Tuple[pd.DataFrame, pd.Series]:
+        """Stream the claims table into the typed cache layout chunk by chunk.
+
+        Rows are fetched from a server-side cursor and each chunk is typed
+        before the next is read, so only one chunk of raw Python objects is
+        alive at a time. With a memory budget, the fetch size shrinks so that
+        a raw chunk plus the projected typed cache stays within it.
+
+        Returns the typed frame and the raw (untyped) bytes per column.
+        """
+        budget = memory_budget_mb * 1024 * 1024
+        typed_chunks: List[Dict[str, pd.Series]] = []
+        raw_bytes = pd.Series(dtype="int64")
+        typed_bytes = 0
+        peak_bytes = 0
+        loaded = 0
+        fetch_rows = chunk_rows
+
+        with engine.connect() as conn:
+            total = int(conn.execute(text("SELECT COUNT(*) FROM claims")).scalar() or 0)
+            DataService._report_load_progress(0, total, 0, peak_bytes, progress)
+            result = conn.execution_options(stream_results=True).execute(text("SELECT * FROM claims"))
+            columns = list(result.keys())
+            while True:
+                rows = result.fetchmany(fetch_rows)
+                if not rows:
+                    break
+                raw = DataService._ensure_claim_columns(pd.DataFrame.from_records(rows, columns=columns))
+                del rows
+                raw_usage = raw.memory_usage(deep=True, index=False)
+                raw_bytes = raw_bytes.add(raw_usage, fill_value=0)
+                typed = DataService.optimize_claim_dtypes(raw)
+                del raw
+
+                chunk_bytes = int(typed.memory_usage(deep=True, index=False).sum())
+                peak_bytes = max(peak_bytes, typed_bytes + int(raw_usage.sum()) + chunk_bytes)
+                typed_bytes += chunk_bytes
+                loaded += len(typed)
+                chunk_length = len(typed)
+                typed_chunks.append({column: typed[column] for column in typed.columns})
+                del typed
+                DataService._report_load_progress(loaded, total, len(typed_chunks), peak_bytes, progress)
+
+                if budget:
+                    projected_typed = typed_bytes / loaded * max(total, loaded)
+                    # Row tuples and the raw frame are both alive while a chunk is built
+                    raw_row_bytes = 2 * raw_usage.sum() / chunk_length
+                    fit_rows = int((budget - projected_typed) / raw_row_bytes) if raw_row_bytes else chunk_rows
+                    if fit_rows < MIN_LOAD_CHUNK_ROWS and fetch_rows > MIN_LOAD_CHUNK_ROWS:
+                        print(
+                            f"Claims load: typed cache (~{projected_typed / 1e6:.0f} MB) leaves little "
+                            f"room in the {memory_budget_mb} MB budget; fetching {MIN_LOAD_CHUNK_ROWS} rows at a time"
+                        )
+                    fetch_rows = min(chunk_rows, max(MIN_LOAD_CHUNK_ROWS, fit_rows))
+
+        if not typed_chunks:
+            empty = DataService._ensure_claim_columns(pd.DataFrame(columns=columns))
+            return DataService.optimize_claim_dtypes(empty), raw_bytes
+        return DataService._concat_typed_chunks(typed_chunks), raw_bytes
+
+    @staticmethod
+    def claims_fingerprint(conn) -> Dict[str, Any]:
+        """Cheap summary of the claims table used to tell whether a snapshot file is stale.
+
+        Row count and column list, plus the highest rowid on SQLite and the
+        latest updated_at and change_seq when the table has them.
+        """
+        columns = [column["name"] for column in inspect(conn).get_columns("claims")]
+        aggregates = {"rows": "COUNT(*)"}
+        if conn.dialect.name == "sqlite":
+            aggregates["max_rowid"] = "MAX(rowid)"
+        if "updated_at" in columns:
+            aggregates["max_updated_at"] = "MAX(updated_at)"
+        if "change_seq" in columns:
+            aggregates["max_change_seq"] = "MAX(change_seq)"
+        row = conn.execute(text(f"SELECT {', '.join(aggregates.values())} FROM claims")).one()
+        fingerprint: Dict[str, Any] = {"columns": columns}
+        for key, value in zip(aggregates, row):
+            fingerprint[key] = value if value is None or isinstance(value, int) else str(value)
+        return fingerprint
+
+    @staticmethod
+    def save_snapshot_file(df: Optional[pd.DataFrame] = None, fingerprint: Optional[Dict[str, Any]] = None) -> bool:
+        """Write typed claims and the table fingerprint taken when they were read.
+
+        Without arguments, saves the claims as last loaded or delta-refreshed,
+        but only if no write has gone to the table since; a fingerprint taken
+        now could describe rows the cached frame never saw. Returns whether
+        the file is current.
+        """
+        path = DataService._snapshot_file
+        if path is None:
+            return False
+        if (df is None) != (fingerprint is None):
+            raise ValueError("A snapshot file needs the claims together with the fingerprint they were read at")
+        if df is None:
+            if DataService._snapshot_file_current and os.path.exists(path):
+                return True
+            if DataService._snapshot_source is None:
+                return False
+            df, fingerprint = DataService._snapshot_source
+        try:
+            size = write_snapshot(path, df, fingerprint)
+        except (OSError, SnapshotFormatError) as e:
+            print(f"Error writing claims snapshot file: {e}")
+            return False
+        DataService._snapshot_file_current = True
+        print(f"Claims snapshot file written: {len(df)} rows, {size / 1e6:.1f} MB at {path}")
+        return True
+
+    @staticmethod
+    def discard_snapshot_file() -> None:
+        """Delete the snapshot file so the next load reads the database."""
+        DataService._snapshot_file_current = False
+        path = DataService._snapshot_file
+        if path is None:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing claims snapshot file: {e}")
+
+    @staticmethod
+    def _load_snapshot_file(fingerprint: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        path = DataService._snapshot_file
+        stored = read_fingerprint(path)
+        if stored is None:
+            return None
+        if stored != fingerprint:
+            print("Claims snapshot file is stale, loading from the database")
+            return None
+        try:
+            df, _ = read_snapshot(path)
+        except (OSError, ValueError) as e:
+            print(f"Error reading claims snapshot file, loading from the database: {e}")
+            return None
+        DataService._snapshot_file_current = True
+        print(f"Claims cache: {len(df)} rows loaded from snapshot file {path}")
+        return df
+
+    @staticmethod
+    def get_load_progress() -> Optional[Dict[str, Any]]:
+        """Progress of the current (or last) streaming claims load."""
+        return DataService._load_progress
+
+    @staticmethod
+    def _report_load_progress(
+        loaded: int,
+        total: int,
+        chunks: int,
+        peak_bytes: int,
+        progress: Optional[Callable[[int, int], None]],
+    ) -> None:
+        DataService._load_progress = {
+            "rows_loaded": loaded,
+            "total_rows": total,
+            "chunks": chunks,
+            "peak_bytes_estimate": peak_bytes,
+            "done": loaded >= total,
+        }
+        if progress is not None:
+            progress(loaded, total)
+        elif chunks:
+            percent = loaded / total * 100 if total else 100.0
+            print(f"Loading claims: {loaded}/{total} rows ({percent:.0f}%)")
+
+    @staticmethod
+    def _concat_typed_chunks(chunks: List[Dict[str, pd.Series]]) -> pd.DataFrame:
+        """Join typed chunks column by column, merging categorical dictionaries.
+
+        Columns are taken out of the chunks as they are joined, so the chunks
+        and the result are never both held in full.
+        """
+        data: Dict[str, Any] = {}
+        for column in list(chunks[0]):
+            parts = [chunk.pop(column) for chunk in chunks]
+            if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+                categories = parts[0].cat.categories.append(
+                    [part.cat.categories for part in parts[1:]]
+                ).unique()
+                codes = []
+                for part in parts:
+                    # Trailing -1 keeps missing values (code -1) missing
+                    mapping = np.append(categories.get_indexer(part.cat.categories), -1)
+                    codes.append(mapping[part.cat.codes.to_numpy()])
+                data[column] = pd.Categorical.from_codes(np.concatenate(codes), categories=categories)
+            else:
+                data[column] = pd.concat(parts, ignore_index=True)
+        return pd.DataFrame(data)
+
     @staticmethod
     def get_claims() -> pd.DataFrame:
+        """The claims frame of the current snapshot. Treat it as read-only."""
+        return DataService.get_snapshot().claims
+
+    @staticmethod
+    def get_snapshot() -> ClaimsSnapshot:
+        """Current claims snapshot, loading and re-scoring it first if needed.
+
+        The frame and version are read together, so a caller that holds on to
+        a snapshot sees one consistent state regardless of concurrent writes.
+        """
         if DataService._claims_cache is None:
             DataService.load_claims_from_db()
-        return DataService._claims_cache if DataService._claims_cache is not None else pd.DataFrame()
+        df = DataService._claims_cache
+        if df is None or df.empty:
+            return ClaimsSnapshot(DataService._data_version, df if df is not None else pd.DataFrame())
+
+        DataService._ensure_risk_current(df)
+        snapshot = DataService._snapshot
+        if snapshot is None or snapshot.claims is not DataService._claims_cache:
+            # The cache was replaced directly (CSV load, tests); adopt it
+            with DataService._write_lock:
+                snapshot = DataService._snapshot
+                if snapshot is None or snapshot.claims is not DataService._claims_cache:
+                    snapshot = DataService._publish(DataService._claims_cache)
+        return snapshot
+
+    @staticmethod
+    def _publish(df: pd.DataFrame, hash_index: Optional[ClaimHashIndex] = None) -> ClaimsSnapshot:
+        """Make a frame the current snapshot. Callers hold the write lock.
+
+        ``hash_index`` is a hash index that already describes ``df`` (the
+        previous one when the indexed columns are unchanged, or a re-filed
+        copy); a copy of it is published with the new version.
+        """
+        DataService._data_version += 1
+        snapshot = ClaimsSnapshot(DataService._data_version, df)
+        DataService._claims_cache = df
+        DataService._snapshot = snapshot
+        if hash_index is not None:
+            DataService._hash_index = hash_index.copy(snapshot.version)
+        return snapshot
+
+    @staticmethod
+    def materialize_risk_scores(
+        df: pd.DataFrame, now: Optional[datetime] = None, hash_index: Optional[ClaimHashIndex] = None
+    ) -> pd.DataFrame:
+        """Score every claim once and publish the result as the current snapshot.
+
+        The published frame shares the claim columns of ``df`` and adds
+        risk_score, the fired-rule bitmask (_risk_hits) and the claim age the
+        aging rules used (_risk_age_days). ``df`` itself is left unchanged.
+        ``hash_index`` is published with the scores when it already describes ``df``.
+        Scoring runs outside the write lock; if ``df`` is the cache and a writer
+        publishes a newer one meanwhile, the newer one is scored instead.
+        """
+        now = now or datetime.now()
+        ruleset = RiskRuleEngine.get_ruleset()
+        references = DataService.risk_references()
+
+        while True:
+            # A frame replacing the cache (a load or a delta merge) is published as is
+            source = DataService._claims_cache
+            replacing = df is not source
+            scored = df.copy(deep=False)
+            if "claim_date" in scored.columns:
+                scored["_risk_age_days"] = days_since(scored["claim_date"], now)
+            else:
+                scored["_risk_age_days"] = np.nan
+            scores, hits = ruleset.evaluate(scored, now, references)
+            scored["risk_score"] = scores
+            scored["_risk_hits"] = hits
+
+            with DataService._write_lock:
+                if replacing or DataService._claims_cache is source:
+                    DataService._risk_band_counts = np.bincount(risk_band_codes(scores), minlength=len(RISK_BANDS))
+                    DataService._risk_source = scored
+                    DataService._risk_as_of = now.date()
+                    DataService._risk_rules_version = ruleset.version
+                    DataService._risk_provider_ids = references["providers"]
+                    DataService._publish(scored, hash_index=hash_index)
+                    return scored
+                # A write published a newer cache while this one was scored; score that instead
+                df = DataService._claims_cache
+                hash_index = None
+
+    @staticmethod
+    def recompute_risk_aging(now: Optional[datetime] = None) -> int:
+        """Advance materialized scores to a new day.
+
+        Only claims whose age crossed one of the aging rule thresholds since
+        the last pass are re-scored. Returns the number of re-scored claims.
+        """
+        df = DataService._claims_cache
+        if df is None or df.empty or DataService._risk_source is not df:
+            return 0
+
+        now = now or datetime.now()
+        elapsed = (now.date() - DataService._risk_as_of).days
+        if elapsed <= 0:
+            return 0
+
+        ruleset = RiskRuleEngine.get_ruleset()
+        old_age = df["_risk_age_days"].to_numpy(dtype=float)
+        new_age = old_age + elapsed
+        crossed = np.flatnonzero(ruleset.aging_signature(old_age) != ruleset.aging_signature(new_age))
+
+        with DataService._write_lock:
+            if DataService._claims_cache is not df:
+                return 0
+            aged = df.copy(deep=False)
+            aged["_risk_age_days"] = new_age
+            if len(crossed):
+                scores, hits = ruleset.evaluate(df.iloc[crossed], now, DataService.risk_references())
+                risk_scores = df["risk_score"].to_numpy(dtype=float).copy()
+                risk_hits = df["_risk_hits"].to_numpy(dtype=np.int64).copy()
+                DataService._shift_risk_bands(risk_scores[crossed], scores)
+                risk_scores[crossed] = scores
+                risk_hits[crossed] = hits
+                aged["risk_score"] = risk_scores
+                aged["_risk_hits"] = risk_hits
+            DataService._risk_source = aged
+            DataService._risk_as_of = now.date()
+            previous = DataService._snapshot
+            hash_index = DataService._hash_index
+            if hash_index is None or previous is None or hash_index.version != previous.version:
+                hash_index = None
+            snapshot = DataService._publish(aged, hash_index=hash_index)
+            sort_index = DataService._sort_index
+            if sort_index is not None and previous is not None and sort_index.version == previous.version:
+                if len(crossed):
+                    sort_index.orders.pop("risk_score", None)
+                sort_index.version = snapshot.version
+            bitmap_index = DataService._bitmap_index
+            if bitmap_index is not None and previous is not None and bitmap_index.version == previous.version:
+                DataService._bitmap_index = bitmap_index.copy(snapshot.version)
+        return len(crossed)
+
+    @staticmethod
+    def get_data_version() -> int:
+        """Counter that changes whenever the cached claims or their scores change."""
+        return DataService.get_snapshot().version
+
+    @staticmethod
+    def get_score_index(snapshot: Optional[ClaimsSnapshot] = None) -> Optional[SortedScoreIndex]:
+        """Sorted risk scores of a snapshot (the current one by default; None when empty)."""
+        snapshot = snapshot or DataService.get_snapshot()
+        if snapshot.claims.empty:
+            return None
+        with DataService._write_lock:
+            index = DataService._score_index
+            if index is None or index.version != snapshot.version:
+                index = SortedScoreIndex(snapshot.claims, snapshot.version)
+                if snapshot is DataService._snapshot:
+                    DataService._score_index = index
+            return index
+
+    @staticmethod
+    def get_hash_index(snapshot: Optional[ClaimsSnapshot] = None) -> Optional[ClaimHashIndex]:
+        """Claim id and group-column lookups of a snapshot (the current one by default; None when empty)."""
+        snapshot = snapshot or DataService.get_snapshot()
+        if snapshot.claims.empty:
+            return None
+        with DataService._write_lock:
+            index = DataService._hash_index
+            if index is None or index.version != snapshot.version:
+                index = ClaimHashIndex(snapshot.claims, snapshot.version)
+                if snapshot is DataService._snapshot:
+                    DataService._hash_index = index
+            return index
+
+    @staticmethod
+    def get_bitmap_index(snapshot: Optional[ClaimsSnapshot] = None) -> Optional[ClaimBitmapIndex]:
+        """Per-value bitsets of the low-cardinality columns of a snapshot (the current one by default; None when empty)."""
+        snapshot = snapshot or DataService.get_snapshot()
+        if snapshot.claims.empty:
+            return None
+        with DataService._write_lock:
+            index = DataService._bitmap_index
+            if index is None or index.version != snapshot.version:
+                index = ClaimBitmapIndex(snapshot.claims, snapshot.version)
+                if snapshot is DataService._snapshot:
+                    DataService._bitmap_index = index
+            return index
+
+    @staticmethod
+    def get_sort_order(column: str, snapshot: Optional[ClaimsSnapshot] = None) -> SortedPositions:
+        """Row positions of a snapshot (the current one by default) sorted by column.
+
+        Orders for the current snapshot are kept and patched as claims change;
+        a caller holding an older snapshot gets a one-off order for it.
+        """
+        snapshot = snapshot or DataService.get_snapshot()
+        with DataService._write_lock:
+            index = DataService._sort_index
+            if index is None or index.version != snapshot.version:
+                index = ClaimSortIndex(snapshot.version)
+                if snapshot is DataService._snapshot:
+                    DataService._sort_index = index
+            return index.order(snapshot.claims, column)
+
+    @staticmethod
+    def find_claim_position(claim_id: Any, snapshot: Optional[ClaimsSnapshot] = None) -> Optional[int]:
+        """Row position of a claim in a snapshot (the current one by default), or None."""
+        index = DataService.get_hash_index(snapshot)
+        return index.position_of(claim_id) if index is not None else None
+
+    @staticmethod
+    def find_claim_positions(column: str, value: Any, snapshot: Optional[ClaimsSnapshot] = None) -> np.ndarray:
+        """Row positions in a snapshot (the current one by default) whose indexed column equals value."""
+        index = DataService.get_hash_index(snapshot)
+        return index.positions(column, value) if index is not None else np.zeros(0, dtype=np.int64)
+
+    @staticmethod
+    def get_risk_band_counts() -> Dict[str, int]:
+        """Low/medium/high claim counts, maintained incrementally with the cache."""
+        df = DataService.get_claims()
+        counts = DataService._risk_band_counts
+        if df.empty or counts is None:
+            return {band: 0 for band in RISK_BANDS}
+        return {band: int(count) for band, count in zip(RISK_BANDS, counts)}
+
+    @staticmethod
+    def _shift_risk_bands(old_scores: np.ndarray, new_scores: np.ndarray) -> None:
+        counts = DataService._risk_band_counts
+        if counts is None:
+            return
+        size = len(RISK_BANDS)
+        delta = (
+            np.bincount(risk_band_codes(new_scores), minlength=size)
+            - np.bincount(risk_band_codes(old_scores), minlength=size)
+        )
+        DataService._risk_band_counts = counts + delta
+
+    @staticmethod
+    def risk_references() -> Dict[str, FrozenSet[Any]]:
+        """Named value sets that risk rules can refer to as "@name"."""
+        return {"providers": DataService.get_provider_ids()}
+
+    @staticmethod
+    async def run_risk_aging_schedule() -> None:
+        """Re-age materialized risk scores shortly after each local midnight."""
+        while True:
+            now = datetime.now()
+            next_midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+            await asyncio.sleep((next_midnight - now).total_seconds() + 1)
+            try:
+                rescored = await asyncio.to_thread(DataService.recompute_risk_aging)
+                print(f"Daily risk aging re-scored {rescored} claims")
+            except Exception as e:
+                print(f"Error re-aging risk scores: {e}")
+
+    @staticmethod
+    def _ensure_risk_current(df: pd.DataFrame) -> None:
+        if (
+            DataService._risk_source is not df
+            or "_risk_hits" not in df.columns
+            or DataService._risk_rules_version != RiskRuleEngine.get_ruleset().version
+            or DataService._risk_provider_ids is not DataService.get_provider_ids()
+        ):
+            DataService.materialize_risk_scores(df)
+        elif DataService._risk_as_of != date.today():
+            DataService.recompute_risk_aging()
     
     @staticmethod
     def load_providers_from_db() -> pd.DataFrame:
-        engine = create_engine(DATABASE_URL)
+        engine = get_engine()
         try:
             df = pd.read_sql_table('providers', engine)
+            index = DataService._build_provider_index(df)
             DataService._providers_cache = df
+            DataService._provider_index = index
             return df
         except Exception as e:
             print(f"Error loading providers from database: {e}")
@@ -48,10 +1094,45 @@ class DataService:
             DataService.load_providers_from_db()
         return DataService._providers_cache if DataService._providers_cache is not None else pd.DataFrame()
     
+    @staticmethod
+    def get_provider_index() -> ProviderIndex:
+        """Return the provider id/name index for the current providers cache.
+
+        The index is swapped in as a single object so readers never observe a
+        half-built set; it is rebuilt lazily if the cache was replaced directly.
+        """
+        providers_df = DataService.get_providers()
+        index = DataService._provider_index
+        if index is None or index.source is not providers_df:
+            index = DataService._build_provider_index(providers_df)
+            DataService._provider_index = index
+        return index
+
+    @staticmethod
+    def get_provider_ids() -> FrozenSet[Any]:
+        return DataService.get_provider_index().ids
+
+    @staticmethod
+    def _build_provider_index(providers_df: pd.DataFrame) -> ProviderIndex:
+        if providers_df.empty or "id" not in providers_df.columns:
+            return ProviderIndex(providers_df, frozenset(), {})
+
+        ids = providers_df["id"].dropna()
+        names: Dict[Any, str] = {}
+        if "name" in providers_df.columns:
+            named = providers_df.loc[ids.index, "name"]
+            names = {
+                provider_id: name
+                for provider_id, name in zip(ids, named)
+                if not pd.isna(name)
+            }
+        return ProviderIndex(providers_df, frozenset(ids), names)
+
     @staticmethod
     def refresh_cache():
-        DataService.load_claims_from_db()
+        # Providers first: claim risk scores depend on the provider index
         DataService.load_providers_from_db()
+        DataService.load_claims_from_db()
 
     @staticmethod
     def _ensure_claim_columns(df: pd.DataFrame) -> pd.DataFrame:
@@ -67,33 +1148,355 @@ class DataService:
                 df[column] = default
         return df
 
+    @staticmethod
+    def optimize_claim_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+        """Return a copy of a raw claims frame with compact column types.
+
+        Low-cardinality strings become categoricals, dates become datetime64
+        and amounts/ages get fixed-width numeric types. A date column is left
+        untouched if any of its values would not parse.
+        """
+        typed = df.copy()
+        for column in CATEGORY_COLUMNS:
+            if column in typed.columns and not isinstance(typed[column].dtype, pd.CategoricalDtype):
+                typed[column] = typed[column].astype("category")
+        for column in DATE_COLUMNS:
+            if column in typed.columns and not pd.api.types.is_datetime64_any_dtype(typed[column]):
+                raw = typed[column]
+                parsed = pd.to_datetime(raw, errors="coerce", format="ISO8601")
+                present = raw.notna() & (raw.astype(str) != "")
+                if not pd.api.types.is_datetime64_any_dtype(parsed) or (parsed.isna() & present).any():
+                    continue
+                if parsed.dt.tz is not None:
+                    parsed = parsed.dt.tz_convert(None)
+                typed[column] = parsed.astype("datetime64[ns]")
+        for column, dtype in NUMERIC_DTYPES.items():
+            if column in typed.columns:
+                values = pd.to_numeric(typed[column], errors="coerce")
+                if dtype == "Int16":
+                    values = values.round().astype("Int64")
+                typed[column] = values.astype(dtype)
+        return typed
+
+    @staticmethod
+    def memory_report(raw: Union[pd.DataFrame, pd.Series], typed_df: pd.DataFrame) -> Dict[str, Any]:
+        """Per-column and total bytes of a claims frame before and after typing.
+
+        ``raw`` is the untyped frame or its bytes per column.
+        """
+        before = raw.memory_usage(deep=True, index=False) if isinstance(raw, pd.DataFrame) else raw
+        after = typed_df.memory_usage(deep=True, index=False)
+        columns = {
+            column: {
+                "dtype": str(typed_df[column].dtype),
+                "before_bytes": int(before.get(column, 0)),
+                "after_bytes": int(after[column]),
+            }
+            for column in typed_df.columns
+        }
+        return {
+            "rows": len(typed_df),
+            "before_bytes": int(before.sum()),
+            "after_bytes": int(after.sum()),
+            "columns": columns,
+        }
+
+    @staticmethod
+    def get_memory_report() -> Optional[Dict[str, Any]]:
+        """Memory report from the last claims load, if any."""
+        return DataService._memory_report
+
+    @staticmethod
+    def _typed_claims(raw_df: pd.DataFrame) -> pd.DataFrame:
+        df = DataService.optimize_claim_dtypes(raw_df)
+        DataService._record_memory_report(raw_df, df)
+        return df
+
+    @staticmethod
+    def _record_memory_report(raw: Union[pd.DataFrame, pd.Series], typed_df: pd.DataFrame) -> None:
+        report = DataService.memory_report(raw, typed_df)
+        DataService._memory_report = report
+        print(
+            f"Claims cache: {report['rows']} rows, "
+            f"{report['before_bytes'] / 1e6:.1f} MB raw -> {report['after_bytes'] / 1e6:.1f} MB typed"
+        )
+
+    @staticmethod
+    def with_claim_values(df: pd.DataFrame, positions: np.ndarray, updates: Dict[str, Any]) -> pd.DataFrame:
+        """Copy-on-write: a new frame with values set at the given row positions.
+
+        Only the updated columns are copied; all others are shared with ``df``,
+        which is left unchanged. Categoricals are widened for new values.
+        """
+        updated = df.copy(deep=False)
+        for column, value in updates.items():
+            if column in updated.columns:
+                values = updated[column].copy()
+            else:
+                values = pd.Series(None, index=updated.index, dtype=object)
+            if pd.api.types.is_datetime64_any_dtype(values) and isinstance(value, str):
+                value = pd.Timestamp(value)
+            elif (
+                isinstance(values.dtype, pd.CategoricalDtype)
+                and value is not None
+                and not pd.isna(value)
+                and value not in values.cat.categories
+            ):
+                values = values.cat.add_categories([value])
+            values.iloc[positions] = value
+            updated[column] = values
+        return updated
+
+    @staticmethod
+    def with_claim_rows(df: pd.DataFrame, positions: np.ndarray, rows: pd.DataFrame) -> pd.DataFrame:
+        """Copy-on-write: a new frame with whole rows replaced at the given positions.
+
+        Like with_claim_values, but each position gets its own value from
+        ``rows`` (aligned with ``positions``). Only columns with a changed
+        value are copied; the rest stay shared with ``df``, which keeps a
+        memory-mapped shared snapshot mapped instead of private.
+        """
+        updated = df.copy(deep=False)
+        for column in rows.columns:
+            if column not in updated.columns:
+                continue
+            incoming = rows[column]
+            if not DataService._values_differ(updated[column].iloc[positions], incoming).any():
+                continue
+            values = updated[column].copy()
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                new_categories = pd.Index(incoming.dropna().unique()).difference(values.cat.categories)
+                if len(new_categories):
+                    values = values.cat.add_categories(new_categories)
+                values.iloc[positions] = incoming.to_numpy(dtype=object)
+            else:
+                if pd.api.types.is_datetime64_any_dtype(values) and not pd.api.types.is_datetime64_any_dtype(incoming):
+                    incoming = pd.to_datetime(incoming, errors="coerce")
+                values.iloc[positions] = incoming.astype(values.dtype).array
+            updated[column] = values
+        return updated
+
     @staticmethod
     def update_claim_record(claim_id: str, updates: Dict[str, Any]) -> int:
-        """Persist claim updates to the database."""
+        """Persist claim updates to the database, blocking until they commit."""
+        return DataService.submit_claim_record(claim_id, updates).result()
+
+    @staticmethod
+    def submit_claim_record(claim_id: str, updates: Dict[str, Any]) -> "Future[int]":
+        """Persist claim updates; the future resolves to the updated row count.
+
+        With write-behind enabled, updates to cached claims are journaled and
+        written in the next batch; the cache stands in for the row count.
+        """
+        future: "Future[int]" = Future()
         if not updates:
-            return 0
+            future.set_result(0)
+            return future
 
+        queue = DataService._write_behind
+        if (
+            queue is not None
+            and queue.accepts(updates)
+            and DataService.find_claim_position(claim_id) is not None
+        ):
+            queue.enqueue(claim_id, updates)
+            future.set_result(1)
+            return future
+
+        return DataService.submit_claim_update(claim_id, updates)
+
+    @staticmethod
+    def submit_claim_update(claim_id: str, updates: Dict[str, Any]) -> "Future[int]":
+        """Write claim updates; the future resolves to the row count once committed."""
         set_clause = ", ".join(f"{column} = :{column}" for column in updates)
         params = {**updates, "claim_id": claim_id}
 
-        engine = create_engine(DATABASE_URL)
-        with engine.begin() as conn:
+        def apply(conn) -> int:
             result = conn.execute(
                 text(f"UPDATE claims SET {set_clause} WHERE id = :claim_id"),
                 params,
             )
-        return result.rowcount or 0
+            return result.rowcount or 0
+
+        return DataService.submit_write(apply)
 
     @staticmethod
-    def update_claim_cache(claim_id: str, updates: Dict[str, Any]) -> None:
-        """Update the in-memory claims cache with new values."""
-        df = DataService._claims_cache
-        if df is None or df.empty:
-            return
+    def submit_write(fn: WriteFn) -> "Future[Any]":
+        """Run a write transaction, on the writer thread when it is enabled.
+
+        Without the writer thread the write runs inline and the returned
+        future is already resolved.
+        """
+        # Neither the file nor the frame read with it match the table once this commits
+        DataService._snapshot_source = None
+        if DataService._snapshot_file_current:
+            DataService.discard_snapshot_file()
+        writer = DataService._writer
+        if writer is not None and writer.running:
+            future = writer.submit(fn)
+        else:
+            future = Future()
+            try:
+                with get_engine().begin() as conn:
+                    future.set_result(fn(conn))
+            except Exception as e:
+                future.set_exception(e)
+        store = DataService._shared_store
+        if store is not None:
+            # Other workers pick the write up as a delta, or from the next shared version
+            future.add_done_callback(lambda _: store.mark_dirty())
+        return future
+
+    @staticmethod
+    def run_write(fn: WriteFn) -> Any:
+        """Run a write transaction and wait for it to commit."""
+        return DataService.submit_write(fn).result()
+
+    @staticmethod
+    def start_db_writer(max_batch: int = DB_WRITER_MAX_BATCH) -> None:
+        """Send every database write through one dedicated writer thread."""
+        DataService.stop_db_writer()
+        writer = DatabaseWriter(get_engine, max_batch=max_batch)
+        writer.start()
+        DataService._writer = writer
+
+    @staticmethod
+    def stop_db_writer() -> None:
+        """Commit outstanding writes and go back to writing on the caller's thread."""
+        writer = DataService._writer
+        if writer is not None:
+            DataService._writer = None
+            writer.stop()
+
+    @staticmethod
+    def start_write_behind(
+        journal_path: str = WRITE_BEHIND_JOURNAL_PATH,
+        interval: float = WRITE_BEHIND_INTERVAL,
+        max_batch: int = WRITE_BEHIND_MAX_BATCH,
+        max_attempts: int = WRITE_BEHIND_MAX_ATTEMPTS,
+    ) -> int:
+        """Route claim updates through the write-behind queue.
+
+        Replays updates journaled by a previous run first and returns how many
+        claims that restored.
+        """
+        DataService.stop_write_behind()
+        queue = WriteBehindQueue(
+            get_engine,
+            journal_path,
+            interval=interval,
+            max_batch=max_batch,
+            run_write=DataService.run_write,
+            max_attempts=max_attempts,
+        )
+        replayed = queue.start()
+        DataService._write_behind = queue
+        return replayed
+
+    @staticmethod
+    def stop_write_behind() -> None:
+        """Flush queued updates and go back to writing each update directly."""
+        queue = DataService._write_behind
+        if queue is not None:
+            DataService._write_behind = None
+            queue.stop()
+
+    @staticmethod
+    def get_write_metrics() -> Dict[str, Any]:
+        """Queue depth and latency of the write-behind queue and writer thread."""
+        queue = DataService._write_behind
+        writer = DataService._writer
+        return {
+            "write_behind": {"enabled": True, **queue.metrics()} if queue is not None else {"enabled": False},
+            "writer": {"enabled": True, **writer.metrics()} if writer is not None else {"enabled": False},
+        }
+
+    @staticmethod
+    def update_claim_cache(claim_id: str, updates: Dict[str, Any]) -> Optional[ClaimsSnapshot]:
+        """Publish a new snapshot with one claim's values updated.
+
+        Returns the new snapshot, or None if the claim is not cached.
+        """
+        with DataService._write_lock:
+            df = DataService._claims_cache
+            if df is None or df.empty:
+                return None
+            snapshot = DataService._snapshot
+            is_current = snapshot is not None and snapshot.claims is df
+            hash_index = DataService._hash_index
+            if not (is_current and hash_index is not None and hash_index.version == snapshot.version):
+                hash_index = None
+            if hash_index is not None:
+                positions = hash_index.positions("id", claim_id)
+            else:
+                positions = np.flatnonzero((df["id"] == claim_id).to_numpy(dtype=bool, na_value=False))
+            if not len(positions):
+                return None
+
+            risk_current = DataService._risk_source is df
+            if "risk_score" in updates and risk_current:
+                old_scores = df["risk_score"].to_numpy(dtype=float)[positions]
+                new_scores = np.full(len(old_scores), float(updates["risk_score"]))
+                DataService._shift_risk_bands(old_scores, new_scores)
+
+            score_index = DataService._score_index
+            patch_scores = (
+                score_index is not None
+                and is_current
+                and score_index.version == snapshot.version
+                and risk_current
+            )
+            if patch_scores:
+                index_columns = ["risk_score", *SortedScoreIndex.GROUP_COLUMNS]
+                old_rows = df.iloc[positions][[column for column in index_columns if column in df.columns]].to_dict("records")
+
+            if hash_index is not None and any(column in updates for column in ClaimHashIndex.GROUP_COLUMNS):
+                # Readers may still hold the published index, so the moves go into a copy
+                hash_index = hash_index.copy(hash_index.version)
+                for column in ClaimHashIndex.GROUP_COLUMNS:
+                    if column in updates and column in df.columns:
+                        old_values = df[column].to_numpy()[positions]
+                        for position, old_value in zip(positions, old_values):
+                            hash_index.move(int(position), column, old_value, updates[column])
+
+            sort_index = DataService._sort_index
+            if not (is_current and sort_index is not None and sort_index.version == snapshot.version):
+                sort_index = None
+            if sort_index is not None:
+                for column in ClaimSortIndex.COLUMNS:
+                    if column in updates and column in df.columns:
+                        old_values = df[column].to_numpy()[positions]
+                        for position, old_value in zip(positions, old_values):
+                            sort_index.move(int(position), column, claim_id, old_value, updates[column])
+
+            bitmap_index = DataService._bitmap_index
+            if not (is_current and bitmap_index is not None and bitmap_index.version == snapshot.version):
+                bitmap_index = None
+            if bitmap_index is not None:
+                # Readers may still hold the published index, so the moves go into a copy
+                bitmap_index = bitmap_index.copy(bitmap_index.version)
+                for column in ClaimBitmapIndex.COLUMNS:
+                    if column in updates:
+                        old_values = df[column].to_numpy()[positions] if column in df.columns else [None] * len(positions)
+                        for position, old_value in zip(positions, old_values):
+                            bitmap_index.move(int(position), column, old_value, updates[column])
+
+            updated = DataService.with_claim_values(df, positions, updates)
+            if risk_current:
+                DataService._risk_source = updated
+            snapshot = DataService._publish(updated, hash_index=hash_index)
+            if sort_index is not None:
+                sort_index.version = snapshot.version
+            if bitmap_index is not None:
+                bitmap_index.version = snapshot.version
+                DataService._bitmap_index = bitmap_index
 
-        mask = df["id"] == claim_id
-        if mask.any():
-            for column, value in updates.items():
-                if column not in df.columns:
-                    df[column] = None
-                df.loc[mask, column] = value
+            if patch_scores:
+                # Readers may still hold the old index, so the moves go into a copy
+                score_index = score_index.copy(snapshot.version)
+                moved = any(column in updates for column in index_columns)
+                for old_row in old_rows if moved else []:
+                    new_row = {**old_row, **{key: value for key, value in updates.items() if key in index_columns}}
+                    score_index.move(old_row["risk_score"], float(new_row["risk_score"]), old_row, new_row)
+                DataService._score_index = score_index
+            return snapshot
@@ -0,0 +1,147 @@
+"""
+Single-writer thread for database writes.
+
+SQLite allows one writer at a time; concurrent writers end up waiting on its
+file lock and failing with "database is locked". DatabaseWriter funnels every
+write through one thread instead. Callers submit a function of a connection
+and get a Future that resolves once the write has committed. Writes that queue
+up while a transaction is running are committed together in the next one
+(group commit). Reads keep using their own pooled connections.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Connection, Engine
+
+WriteFn = Callable[[Connection], Any]
+
+_STOP = object()
+
+
+class DatabaseWriter:
+    """Runs submitted writes on one thread, in submission order."""
+
+    def __init__(self, get_engine: Callable[[], Engine], max_batch: int = 64):
+        self._get_engine = get_engine
+        self._max_batch = max_batch
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._submitted = 0
+        self._committed = 0
+        self._failed = 0
+        self._transactions = 0
+        self._largest_batch = 0
+        self._last_commit_ms = 0.0
+        self._total_commit_ms = 0.0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="claims-db-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Finish every write submitted so far, then stop the thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def submit(self, fn: WriteFn) -> "Future[Any]":
+        """Queue a write; the future holds fn's return value after commit."""
+        if self._thread is None:
+            raise RuntimeError("Database writer is not running")
+        future: "Future[Any]" = Future()
+        with self._lock:
+            self._submitted += 1
+        self._queue.put((fn, future))
+        return future
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "queue_depth": self._queue.qsize(),
+                "submitted": self._submitted,
+                "committed": self._committed,
+                "failed": self._failed,
+                "transactions": self._transactions,
+                "largest_batch": self._largest_batch,
+                "last_commit_ms": round(self._last_commit_ms, 3),
+                "avg_commit_ms": (
+                    round(self._total_commit_ms / self._transactions, 3) if self._transactions else 0.0
+                ),
+            }
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stopping = False
+            while len(batch) < self._max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._execute(batch)
+            if stopping:
+                return
+
+    def _execute(self, batch: List[Tuple[WriteFn, "Future[Any]"]]) -> None:
+        batch = [(fn, future) for fn, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self._commit([fn for fn, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch[0][1], e)
+                return
+            # One bad write must not sink the others: retry each on its own
+            for fn, future in batch:
+                try:
+                    result = self._commit([fn])[0]
+                except Exception as single_error:
+                    self._fail(future, single_error)
+                else:
+                    self._succeed(future, result)
+            return
+        for (_, future), result in zip(batch, results):
+            self._succeed(future, result)
+
+    def _commit(self, fns: List[WriteFn]) -> List[Any]:
+        started = time.perf_counter()
+        with self._get_engine().begin() as conn:
+            results = [fn(conn) for fn in fns]
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._transactions += 1
+            self._largest_batch = max(self._largest_batch, len(fns))
+            self._last_commit_ms = elapsed_ms
+            self._total_commit_ms += elapsed_ms
+        return results
+
+    def _succeed(self, future: "Future[Any]", result: Any) -> None:
+        with self._lock:
+            self._committed += 1
+        future.set_result(result)
+
+    def _fail(self, future: "Future[Any]", error: BaseException) -> None:
+        with self._lock:
+            self._failed += 1
+        future.set_exception(error)
@@ -0,0 +1,25 @@
+import base64
+import json
+from typing import Any, List
+
+import numpy as np
+
+
+def encode_cursor(*parts: Any) -> str:
+    """Pack keyset values into an opaque, URL-safe cursor string."""
+    # Values read out of frames and indexes may be numpy scalars, which json cannot encode
+    values = [part.item() if isinstance(part, np.generic) else part for part in parts]
+    payload = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Unpack a cursor produced by encode_cursor, validating its arity."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if not isinstance(parts, list) or len(parts) != size:
+        raise ValueError("Malformed cursor")
+    return parts
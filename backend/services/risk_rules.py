@@ -0,0 +1,378 @@
+"""
+Declarative risk rules for ClaimsIQ.
+
+Rules are defined in a JSON file (backend/risk_rules.json by default, or
+RISK_RULES_PATH) and compiled into NumPy mask expressions that score a whole
+claims frame in one vectorized pass. The file is re-read whenever it changes
+on disk, so the risk team can tune thresholds without a deploy.
+
+Rule fields:
+    id      unique rule name
+    field   claim column, or the derived "claim_age_days"
+    op      gt, gte, lt, lte, eq, ne, in, not_in
+    value   comparison value; "@providers" refers to the known provider ids
+    weight  score contribution, in hundredths precision
+    group   optional; only the first matching rule of a group counts
+    label   optional reason shown to adjudicators when the rule fires
+    where   optional list of extra {field, op, value} conditions that must
+            also hold; a zero-weight rule with a where clause only adds a label
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.config import RISK_RULES_PATH
+
+NS_PER_DAY = 86_400_000_000_000
+AGE_FIELD = "claim_age_days"
+MAX_RULES = 63
+
+# Score cutoffs for the low / medium / high risk bands shown on the dashboard
+MEDIUM_RISK_THRESHOLD = 0.4
+HIGH_RISK_THRESHOLD = 0.7
+RISK_BANDS = ("low", "medium", "high")
+
+NUMERIC_OPS = {
+    "gt": np.greater,
+    "gte": np.greater_equal,
+    "lt": np.less,
+    "lte": np.less_equal,
+}
+VALUE_OPS = {"eq", "ne", "in", "not_in"}
+
+
+class RiskRuleError(ValueError):
+    """Raised when a risk rule definition is invalid."""
+
+
+class RiskCondition(NamedTuple):
+    field: str
+    op: str
+    value: Any
+
+
+class RiskRule(NamedTuple):
+    id: str
+    field: str
+    op: str
+    value: Any
+    points: int
+    group: Optional[str]
+    label: Optional[str]
+    where: Tuple[RiskCondition, ...] = ()
+
+
+def risk_band_codes(scores: np.ndarray) -> np.ndarray:
+    """Index into RISK_BANDS for each score."""
+    return np.searchsorted([MEDIUM_RISK_THRESHOLD, HIGH_RISK_THRESHOLD], scores, side="right")
+
+
+def days_since(claim_dates: pd.Series, now: datetime) -> np.ndarray:
+    """Whole days elapsed since each claim date (floored like timedelta.days).
+
+    Unparseable or missing dates yield NaN so no aging rule fires for them.
+    """
+    if pd.api.types.is_datetime64_any_dtype(claim_dates):
+        parsed = claim_dates
+    else:
+        parsed = pd.to_datetime(claim_dates, errors="coerce", format="ISO8601")
+        # Anything the ISO fast path could not read is parsed element-wise
+        retry = parsed.isna() & claim_dates.notna() & (claim_dates.astype(str) != "")
+        if retry.any():
+            parsed = parsed.astype("datetime64[ns]")
+            parsed[retry] = pd.to_datetime(claim_dates[retry], errors="coerce", format="mixed")
+    if getattr(parsed.dt, "tz", None) is not None:
+        parsed = parsed.dt.tz_convert(None)
+
+    values = parsed.to_numpy(dtype="datetime64[ns]")
+    valid = ~np.isnat(values)
+    now_ns = np.datetime64(now, "ns").view(np.int64)
+
+    days = np.full(len(values), np.nan)
+    days[valid] = np.floor_divide(now_ns - values.view(np.int64)[valid], NS_PER_DAY)
+    return days
+
+
+class CompiledRuleSet:
+    """An immutable, compiled set of risk rules."""
+
+    def __init__(self, rules: List[RiskRule], max_points: int, version: int):
+        self.rules = rules
+        self.max_points = max_points
+        self.version = version
+        self.labels = [rule.label for rule in rules]
+        self.age_rules = [rule for rule in rules if rule.field == AGE_FIELD]
+        self._masks = [_compile_mask(rule) for rule in rules]
+
+    def evaluate(
+        self,
+        claims_df: pd.DataFrame,
+        now: datetime,
+        references: Dict[str, FrozenSet[Any]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Score claims and report which rules fired.
+
+        Returns (scores, hits) where hits is an int64 bitmask with bit i set
+        when rule i fired (zero-weight rules fire for their label only).
+        """
+        n = len(claims_df)
+        points = np.zeros(n, dtype=np.int64)
+        hits = np.zeros(n, dtype=np.int64)
+        if n == 0:
+            return points.astype(float), hits
+
+        columns = _RuleColumns(claims_df, now)
+        taken: Dict[str, np.ndarray] = {}
+        for bit, (rule, mask_fn) in enumerate(zip(self.rules, self._masks)):
+            fired = mask_fn(columns, references)
+            if rule.group is not None:
+                claimed = taken.setdefault(rule.group, np.zeros(n, dtype=bool))
+                fired &= ~claimed
+                claimed |= fired
+            points += np.where(fired, rule.points, 0)
+            hits |= np.where(fired, np.int64(1) << bit, 0)
+
+        return np.minimum(points, self.max_points) / 100, hits
+
+    def labels_for(self, hits: int) -> List[str]:
+        """Decode a rule-hit bitmask into reason labels, in rule order."""
+        return [
+            label
+            for bit, label in enumerate(self.labels)
+            if label and hits >> bit & 1
+        ]
+
+    def rule_ids_for(self, hits: int) -> List[str]:
+        """Decode a rule-hit bitmask into rule ids, in rule order."""
+        return [rule.id for bit, rule in enumerate(self.rules) if hits >> bit & 1]
+
+    def bits_for(self, rule_ids: List[str]) -> int:
+        """Bitmask selecting the given rule ids."""
+        positions = {rule.id: bit for bit, rule in enumerate(self.rules)}
+        mask = 0
+        for rule_id in rule_ids:
+            if rule_id not in positions:
+                raise RiskRuleError(f"Unknown risk rule '{rule_id}'. Known rules: {sorted(positions)}")
+            mask |= 1 << positions[rule_id]
+        return mask
+
+    def aging_signature(self, age_days: np.ndarray) -> np.ndarray:
+        """Encode which age-based rules hold for each age, for crossing checks."""
+        signature = np.zeros(len(age_days), dtype=np.int64)
+        for bit, rule in enumerate(self.age_rules):
+            held = NUMERIC_OPS[rule.op](age_days, rule.value)
+            signature |= np.where(held, np.int64(1) << bit, 0)
+        return signature
+
+
+class _RuleColumns:
+    """Lazily prepared column views shared by all rules in one evaluation."""
+
+    def __init__(self, claims_df: pd.DataFrame, now: datetime):
+        self.claims_df = claims_df
+        self.now = now
+        self._numeric: Dict[str, np.ndarray] = {}
+
+    def series(self, field: str) -> Optional[pd.Series]:
+        if field in self.claims_df.columns:
+            return self.claims_df[field]
+        return None
+
+    def numeric(self, field: str) -> np.ndarray:
+        if field not in self._numeric:
+            if field == AGE_FIELD:
+                claim_dates = self.series("claim_date")
+                values = (
+                    days_since(claim_dates, self.now)
+                    if claim_dates is not None
+                    else np.full(len(self.claims_df), np.nan)
+                )
+            else:
+                series = self.series(field)
+                values = (
+                    pd.to_numeric(series, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+                    if series is not None
+                    else np.full(len(self.claims_df), np.nan)
+                )
+            self._numeric[field] = values
+        return self._numeric[field]
+
+
+def _compile_mask(rule: RiskRule) -> Callable[[_RuleColumns, Dict[str, FrozenSet[Any]]], np.ndarray]:
+    masks = [_compile_condition(RiskCondition(rule.field, rule.op, rule.value))]
+    masks.extend(_compile_condition(condition) for condition in rule.where)
+    if len(masks) == 1:
+        return masks[0]
+
+    def all_mask(columns, references):
+        fired = masks[0](columns, references)
+        for mask_fn in masks[1:]:
+            fired = fired & mask_fn(columns, references)
+        return fired
+
+    return all_mask
+
+
+def _compile_condition(condition: RiskCondition) -> Callable[[_RuleColumns, Dict[str, FrozenSet[Any]]], np.ndarray]:
+    if condition.op in NUMERIC_OPS:
+        compare = NUMERIC_OPS[condition.op]
+
+        def numeric_mask(columns, references):
+            return compare(columns.numeric(condition.field), condition.value)
+
+        return numeric_mask
+
+    def value_mask(columns, references):
+        series = columns.series(condition.field)
+        if series is None:
+            return np.zeros(len(columns.claims_df), dtype=bool)
+
+        if condition.op in ("eq", "ne"):
+            equal = series.eq(condition.value).to_numpy(dtype=bool, na_value=False)
+            if condition.op == "eq":
+                return equal
+            return series.notna().to_numpy(dtype=bool) & ~equal
+
+        if isinstance(condition.value, str):
+            values = references.get(condition.value[1:], frozenset())
+            if not values:
+                # An empty reference set means the data is unavailable, not that
+                # every claim is outside it
+                return np.zeros(len(series), dtype=bool)
+        else:
+            values = condition.value
+        member = series.isin(values).to_numpy(dtype=bool)
+        if condition.op == "in":
+            return member
+        present = series.notna().to_numpy(dtype=bool) & (series.astype(str) != "").to_numpy(dtype=bool)
+        return present & ~member
+
+    return value_mask
+
+
+def compile_rules(definition: Dict[str, Any], version: int = 0) -> CompiledRuleSet:
+    """Validate a rule-file definition and compile it."""
+    if not isinstance(definition, dict) or not isinstance(definition.get("rules"), list):
+        raise RiskRuleError("Rule definition must be an object with a 'rules' list")
+
+    raw_rules = definition["rules"]
+    if len(raw_rules) > MAX_RULES:
+        raise RiskRuleError(f"At most {MAX_RULES} rules are supported")
+
+    rules: List[RiskRule] = []
+    seen_ids = set()
+    for raw in raw_rules:
+        try:
+            rule_id = str(raw["id"])
+            field = str(raw["field"])
+            op = str(raw["op"])
+            value = raw["value"]
+            weight = float(raw["weight"])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise RiskRuleError(f"Invalid rule {raw!r}: {exc}") from exc
+
+        if rule_id in seen_ids:
+            raise RiskRuleError(f"Duplicate rule id '{rule_id}'")
+        seen_ids.add(rule_id)
+
+        value = _check_condition(rule_id, field, op, value)
+
+        raw_where = raw.get("where") or []
+        if not isinstance(raw_where, list):
+            raise RiskRuleError(f"Rule '{rule_id}' needs a list of conditions for 'where'")
+        where: List[RiskCondition] = []
+        for condition in raw_where:
+            try:
+                where_field = str(condition["field"])
+                where_op = str(condition["op"])
+                where_value = condition["value"]
+            except (KeyError, TypeError) as exc:
+                raise RiskRuleError(f"Invalid condition {condition!r} in rule '{rule_id}': {exc}") from exc
+            if where_field == AGE_FIELD:
+                # Aging re-scores only claims whose primary age comparison flips
+                raise RiskRuleError(f"Rule '{rule_id}' must compare {AGE_FIELD} as its main field")
+            where.append(
+                RiskCondition(where_field, where_op, _check_condition(rule_id, where_field, where_op, where_value))
+            )
+
+        rules.append(
+            RiskRule(
+                id=rule_id,
+                field=field,
+                op=op,
+                value=value,
+                points=int(round(weight * 100)),
+                group=raw.get("group"),
+                label=raw.get("label"),
+                where=tuple(where),
+            )
+        )
+
+    max_points = int(round(float(definition.get("max_score", 1.0)) * 100))
+    return CompiledRuleSet(rules, max_points, version)
+
+
+def _check_condition(rule_id: str, field: str, op: str, value: Any) -> Any:
+    """Validate one comparison and return its value in compiled form."""
+    if op not in NUMERIC_OPS and op not in VALUE_OPS:
+        raise RiskRuleError(f"Rule '{rule_id}' has unsupported op '{op}'")
+    if op in NUMERIC_OPS and not isinstance(value, (int, float)):
+        raise RiskRuleError(f"Rule '{rule_id}' needs a numeric value for '{op}'")
+    if field == AGE_FIELD and op not in NUMERIC_OPS:
+        raise RiskRuleError(f"Rule '{rule_id}' must compare {AGE_FIELD} numerically")
+    if op in ("in", "not_in"):
+        if isinstance(value, str):
+            if not value.startswith("@"):
+                raise RiskRuleError(f"Rule '{rule_id}' needs a list or @reference value")
+        elif isinstance(value, list):
+            value = frozenset(value)
+        else:
+            raise RiskRuleError(f"Rule '{rule_id}' needs a list or @reference value")
+    return value
+
+
+class RiskRuleEngine:
+    """Loads the rule file and hot-reloads it when it changes on disk."""
+
+    _ruleset: Optional[CompiledRuleSet] = None
+    _path: str = RISK_RULES_PATH
+    _mtime_ns: Optional[int] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_ruleset() -> CompiledRuleSet:
+        """Return the compiled rules, reloading them if the file changed."""
+        try:
+            mtime_ns = os.stat(RiskRuleEngine._path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+
+        ruleset = RiskRuleEngine._ruleset
+        if ruleset is not None and (mtime_ns is None or mtime_ns == RiskRuleEngine._mtime_ns):
+            return ruleset
+
+        with RiskRuleEngine._lock:
+            if RiskRuleEngine._ruleset is not None and mtime_ns == RiskRuleEngine._mtime_ns:
+                return RiskRuleEngine._ruleset
+            try:
+                RiskRuleEngine._ruleset = RiskRuleEngine.load(RiskRuleEngine._path)
+            except (OSError, ValueError) as e:
+                if RiskRuleEngine._ruleset is None:
+                    raise
+                print(f"Error reloading risk rules, keeping previous rules: {e}")
+            RiskRuleEngine._mtime_ns = mtime_ns
+            return RiskRuleEngine._ruleset
+
+    @staticmethod
+    def load(path: str) -> CompiledRuleSet:
+        with open(path, "r", encoding="utf-8") as handle:
+            definition = json.load(handle)
+        previous = RiskRuleEngine._ruleset
+        version = previous.version + 1 if previous is not None else 1
+        return compile_rules(definition, version)
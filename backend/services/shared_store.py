@@ -0,0 +1,122 @@
+"""
+Claims snapshot shared by every API worker process on one host.
+
+One worker at a time (holding an flock on the store directory) loads the
+claims table and publishes it as a numbered snapshot file (see
+snapshot_file.py). Every worker, the publisher included, then memory-maps
+that file read-only, so the fixed-width columns live once in the page cache
+however many workers there are. A version file names the current snapshot;
+workers poll it and attach to newer versions as they appear.
+
+Workers that write claims mark the store dirty after the write commits.
+Every worker folds changed rows into its own cache by change_seq, so a write
+costs each worker a delta, not a reload. Only when the table has drifted too
+far from the current version (or lost rows) does the next worker to take the
+lock re-read it and publish a new version that includes everyone's writes.
+"""
+
+import contextlib
+import glob
+import os
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from backend.services.snapshot_file import read_fingerprint, read_snapshot, write_snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Published versions kept on disk; older ones go once workers have had time to move on
+KEEP_VERSIONS = 2
+
+
+class SharedClaimsStore:
+    """Versioned, memory-mapped claims snapshots in one directory."""
+
+    def __init__(self, directory: str):
+        if fcntl is None:
+            raise RuntimeError("The shared claims store needs fcntl file locks (not available on Windows)")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._version_path = os.path.join(directory, "version")
+        self._dirty_path = os.path.join(directory, "dirty")
+        self._lock_path = os.path.join(directory, "lock")
+
+    @contextlib.contextmanager
+    def lock(self, blocking: bool = True) -> Iterator[bool]:
+        """Hold the publisher lock. Yields False if non-blocking and it is taken."""
+        with open(self._lock_path, "a") as handle:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(handle.fileno(), flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def current_version(self) -> int:
+        try:
+            with open(self._version_path, "r", encoding="utf-8") as handle:
+                return int(handle.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def current_fingerprint(self) -> Optional[Dict[str, Any]]:
+        version = self.current_version()
+        return read_fingerprint(self._snapshot_path(version)) if version else None
+
+    def publish(self, df: pd.DataFrame, fingerprint: Dict[str, Any]) -> int:
+        """Write a new version and make it current. Callers hold the lock."""
+        version = self.current_version() + 1
+        write_snapshot(self._snapshot_path(version), df, fingerprint)
+        tmp_path = f"{self._version_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            handle.write(str(version))
+        os.replace(tmp_path, self._version_path)
+
+        for path in glob.glob(os.path.join(glob.escape(self.directory), "claims-*.snapshot")):
+            try:
+                stale = int(os.path.basename(path)[len("claims-"):-len(".snapshot")]) <= version - KEEP_VERSIONS
+            except ValueError:
+                continue
+            if stale:
+                # Workers still mapping it keep their pages until they move on
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+        return version
+
+    def attach(self) -> Optional[Tuple[int, pd.DataFrame, Dict[str, Any]]]:
+        """Map the current version read-only: (version, frame, fingerprint), or None."""
+        for _ in range(3):
+            version = self.current_version()
+            if not version:
+                return None
+            try:
+                df, fingerprint = read_snapshot(self._snapshot_path(version))
+            except FileNotFoundError:
+                # Superseded and cleaned up between reading the version and the file
+                continue
+            return version, df, fingerprint
+        return None
+
+    def mark_dirty(self) -> None:
+        """Ask for a republish because the table changed."""
+        with open(self._dirty_path, "a"):
+            pass
+
+    def is_dirty(self) -> bool:
+        return os.path.exists(self._dirty_path)
+
+    def clear_dirty(self) -> None:
+        """Called by the publisher before it re-reads the table."""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._dirty_path)
+
+    def _snapshot_path(self, version: int) -> str:
+        return os.path.join(self.directory, f"claims-{version:08d}.snapshot")
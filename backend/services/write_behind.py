@@ -0,0 +1,332 @@
+"""
+Write-behind persistence for claim updates.
+
+Updates are acknowledged once they are appended (and fsynced) to a local
+journal. A background thread later writes them to the database in batches:
+updates to the same claim are merged, then applied with one executemany per
+column set inside a single transaction. A journal segment is deleted once its
+batch commits, or once the updates that failed are carried into the live
+journal; any that remain are replayed on startup, so an acknowledged update
+is never lost on a crash. An update the database keeps rejecting is moved to
+a dead-letter file (the journal path plus ".dead") after max_attempts tries.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+
+class WriteBehindQueue:
+    """Coalescing, journaled queue of claim column updates."""
+
+    def __init__(
+        self,
+        get_engine: Callable[[], Engine],
+        journal_path: str,
+        interval: float = 0.25,
+        max_batch: int = 500,
+        fsync: bool = True,
+        run_write: Optional[Callable[[Callable[[Connection], Any]], Any]] = None,
+        max_attempts: int = 5,
+    ):
+        self._get_engine = get_engine
+        self._run_write = run_write
+        self._journal_path = journal_path
+        self._dead_letter_path = f"{journal_path}.dead"
+        self._interval = interval
+        self._max_batch = max_batch
+        self._fsync = fsync
+        self._max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._attempts: Dict[str, int] = {}
+        self._journal = None
+        self._segments: List[str] = []
+        self._segment_seq = 0
+        self._columns: Optional[FrozenSet[str]] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._enqueued = 0
+        self._coalesced = 0
+        self._flushes = 0
+        self._flushed_rows = 0
+        self._failed_flushes = 0
+        self._dead_lettered = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self) -> int:
+        """Replay any leftover journal, then start the flush thread.
+
+        Returns the number of claims restored from the journal.
+        """
+        replayed = self.replay()
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="claims-write-behind", daemon=True)
+        self._thread.start()
+        return replayed
+
+    def stop(self) -> None:
+        """Stop the flush thread and write out everything still pending."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def enqueue(self, claim_id: str, updates: Dict[str, Any]) -> None:
+        """Durably record an update; it reaches the database on the next flush."""
+        line = json.dumps({"id": claim_id, "updates": updates}, default=str)
+        with self._lock:
+            if self._journal is None:
+                raise RuntimeError("Write-behind queue is not running")
+            self._journal.write(line + "\n")
+            self._journal.flush()
+            if self._fsync:
+                os.fsync(self._journal.fileno())
+
+            merged = self._pending.get(claim_id)
+            if merged is None:
+                self._pending[claim_id] = dict(updates)
+            else:
+                merged.update(updates)
+                self._coalesced += 1
+            self._enqueued += 1
+            depth = len(self._pending)
+        if depth >= self._max_batch:
+            self._wake.set()
+
+    def accepts(self, updates: Dict[str, Any]) -> bool:
+        """Whether every updated column exists in the claims table.
+
+        Anything else would fail at flush time, after it was acknowledged, so
+        callers should write it directly instead.
+        """
+        if self._columns is None:
+            self._columns = frozenset(
+                column["name"] for column in inspect(self._get_engine()).get_columns("claims")
+            )
+        return all(column in self._columns for column in updates)
+
+    def flush(self) -> int:
+        """Write all pending updates in one transaction. Returns claims written.
+
+        If the transaction fails, each claim is retried on its own. Claims
+        that still fail stay queued and are journaled again for the next
+        flush; after max_attempts failures while the database is taking
+        writes, a claim's update is moved to the dead-letter file instead.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._rotate_journal()
+                segments = list(self._segments)
+
+            started = time.perf_counter()
+            failed: Dict[str, Dict[str, Any]] = {}
+            errors: Dict[str, str] = {}
+            try:
+                self._write(batch)
+            except Exception as e:
+                error = e
+                for claim_id, updates in batch.items():
+                    try:
+                        self._write({claim_id: updates})
+                    except Exception as claim_error:
+                        failed[claim_id] = updates
+                        errors[claim_id] = str(claim_error)
+                        error = claim_error
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            written = len(batch) - len(failed)
+            # An outage fails every claim; only count attempts the database itself rejected
+            counted = bool(failed) and (written > 0 or self._database_reachable())
+
+            with self._lock:
+                dead: Dict[str, Dict[str, Any]] = {}
+                for claim_id in batch:
+                    if claim_id not in failed:
+                        self._attempts.pop(claim_id, None)
+                for claim_id, updates in failed.items():
+                    attempts = self._attempts.get(claim_id, 0) + int(counted)
+                    if attempts >= self._max_attempts:
+                        self._attempts.pop(claim_id, None)
+                        dead[claim_id] = updates
+                        continue
+                    self._attempts[claim_id] = attempts
+                    # Newer updates queued meanwhile win over the failed ones
+                    self._pending[claim_id] = {**updates, **self._pending.get(claim_id, {})}
+                if dead:
+                    self._write_dead_letters(dead, errors)
+                retried = [claim_id for claim_id in failed if claim_id not in dead]
+                # While stopped there is no live journal, so the segments keep the retried updates
+                drop_segments = not retried or self._journal is not None
+                if retried and drop_segments:
+                    # Carry what is still queued into the live journal so the flushed segments can go
+                    for claim_id in retried:
+                        entry = {"id": claim_id, "updates": self._pending[claim_id]}
+                        self._journal.write(json.dumps(entry, default=str) + "\n")
+                    self._journal.flush()
+                    if self._fsync:
+                        os.fsync(self._journal.fileno())
+                if drop_segments:
+                    self._segments = [segment for segment in self._segments if segment not in segments]
+                if failed:
+                    self._failed_flushes += 1
+                if written:
+                    self._flushes += 1
+                    self._flushed_rows += written
+                    self._last_flush_ms = elapsed_ms
+                    self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+                    self._total_flush_ms += elapsed_ms
+
+            if drop_segments:
+                for segment in segments:
+                    try:
+                        os.remove(segment)
+                    except OSError:
+                        pass
+            if dead:
+                print(f"Moved {len(dead)} claim updates to {self._dead_letter_path} after {self._max_attempts} failed attempts")
+            if len(failed) > len(dead):
+                print(f"Error flushing {len(failed) - len(dead)} queued claim updates, will retry: {error}")
+            return written
+
+    def replay(self) -> int:
+        """Re-queue and flush updates journaled by a previous process.
+
+        Returns the number of claims restored. Updates that cannot be written
+        yet stay queued and journaled rather than failing startup.
+        """
+        paths = sorted(
+            (
+                path for path in glob.glob(f"{glob.escape(self._journal_path)}.*")
+                if path != self._dead_letter_path
+            ),
+            key=_segment_order,
+        )
+        if os.path.exists(self._journal_path):
+            paths.append(self._seal_journal())
+
+        batch: Dict[str, Dict[str, Any]] = {}
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line was never acknowledged
+                        continue
+                    batch.setdefault(entry["id"], {}).update(entry["updates"])
+        if not batch:
+            for path in paths:
+                os.remove(path)
+            return 0
+
+        with self._lock:
+            for claim_id, updates in batch.items():
+                self._pending[claim_id] = {**updates, **self._pending.get(claim_id, {})}
+            self._segments.extend(paths)
+        self.flush()
+        return len(batch)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "queue_depth": len(self._pending),
+                "enqueued": self._enqueued,
+                "coalesced": self._coalesced,
+                "flushes": self._flushes,
+                "flushed_rows": self._flushed_rows,
+                "failed_flushes": self._failed_flushes,
+                "dead_lettered": self._dead_lettered,
+                "last_flush_ms": round(self._last_flush_ms, 3),
+                "max_flush_ms": round(self._max_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self._flushes, 3) if self._flushes else 0.0,
+                "journal_segments": len(self._segments),
+            }
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            self.flush()
+
+    def _rotate_journal(self) -> None:
+        """Seal the current journal as a segment covering the batch being flushed."""
+        if self._journal is None:
+            return
+        self._journal.close()
+        self._segments.append(self._seal_journal())
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+
+    def _seal_journal(self) -> str:
+        self._segment_seq += 1
+        segment = f"{self._journal_path}.{time.time_ns()}-{self._segment_seq}"
+        os.replace(self._journal_path, segment)
+        return segment
+
+    def _write_dead_letters(self, dead: Dict[str, Dict[str, Any]], errors: Dict[str, str]) -> None:
+        """Durably set aside updates that will not be retried. Callers hold the lock."""
+        with open(self._dead_letter_path, "a", encoding="utf-8") as handle:
+            for claim_id, updates in dead.items():
+                entry = {"id": claim_id, "updates": updates, "error": errors.get(claim_id)}
+                handle.write(json.dumps(entry, default=str) + "\n")
+            handle.flush()
+            if self._fsync:
+                os.fsync(handle.fileno())
+        self._dead_lettered += len(dead)
+
+    def _database_reachable(self) -> bool:
+        try:
+            with self._get_engine().connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
+    def _write(self, batch: Dict[str, Dict[str, Any]]) -> None:
+        statements: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for claim_id, updates in batch.items():
+            columns = tuple(sorted(updates))
+            statements.setdefault(columns, []).append({**updates, "claim_id": claim_id})
+
+        def apply(conn: Connection) -> None:
+            for columns, rows in statements.items():
+                set_clause = ", ".join(f"{column} = :{column}" for column in columns)
+                conn.execute(text(f"UPDATE claims SET {set_clause} WHERE id = :claim_id"), rows)
+
+        if self._run_write is not None:
+            self._run_write(apply)
+            return
+        with self._get_engine().begin() as conn:
+            apply(conn)
+
+
+def _segment_order(path: str) -> Tuple[int, int]:
+    stamp, _, seq = path.rsplit(".", 1)[-1].partition("-")
+    try:
+        return int(stamp), int(seq or 0)
+    except ValueError:
+        return 0, 0
@@ -25,7 +25,7 @@ def enhanced_pagination() -> rx.Component:
         rx.hstack(
             # Results count
             rx.text(
-                f"Showing {ClaimsState.page_start}-{ClaimsState.page_end} of {ClaimsState.sorted_claims.length()} claims",
+                f"Showing {ClaimsState.page_start}-{ClaimsState.page_end} of {ClaimsState.claims_total} claims",
                 size="2",
                 color=COLORS["gray_700"],
                 weight="medium",
@@ -134,7 +134,7 @@ def page_size_selector() -> rx.Component:
         rx.select(
             ["25", "50", "100"],
             value=str(ClaimsState.page_size),
-            on_change=lambda value: setattr(ClaimsState, 'page_size', int(value)),
+            on_change=ClaimsState.set_page_size,
             size="2",
             aria_label="Select page size",
         ),
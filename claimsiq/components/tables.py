@@ -308,7 +308,7 @@ def claims_table() -> rx.Component:
                         # Pagination
                         rx.hstack(
                             rx.text(
-                                f"Showing {ClaimsState.page_start} to {ClaimsState.page_end} of {ClaimsState.sorted_claims.length()}",
+                                f"Showing {ClaimsState.page_start} to {ClaimsState.page_end} of {ClaimsState.claims_total}",
                                 size="2",
                                 color=COLORS["gray_500"],
                                 weight="medium",
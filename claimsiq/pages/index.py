@@ -558,7 +558,7 @@ def index() -> rx.Component:
                     rx.box(
                         dark_section_header(
                             "Claims Queue",
-                            f"Processing {ClaimsState.sorted_claims.length()} claims",
+                            f"Processing {ClaimsState.claims_total} claims",
                             "list",
                         ),
 
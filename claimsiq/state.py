@@ -58,6 +58,9 @@ class ClaimsState(rx.State):
     current_page: int = 1
     page_size: int = 25
     total_pages: int = 1
+    claims_total: int = 0
+    # Keyset cursor each page was fetched with ("" means by offset)
+    page_cursors: list[str] = []
 
     # Search
     search_query: str = ""
@@ -119,9 +122,14 @@ class ClaimsState(rx.State):
     async def load_claims(self):
         self.is_loading_claims = True
         try:
+            if self.current_page == 1:
+                self.page_cursors = [""]
+            page_index = self.current_page - 1
+            after = self.page_cursors[page_index] if page_index < len(self.page_cursors) else ""
             params = {
-                "limit": 100,
-                "offset": 0,
+                "limit": self.page_size,
+                "sort": self.sort_column,
+                "direction": self.sort_direction,
                 "time_range": self.time_range if self.time_range else None,
                 "date_start": self.date_start if self.date_start else None,
                 "date_end": self.date_end if self.date_end else None,
@@ -130,6 +138,17 @@ class ClaimsState(rx.State):
                 params["status"] = self.selected_status
             if self.risk_filters:
                 params["risk_levels"] = ",".join(self.risk_filters)
+            if self.amount_min > 0.0:
+                params["amount_min"] = self.amount_min
+            if self.amount_max < 100000.0:
+                params["amount_max"] = self.amount_max
+            if self.search_query.strip():
+                params["search"] = self.search_query.strip()
+            if after:
+                params["after"] = after
+            else:
+                # Pages reached by a jump have no cursor yet
+                params["offset"] = page_index * self.page_size
             # Remove None values to avoid sending them
             params = {k: v for k, v in params.items() if v is not None}
 
@@ -139,6 +158,11 @@ class ClaimsState(rx.State):
                     data = response.json()
                     raw_claims = data.get("claims", [])
                     self.claims_data = [self._normalize_claim(raw) for raw in raw_claims]
+                    self.claims_total = data.get("total", 0)
+                    self.total_pages = max(1, (self.claims_total + self.page_size - 1) // self.page_size)
+                    cursors = self.page_cursors[:self.current_page]
+                    cursors += [""] * (self.current_page - len(cursors))
+                    self.page_cursors = cursors + [data.get("next_cursor") or ""]
                     if self.selected_claim_id:
                         self._sync_modal_claim()
                     self.error_message = ""
@@ -173,102 +197,63 @@ class ClaimsState(rx.State):
         self.current_page = 1  # Reset to first page when filtering
         await self.load_claims()
 
-    def set_search_query(self, query: str):
+    async def set_search_query(self, query: str):
         self.search_query = query
         self.current_page = 1  # Reset to first page when searching
+        await self.load_claims()
 
-    def next_page(self):
+    async def next_page(self):
         if self.current_page < self.total_pages:
             self.current_page += 1
+            await self.load_claims()
 
-    def previous_page(self):
+    async def previous_page(self):
         if self.current_page > 1:
             self.current_page -= 1
+            await self.load_claims()
 
-    def set_page(self, page: int):
+    async def set_page(self, page: int):
         if 1 <= page <= self.total_pages:
             self.current_page = page
+            await self.load_claims()
 
-    def set_page_from_input(self, page: str):
+    async def set_page_from_input(self, page: str):
         """Set page from input field (converts string to int)"""
         try:
             page_num = int(page)
-            self.set_page(page_num)
         except (ValueError, TypeError):
-            pass  # Ignore invalid input
+            return  # Ignore invalid input
+        await self.set_page(page_num)
+
+    async def set_page_size(self, size: str):
+        self.page_size = int(size)
+        self.current_page = 1
+        await self.load_claims()
 
-    def sort_by(self, column: str):
+    async def sort_by(self, column: str):
         if self.sort_column == column:
             # Toggle direction if same column
             self.sort_direction = "desc" if self.sort_direction == "asc" else "asc"
         else:
             self.sort_column = column
             self.sort_direction = "asc"
+        self.current_page = 1
+        await self.load_claims()
 
     @rx.var
     def filtered_claims(self) -> List[Dict]:
-        """Filter claims based on search query"""
-        claims = self.claims_data
-
-        if self.search_query:
-            query = self.search_query.lower()
-            claims = [
-                claim for claim in claims
-                if query in str(claim.get("id", "")).lower()
-                or query in str(claim.get("patient_name", "")).lower()
-                or query in str(claim.get("status", "")).lower()
-                or query in str(claim.get("provider_name", "")).lower()
-                or query in str(claim.get("provider_id", "")).lower()
-            ]
-
-        if self.risk_filters:
-            def bucket(score):
-                if score is None:
-                    return "unknown"
-                if score >= 0.7:
-                    return "high"
-                if score >= 0.4:
-                    return "medium"
-                return "low"
-
-            claims = [
-                claim
-                for claim in claims
-                if bucket(claim.get("risk_score")) in self.risk_filters
-            ]
-
-        return claims
+        """Claims matching the active filters (applied by the API)."""
+        return self.claims_data
 
     @rx.var
     def sorted_claims(self) -> List[Dict]:
-        """Sort filtered claims"""
-        claims = self.filtered_claims
-
-        if self.sort_column and claims:
-            reverse = self.sort_direction == "desc"
-            try:
-                claims = sorted(
-                    claims,
-                    key=lambda x: x.get(self.sort_column, ""),
-                    reverse=reverse
-                )
-            except Exception as e:
-                print(f"Error sorting: {e}")
-
-        return claims
+        """Claims in the requested order (sorted by the API)."""
+        return self.filtered_claims
 
     @rx.var
     def paginated_claims(self) -> List[Dict]:
-        """Get claims for current page"""
-        claims = self.sorted_claims
-        start = (self.current_page - 1) * self.page_size
-        end = start + self.page_size
-
-        # Update total pages
-        total = len(claims)
-        self.total_pages = max(1, (total + self.page_size - 1) // self.page_size)
-
-        return claims[start:end]
+        """The current page, as fetched from the API."""
+        return self.sorted_claims
 
     @rx.var
     def page_start(self) -> int:
@@ -278,9 +263,8 @@ class ClaimsState(rx.State):
     @rx.var
     def page_end(self) -> int:
         """Ending index for current page"""
-        total = len(self.sorted_claims)
         end = self.current_page * self.page_size
-        return min(end, total)
+        return min(end, self.claims_total)
 
     @rx.var
     def is_last_page(self) -> bool:
@@ -294,10 +278,11 @@ class ClaimsState(rx.State):
         self.current_page = 1
         await self.load_claims()
 
-    def set_amount_range(self, min_val: float, max_val: float):
+    async def set_amount_range(self, min_val: float, max_val: float):
         self.amount_min = min_val
         self.amount_max = max_val
         self.current_page = 1
+        await self.load_claims()
 
     async def set_risk_filters(self, filters: list[str]):
         self.risk_filters = filters
@@ -480,11 +465,10 @@ class ClaimsState(rx.State):
                 days_pending = 0.0
         data["days_pending"] = float(days_pending)
 
-        reasons: list[str] = []
-        if amount > 5000:
-            reasons.append("Amount > $5,000")
-        if data["status"] == "pending" and data["days_pending"] > 30:
-            reasons.append("Pending > 30 days")
+        # Rule-based reasons come from the API, which owns the risk rules
+        reasons: list[str] = [
+            part for part in str(data.get("ui_risk_reason") or "").split(" • ") if part
+        ]
         if data.get("denial_reason"):
             reasons.append(str(data["denial_reason"]))
         if data.get("risk_reason"):
@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine, Column, String, Float, Date, DateTime
+from sqlalchemy import create_engine, text, Column, String, Float, Integer, Date, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.services.data_service import POSTGRES_CHANGE_TRIGGER, SQLITE_CHANGE_TRIGGERS
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///claimsiq.db")
 Base = declarative_base()
@@ -17,6 +21,9 @@ class Claim(Base):
     provider_id = Column(String)
     procedure_codes = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Set by database triggers on every insert/update; the cache's delta refresh
+    # reads rows past its watermark
+    change_seq = Column(Integer, index=True)
 
 class Provider(Base):
     __tablename__ = "providers"
@@ -30,6 +37,7 @@ def init_database():
     print(f"Initializing database at {DATABASE_URL}...")
     engine = create_engine(DATABASE_URL)
     Base.metadata.create_all(engine)
+    install_change_triggers(engine)
     print("Database initialized successfully!")
     
     with engine.connect() as conn:
@@ -37,5 +45,21 @@ def init_database():
         conn.commit()
         print("Created indexes for claims table")
 
+def install_change_triggers(engine):
+    """Create the triggers that stamp claims.change_seq on every insert/update."""
+    if engine.dialect.name == "sqlite":
+        statements = [f"DROP TRIGGER IF EXISTS {name}" for name in SQLITE_CHANGE_TRIGGERS]
+        statements += list(SQLITE_CHANGE_TRIGGERS.values())
+    elif engine.dialect.name == "postgresql":
+        statements = ["DROP TRIGGER IF EXISTS claims_stamp_change_seq ON claims"]
+        statements += list(POSTGRES_CHANGE_TRIGGER)
+    else:
+        print(f"No change_seq triggers for {engine.dialect.name}; the API adds them if it can")
+        return
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+    print("Created change_seq triggers for claims table")
+
 if __name__ == "__main__":
     init_database()
@@ -1,11 +1,14 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine
 import random
 import os
 import sys
 
+# Share the backend's pooled engine when run directly from the scripts folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.database import get_engine
+
 # Add kagglehub import
 try:
     import kagglehub
@@ -541,7 +544,7 @@ def generate_sample_data(num_claims=1000):
 
 def load_data_to_db(claims_df, providers_df):
     print(f"Loading data to database at {DATABASE_URL}...")
-    engine = create_engine(DATABASE_URL)
+    engine = get_engine(DATABASE_URL)
     
     claims_df.to_sql('claims', engine, if_exists='replace', index=False)
     print(f"Loaded {len(claims_df)} claims")
@@ -560,6 +563,9 @@ def load_data_to_db(claims_df, providers_df):
         conn.commit()
         print("Created indexes")
     
+    # The table was replaced behind the API's back; force its next load to read it
+    from backend.services.data_service import DataService
+    DataService.discard_snapshot_file()
     print("Data loading complete!")
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 import os
 import sys
 import pytest
+from concurrent.futures import Future
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
@@ -75,28 +76,20 @@ def preload_data(monkeypatch, sample_claims_df, sample_providers_df):
     original_claims = DataService._claims_cache
     original_providers = DataService._providers_cache
 
-    DataService._claims_cache = sample_claims_df.copy()
+    DataService._claims_cache = DataService.optimize_claim_dtypes(sample_claims_df)
     DataService._providers_cache = sample_providers_df.copy()
 
     monkeypatch.setattr(DataService, "refresh_cache", lambda: None)
 
-    def fake_update_claim_record(claim_id: str, updates: dict) -> int:
+    def fake_submit_claim_record(claim_id: str, updates: dict) -> Future:
+        # Stand-in for the database write; the real update_claim_cache keeps
+        # the in-memory cache (and everything derived from it) in sync
+        future = Future()
         df = DataService._claims_cache
-        if df is None or df.empty:
-            return 0
-        mask = df["id"] == claim_id
-        if not mask.any():
-            return 0
-        for column, value in updates.items():
-            df.loc[mask, column] = value
-        DataService._claims_cache = df
-        return 1
-
-    def fake_update_claim_cache(claim_id: str, updates: dict) -> None:
-        fake_update_claim_record(claim_id, updates)
-
-    monkeypatch.setattr(DataService, "update_claim_record", staticmethod(fake_update_claim_record))
-    monkeypatch.setattr(DataService, "update_claim_cache", staticmethod(fake_update_claim_cache))
+        future.set_result(0 if df is None or df.empty else int((df["id"] == claim_id).any()))
+        return future
+
+    monkeypatch.setattr(DataService, "submit_claim_record", staticmethod(fake_submit_claim_record))
     yield
 
     DataService._claims_cache = original_claims
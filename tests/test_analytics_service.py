@@ -1,6 +1,8 @@
 import pandas as pd
+import pytest
 
 from backend.services.analytics_service import AnalyticsService
+from backend.services.claims_service import ClaimsService
 from backend.services.data_service import DataService
 
 
@@ -38,3 +40,242 @@ def test_calculate_risk_score_handles_missing_provider(monkeypatch, sample_claim
     unknown_score = AnalyticsService.calculate_risk_score(claim_unknown)
 
     assert unknown_score >= base_score
+
+
+def _reference_risk_score(claim: dict) -> float:
+    """The original hard-coded scorer, kept as the parity reference for the rule file."""
+    from datetime import datetime
+
+    score = 0.0
+    amount = claim.get("claim_amount", 0)
+    if amount > 10000:
+        score += 0.4
+    elif amount > 5000:
+        score += 0.3
+    elif amount > 2000:
+        score += 0.1
+
+    if claim.get("status") == "pending":
+        score += 0.2
+    if claim.get("status") == "flagged":
+        score += 0.3
+
+    if claim.get("claim_date"):
+        try:
+            if isinstance(claim["claim_date"], str):
+                claim_date = pd.to_datetime(claim["claim_date"])
+            else:
+                claim_date = claim["claim_date"]
+            days_pending = (datetime.now() - claim_date).days
+            if days_pending > 30:
+                score += 0.3
+            elif days_pending > 14:
+                score += 0.15
+        except Exception:
+            pass
+
+    providers_df = DataService.get_providers()
+    provider_id = claim.get("provider_id")
+    if not providers_df.empty and provider_id and not pd.isna(provider_id):
+        if provider_id not in providers_df["id"].values:
+            score += 0.2
+
+    return round(min(score, 1.0), 2)
+
+
+def _risk_parity_grid():
+    from datetime import datetime, timedelta
+    from itertools import product
+
+    now = datetime.now()
+    amounts = [0.0, 1999.99, 2000.0, 2000.01, 5000.0, 5000.5, 10000.0, 10000.01, float("nan")]
+    statuses = ["pending", "flagged", "approved", "denied", None]
+    dates = [
+        (now - timedelta(days=days)).strftime("%Y-%m-%d")
+        for days in (0, 14, 15, 30, 31, 400)
+    ] + [
+        (now - timedelta(days=30, hours=-1)).strftime("%Y-%m-%d %H:%M:%S"),
+        "01/15/2020",
+        None,
+        "",
+        "not-a-date",
+    ]
+    providers = ["PROV-1", "UNKNOWN", None, ""]
+
+    rows = [
+        {
+            "id": f"CLM-{index:05d}",
+            "claim_amount": amount,
+            "status": status,
+            "claim_date": claim_date,
+            "provider_id": provider,
+        }
+        for index, (amount, status, claim_date, provider) in enumerate(
+            product(amounts, statuses, dates, providers)
+        )
+    ]
+    return pd.DataFrame(rows)
+
+
+def test_score_claims_matches_reference_rules_exactly():
+    claims_df = _risk_parity_grid()
+
+    vectorized = AnalyticsService.score_claims(claims_df)
+    reference = [_reference_risk_score(row) for row in claims_df.to_dict("records")]
+
+    assert vectorized.tolist() == reference
+
+
+def test_score_claims_matches_reference_with_datetime_column(sample_claims_df):
+    claims_df = sample_claims_df.copy()
+    claims_df["claim_date"] = pd.to_datetime(claims_df["claim_date"])
+
+    vectorized = AnalyticsService.score_claims(claims_df)
+    reference = [_reference_risk_score(row) for row in claims_df.to_dict("records")]
+
+    assert vectorized.tolist() == reference
+
+
+def test_score_claims_unknown_provider_without_provider_data(monkeypatch):
+    monkeypatch.setattr(DataService, "_providers_cache", pd.DataFrame())
+    claims_df = _risk_parity_grid()
+
+    vectorized = AnalyticsService.score_claims(claims_df)
+    reference = [_reference_risk_score(row) for row in claims_df.to_dict("records")]
+
+    assert vectorized.tolist() == reference
+
+
+def test_calculate_risk_score_matches_vectorized_path():
+    claims_df = _risk_parity_grid().sample(n=200, random_state=7)
+
+    vectorized = AnalyticsService.score_claims(claims_df)
+    scalar = [AnalyticsService.calculate_risk_score(row) for row in claims_df.to_dict("records")]
+
+    assert vectorized.tolist() == scalar
+
+
+def test_score_claims_empty_frame():
+    assert AnalyticsService.score_claims(pd.DataFrame()).size == 0
+
+
+def test_provider_index_follows_providers_cache(monkeypatch):
+    assert DataService.get_provider_ids() == frozenset({"PROV-1", "PROV-2", "PROV-3"})
+
+    monkeypatch.setattr(DataService, "_providers_cache", pd.DataFrame([{"id": "PROV-9", "name": "Provider Nine"}]))
+
+    index = DataService.get_provider_index()
+    assert index.ids == frozenset({"PROV-9"})
+    assert index.names == {"PROV-9": "Provider Nine"}
+    assert AnalyticsService.calculate_risk_score({"claim_amount": 0, "provider_id": "PROV-1"}) == 0.2
+
+
+def test_get_high_risk_page_cursor_walks_full_ranking(monkeypatch, sample_claims_df):
+    claims_df = pd.concat([sample_claims_df] * 3, ignore_index=True)
+    claims_df["id"] = [f"CLM-{index:03d}" for index in range(len(claims_df))]
+    monkeypatch.setattr(DataService, "_claims_cache", claims_df)
+
+    expected = (
+        DataService.get_claims()
+        .reset_index()
+        .query("risk_score >= 0.7")
+        .sort_values(["risk_score", "index"], ascending=[False, True])["id"]
+        .tolist()
+    )
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = AnalyticsService.get_high_risk_page(limit=2, after=cursor)
+        seen.extend(record["id"] for record in page)
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert all("_risk_age_days" not in record for record in page)
+
+
+def test_get_high_risk_page_rejects_bad_cursor():
+    with pytest.raises(ValueError):
+        AnalyticsService.get_high_risk_page(limit=1, after="not-a-cursor")
+
+
+def test_get_risk_histogram_matches_bruteforce_counts():
+    import numpy as np
+
+    edges = [0.0, 0.25, 0.5, 0.8, 1.0]
+    histogram = AnalyticsService.get_risk_histogram(edges)
+
+    scores = DataService.get_claims()["risk_score"].to_numpy()
+    expected, _ = np.histogram(scores, bins=edges)
+    assert histogram["counts"] == expected.tolist()
+    assert histogram["total"] == len(scores)
+    assert histogram["below"] == histogram["above"] == 0
+
+
+def test_get_risk_histogram_cached_per_data_version():
+    edges = [0.0, 0.5, 1.0]
+    first = AnalyticsService.get_risk_histogram(edges)
+    assert AnalyticsService.get_risk_histogram(edges) is first
+
+    DataService.update_claim_cache("CLM-001", {"risk_score": 0.95})
+
+    updated = AnalyticsService.get_risk_histogram(edges)
+    assert updated is not first
+    assert updated["counts"][1] == first["counts"][1] + 1
+
+
+@pytest.mark.parametrize("edges", [[0.5], [0.5, 0.5], [1.0, 0.0], [0.0, float("nan")]])
+def test_get_risk_histogram_rejects_bad_edges(edges):
+    with pytest.raises(ValueError):
+        AnalyticsService.get_risk_histogram(edges)
+
+
+def _bruteforce_simulation(claims_df, threshold, medium, high):
+    scores = claims_df["risk_score"]
+    return {
+        "total": len(scores),
+        "at_or_above": int((scores >= threshold).sum()),
+        "bands": {
+            "low": int((scores < medium).sum()),
+            "medium": int(((scores >= medium) & (scores < high)).sum()),
+            "high": int((scores >= high).sum()),
+        },
+    }
+
+
+def test_simulate_risk_thresholds_matches_bruteforce():
+    result = AnalyticsService.simulate_risk_thresholds(threshold=0.65, medium=0.3, high=0.8, group_by="status")
+    claims_df = DataService.get_claims()
+
+    expected = _bruteforce_simulation(claims_df, 0.65, 0.3, 0.8)
+    assert {key: result[key] for key in expected} == expected
+    for status, group in claims_df.groupby("status"):
+        breakdown = result["breakdown"][status]
+        assert breakdown == _bruteforce_simulation(group, 0.65, 0.3, 0.8)
+
+
+def test_simulate_risk_thresholds_index_patched_on_update():
+    AnalyticsService.simulate_risk_thresholds(threshold=0.5)
+    score_index = DataService.get_score_index()
+    scores = score_index.scores
+    groups = {column: dict(groups) for column, groups in score_index.groups.items()}
+
+    ClaimsService.update_claim_status("CLM-001", "flagged")
+    result = AnalyticsService.simulate_risk_thresholds(threshold=0.5, group_by="provider")
+
+    # Re-filed into a new index; the one readers held is left as it was
+    patched = DataService.get_score_index()
+    assert patched is not score_index and patched.version == DataService.get_data_version()
+    assert score_index.scores is scores and score_index.groups == groups
+    assert patched.groups["status"]["pending"] is score_index.groups["status"]["pending"]
+    claims_df = DataService.get_claims()
+    assert result["at_or_above"] == int((claims_df["risk_score"] >= 0.5).sum())
+    for provider_id, group in claims_df.groupby("provider_id"):
+        assert result["breakdown"][provider_id]["at_or_above"] == int((group["risk_score"] >= 0.5).sum())
+
+
+def test_simulate_risk_thresholds_validates_input():
+    with pytest.raises(ValueError):
+        AnalyticsService.simulate_risk_thresholds(medium=0.8, high=0.5)
+    with pytest.raises(ValueError):
+        AnalyticsService.simulate_risk_thresholds(group_by="diagnosis")
@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 
 from backend import app as api_app
+from backend.services.data_service import DataService
 
 
 def test_health_endpoint(client: TestClient):
@@ -82,3 +83,124 @@ def test_update_claim_notes_endpoint(client: TestClient):
     payload = response.json()
     assert payload["success"] is True
     assert payload["claim"]["processor_notes"] == "Reviewed by supervisor"
+
+
+def test_claims_endpoints_report_missing_typed_values_as_null(client: TestClient, sample_claims_df):
+    df = sample_claims_df.copy()
+    df["created_at"] = ["2024-01-10 08:00:00", None, "2024-01-12 09:30:00", "2024-02-05 10:00:00"]
+    DataService._claims_cache = DataService.optimize_claim_dtypes(df)
+
+    response = client.get("/api/claims", params={"status": "pending"})
+    assert response.status_code == 200
+    [claim] = response.json()["claims"]
+    assert claim["id"] == "CLM-002"
+    assert claim["processed_date"] is None
+    assert claim["created_at"] is None
+
+
+def test_analytics_risks_endpoint_cursor_paging(client: TestClient):
+    first = client.get("/api/analytics/risks", params={"limit": 1}).json()
+    assert len(first["top_risks"]) == 1
+    assert first["next_cursor"]
+
+    second = client.get("/api/analytics/risks", params={"limit": 1, "after": first["next_cursor"]}).json()
+    assert second["top_risks"][0]["id"] != first["top_risks"][0]["id"]
+
+    response = client.get("/api/analytics/risks", params={"after": "garbage"})
+    assert response.status_code == 400
+
+
+def test_claims_list_endpoint_reason_filter(client: TestClient):
+    response = client.get("/api/claims", params={"reasons": "status_flagged"})
+    assert response.status_code == 200
+    assert [claim["id"] for claim in response.json()["claims"]] == ["CLM-003"]
+
+    response = client.get("/api/claims", params={"reasons": "bogus"})
+    assert response.status_code == 400
+
+
+def test_claims_list_endpoint_dashboard_filters(client: TestClient):
+    response = client.get(
+        "/api/claims",
+        params={"date_start": "2023-12-01", "date_end": "2024-03-01", "amount_min": 3000, "search": "prov-2"},
+    )
+    assert response.status_code == 200
+    assert [claim["id"] for claim in response.json()["claims"]] == ["CLM-002", "CLM-004"]
+
+    response = client.get("/api/claims", params={"risk_levels": "low,extreme"})
+    assert response.status_code == 400
+
+
+def test_claims_list_endpoint_sort_cursor(client: TestClient):
+    params = {"sort": "claim_date", "direction": "asc", "limit": 3}
+    first = client.get("/api/claims", params=params).json()
+    assert [claim["id"] for claim in first["claims"]] == ["CLM-003", "CLM-002", "CLM-001"]
+
+    second = client.get("/api/claims", params={**params, "after": first["next_cursor"]}).json()
+    assert [claim["id"] for claim in second["claims"]] == ["CLM-004"]
+
+    response = client.get("/api/claims", params={**params, "after": "garbage"})
+    assert response.status_code == 400
+
+
+def test_claim_facets_endpoint(client: TestClient):
+    response = client.get("/api/claims/facets", params={"status": "approved"})
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["total"] == 2
+    assert payload["facets"]["provider_id"] == {"PROV-1": 1, "PROV-2": 1}
+
+
+def test_risk_histogram_endpoint(client: TestClient):
+    response = client.get("/api/analytics/risks/histogram", params={"edges": "0,0.4,0.7,1"})
+    assert response.status_code == 200
+    payload = response.json()
+    assert len(payload["counts"]) == 3
+    assert sum(payload["counts"]) == payload["total"] == 4
+
+    assert client.get("/api/analytics/risks/histogram", params={"edges": "1,0"}).status_code == 400
+    assert client.get("/api/analytics/risks/histogram", params={"edges": "a,b"}).status_code == 400
+
+
+def test_risk_simulation_endpoint(client: TestClient):
+    response = client.get("/api/analytics/risks/simulate", params={"threshold": 0.65, "group_by": "status"})
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["total"] == 4
+    assert set(payload["breakdown"]) == {"approved", "pending", "flagged"}
+
+    assert client.get("/api/analytics/risks/simulate", params={"group_by": "zip"}).status_code == 400
+
+
+def test_batch_score_endpoint_json_and_ndjson(client: TestClient):
+    import json
+
+    from backend.services.analytics_service import AnalyticsService
+
+    claims = [
+        {"id": "NEW-1", "claim_amount": 12000, "status": "pending", "claim_date": "2023-01-01", "provider_id": "PROV-1"},
+        {"id": "NEW-2", "claim_amount": 150, "status": "approved", "provider_id": "PROV-404"},
+    ]
+
+    response = client.post("/api/analytics/score", json=claims)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["risk_score"] for result in results] == [
+        AnalyticsService.calculate_risk_score(claim) for claim in claims
+    ]
+    assert results[0]["risk_level"] == "high"
+    assert results[0]["rule_hits"] == ["amount_over_10000", "status_pending", "age_over_30_days"]
+    assert results[1]["rule_hits"] == ["unknown_provider"]
+    assert results[1]["reasons"] == []
+
+    ndjson = "\n".join(json.dumps(claim) for claim in claims) + "\n"
+    response = client.post(
+        "/api/analytics/score",
+        content=ndjson,
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.json()["results"] == results
+
+    assert client.post("/api/analytics/score", json={"id": "x"}).status_code == 400
+    assert client.post("/api/analytics/score", json=[1, 2]).status_code == 400
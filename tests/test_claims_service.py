@@ -1,8 +1,13 @@
+from datetime import datetime
+
+import numpy as np
 import pandas as pd
 import pytest
 
+from backend.services.claim_filters import ClaimFilters, claim_mask
 from backend.services.claims_service import ClaimsService
 from backend.services.data_service import DataService
+from backend.services.pagination import decode_cursor, encode_cursor
 
 
 def test_get_summary_counts(sample_claims_df):
@@ -40,6 +45,106 @@ def test_filter_claims_date_range():
     assert response["total"] == 2
 
 
+def test_filter_claims_composes_filters_and_pages():
+    DataService.update_claim_cache("CLM-004", {"claim_date": None})
+
+    response = ClaimsService.filter_claims(status="approved", end_date="2024-12-31", limit=10)
+    assert [claim["id"] for claim in response["claims"]] == ["CLM-001"]
+
+    response = ClaimsService.filter_claims(limit=2, offset=1)
+    assert response["total"] == 4
+    assert [claim["id"] for claim in response["claims"]] == ["CLM-002", "CLM-003"]
+
+    with pytest.raises(ClaimsService.InvalidFilterError):
+        ClaimsService.filter_claims(start_date="not-a-date")
+
+
+def test_filter_claims_dashboard_filters():
+    def ids(**filters):
+        return [claim["id"] for claim in ClaimsService.filter_claims(limit=10, **filters)["claims"]]
+
+    assert ids(amount_min=4000, amount_max=10000) == ["CLM-002", "CLM-004"]
+    assert ids(provider_id="PROV-2", amount_max=5000) == ["CLM-004"]
+    assert ids(search="prov-3") == ["CLM-003"]
+    assert ids(search="APPROVED") == ["CLM-001", "CLM-004"]
+    assert ids(time_range="all") == ["CLM-001", "CLM-002", "CLM-003", "CLM-004"]
+
+    scores = DataService.get_claims()["risk_score"].to_numpy()
+    high = [claim_id for claim_id, score in zip(["CLM-001", "CLM-002", "CLM-003", "CLM-004"], scores) if score >= 0.7]
+    assert ids(risk_levels=["high"]) == high
+
+    with pytest.raises(ClaimsService.InvalidFilterError):
+        ClaimsService.filter_claims(risk_levels=["extreme"])
+    with pytest.raises(ClaimsService.InvalidFilterError):
+        ClaimsService.filter_claims(time_range="last-week")
+
+
+def test_claim_mask_time_range_counts_back_from_today():
+    claims_df = DataService.get_claims()
+    mask = claim_mask(claims_df, ClaimFilters(time_range="30d"), now=datetime(2024, 2, 20, 15, 30))
+    assert claims_df["id"][mask].tolist() == ["CLM-004"]
+
+
+def test_filter_claims_sorted_cursor_pages():
+    first = ClaimsService.filter_claims(sort="claim_amount", direction="desc", limit=2)
+    assert [claim["id"] for claim in first["claims"]] == ["CLM-003", "CLM-002"]
+    assert first["total"] == 4
+
+    # A concurrent update re-files the claim without disturbing the cursor
+    DataService.update_claim_cache("CLM-001", {"claim_amount": 20000.0})
+    second = ClaimsService.filter_claims(sort="claim_amount", direction="desc", limit=2, after=first["next_cursor"])
+    assert [claim["id"] for claim in second["claims"]] == ["CLM-004"]
+    assert second["next_cursor"] is None
+
+    ascending = ClaimsService.filter_claims(sort="claim_amount", limit=10)
+    assert [claim["id"] for claim in ascending["claims"]] == ["CLM-004", "CLM-002", "CLM-003", "CLM-001"]
+
+    with pytest.raises(ClaimsService.InvalidFilterError):
+        ClaimsService.filter_claims(sort="claim_amount", direction="asc", after=first["next_cursor"])
+    with pytest.raises(ClaimsService.InvalidFilterError):
+        ClaimsService.filter_claims(sort="patient_id")
+
+
+def test_filter_claims_rejects_tampered_cursors():
+    for sort, key, claim_id in [
+        ("claim_amount", "lots", "CLM-001"),
+        ("claim_date", 1.5, "CLM-001"),
+        ("status", 3.0, "CLM-001"),
+        ("claim_amount", 2500.0, 7),
+        ("claim_amount", 100.0, ["CLM-001"]),
+    ]:
+        with pytest.raises(ClaimsService.InvalidFilterError):
+            ClaimsService.filter_claims(sort=sort, after=encode_cursor(sort, "asc", key, claim_id))
+
+
+def test_encode_cursor_accepts_numpy_scalars():
+    cursor = encode_cursor("claim_amount", "asc", np.float32(1.5), np.int64(3), np.str_("CLM-001"))
+    assert decode_cursor(cursor, 5) == ["claim_amount", "asc", 1.5, 3, "CLM-001"]
+
+
+def test_claim_facets_follow_status_updates():
+    facets = ClaimsService.get_claim_facets()
+    assert facets["total"] == 4
+    assert facets["facets"]["status"] == {"approved": 2, "pending": 1, "flagged": 1}
+
+    bitmaps = DataService.get_bitmap_index()
+    pending = bitmaps.bits("status", "pending")
+    ClaimsService.update_claim_status("CLM-002", "denied", reason="Duplicate claim")
+
+    # Re-filed in a copy rather than rebuilt; the published index is left as it was
+    patched = DataService.get_bitmap_index()
+    assert patched is not bitmaps and patched.version == DataService.get_data_version()
+    assert patched.bits("provider_id", "PROV-2") is bitmaps.bits("provider_id", "PROV-2")
+    assert bitmaps.bits("status", "pending") is pending and bitmaps.count(pending) == 1
+    facets = ClaimsService.get_claim_facets(provider_id="PROV-2")
+    assert facets["total"] == 2
+    assert facets["facets"]["status"] == {"approved": 1, "denied": 1}
+    assert facets["facets"]["denial_reason"] == {"Duplicate claim": 1}
+
+    response = ClaimsService.filter_claims(status="denied", provider_id="PROV-2")
+    assert [claim["id"] for claim in response["claims"]] == ["CLM-002"]
+
+
 def test_get_provider_metrics_returns_expected_columns(sample_providers_df):
     metrics = ClaimsService.get_provider_metrics()
 
@@ -97,3 +202,25 @@ def test_update_claim_notes(sample_claims_df):
     df = DataService.get_claims()
     row = df[df["id"] == "CLM-003"].iloc[0]
     assert row["processor_notes"] == "Review with provider"
+
+
+def test_filter_claims_by_reason_bitmask():
+    response = ClaimsService.filter_claims(reasons=["amount_over_5000"], limit=10)
+
+    assert {claim["id"] for claim in response["claims"]} == {"CLM-002"}
+    assert "Amount > $5,000" in response["claims"][0]["ui_risk_reason"]
+
+    response = ClaimsService.filter_claims(reasons=["amount_over_5000", "status_flagged"], limit=10)
+    assert {claim["id"] for claim in response["claims"]} == {"CLM-002", "CLM-003"}
+
+
+def test_filter_claims_unknown_reason():
+    with pytest.raises(ClaimsService.InvalidFilterError):
+        ClaimsService.filter_claims(reasons=["not_a_rule"])
+
+
+def test_update_claim_status_refreshes_rule_hits():
+    ClaimsService.update_claim_status("CLM-001", "flagged")
+
+    response = ClaimsService.filter_claims(reasons=["status_flagged"], limit=10)
+    assert {claim["id"] for claim in response["claims"]} == {"CLM-001", "CLM-003"}
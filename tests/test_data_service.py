@@ -0,0 +1,420 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from backend.services.analytics_service import AnalyticsService
+from backend.services.claims_service import ClaimsService
+from backend.services.data_service import DataService
+from backend.services.risk_rules import RiskRuleEngine
+
+
+def _aging_claims(now: datetime) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "id": f"CLM-{days:03d}",
+                "status": "pending",
+                "claim_amount": 100.0,
+                "claim_date": (now - timedelta(days=days)).strftime("%Y-%m-%d"),
+                "provider_id": "PROV-1",
+            }
+            for days in (3, 10, 20, 25, 40)
+        ]
+    )
+
+
+def test_get_claims_materializes_risk_scores(sample_claims_df):
+    claims_df = DataService.get_claims()
+
+    assert "risk_score" in claims_df.columns
+    assert claims_df["risk_score"].tolist() == AnalyticsService.score_claims(sample_claims_df).tolist()
+
+
+def test_readers_use_materialized_scores():
+    DataService.get_claims()
+    high_before = AnalyticsService.get_risk_distribution()["high"]
+    DataService.update_claim_cache("CLM-001", {"risk_score": 0.99})
+
+    response = ClaimsService.filter_claims(status="approved", limit=10)
+    scores = {claim["id"]: claim["risk_score"] for claim in response["claims"]}
+
+    assert scores["CLM-001"] == 0.99
+    assert AnalyticsService.get_risk_distribution()["high"] == high_before + 1
+    assert "_risk_age_days" not in AnalyticsService.get_high_risk_claims(limit=1)[0]
+
+
+def test_materialize_risk_scores_keeps_writes_made_while_scoring(monkeypatch):
+    df = DataService.get_claims()
+    ruleset = RiskRuleEngine.get_ruleset()
+    evaluate = ruleset.evaluate
+    writes = []
+
+    def evaluate_during_write(claims_df, now, references):
+        if not writes:
+            writes.append(DataService.update_claim_cache("CLM-002", {"status": "denied"}))
+        return evaluate(claims_df, now, references)
+
+    monkeypatch.setattr(ruleset, "evaluate", evaluate_during_write)
+    scored = DataService.materialize_risk_scores(df)
+
+    assert writes[0] is not None
+    assert DataService.get_claims() is scored
+    assert scored.set_index("id").loc["CLM-002", "status"] == "denied"
+    assert scored["risk_score"].tolist() == AnalyticsService.score_claims(scored).tolist()
+
+
+def test_recompute_risk_aging_rescores_only_crossed_claims(monkeypatch):
+    now = datetime.now()
+    claims_df = _aging_claims(now)
+    monkeypatch.setattr(DataService, "_claims_cache", claims_df)
+    DataService.materialize_risk_scores(claims_df, now=now - timedelta(days=10))
+
+    rescored = DataService.recompute_risk_aging(now=now)
+
+    # 10 days ago the 20- and 40-day claims were 10 and 30 days old
+    assert rescored == 2
+    assert DataService.get_claims()["risk_score"].tolist() == AnalyticsService.score_claims(claims_df, now=now).tolist()
+    assert DataService.recompute_risk_aging(now=now) == 0
+
+
+def test_update_claim_status_rescores_single_row():
+    DataService.get_claims()
+
+    updated, _ = ClaimsService.update_claim_status("CLM-002", "flagged")
+
+    row = DataService.get_claims().set_index("id").loc["CLM-002"]
+    assert row["risk_score"] == updated["risk_score"] == AnalyticsService.calculate_risk_score(row.to_dict())
+
+
+def test_updates_publish_new_snapshots_without_touching_old_ones():
+    before = DataService.get_snapshot()
+    old_status = before.claims["status"].tolist()
+
+    ClaimsService.update_claim_status("CLM-002", "approved")
+    after = DataService.get_snapshot()
+
+    assert after.version > before.version
+    assert before.claims["status"].tolist() == old_status
+    assert after.claims.set_index("id").loc["CLM-002", "status"] == "approved"
+    # Untouched columns are shared, not copied
+    assert np.shares_memory(before.claims["claim_amount"].to_numpy(), after.claims["claim_amount"].to_numpy())
+
+
+def test_with_claim_rows_copies_only_changed_columns():
+    df = DataService.get_claims()
+    rows = df.iloc[[1, 2]].reset_index(drop=True).assign(status=["denied", "flagged"])
+
+    updated = DataService.with_claim_rows(df, np.array([1, 2]), rows)
+
+    assert updated["status"].tolist() == ["approved", "denied", "flagged", "approved"]
+    assert df["status"].tolist() == ["approved", "pending", "flagged", "approved"]
+    assert np.shares_memory(df["claim_amount"].to_numpy(), updated["claim_amount"].to_numpy())
+    assert np.shares_memory(df["claim_date"].to_numpy(), updated["claim_date"].to_numpy())
+
+
+def _full_band_counts() -> dict:
+    scores = DataService.get_claims()["risk_score"]
+    return {
+        "low": int((scores < 0.4).sum()),
+        "medium": int(((scores >= 0.4) & (scores < 0.7)).sum()),
+        "high": int((scores >= 0.7).sum()),
+    }
+
+
+def test_risk_band_counts_follow_status_updates():
+    assert DataService.get_risk_band_counts() == _full_band_counts()
+
+    for claim_id, status in (("CLM-001", "flagged"), ("CLM-002", "approved"), ("CLM-003", "denied")):
+        ClaimsService.update_claim_status(claim_id, status)
+        assert DataService.get_risk_band_counts() == _full_band_counts()
+
+
+def test_risk_band_counts_follow_daily_aging(monkeypatch):
+    now = datetime.now()
+    claims_df = _aging_claims(now)
+    claims_df["claim_amount"] = 2500.0
+    monkeypatch.setattr(DataService, "_claims_cache", claims_df)
+    DataService.materialize_risk_scores(claims_df, now=now - timedelta(days=10))
+    # Read the raw counters: get_risk_band_counts would lazily re-age first
+    assert DataService._risk_band_counts.tolist() == [3, 2, 0]
+
+    DataService.recompute_risk_aging(now=now)
+
+    assert DataService.get_risk_band_counts() == {"low": 2, "medium": 3, "high": 0}
+    assert DataService.get_risk_band_counts() == _full_band_counts()
+
+
+def test_optimize_claim_dtypes_types_columns_and_reports_memory(sample_claims_df):
+    raw = sample_claims_df.copy()
+    raw["patient_age"] = [34.0, None, 61.0, 47.0]
+
+    typed = DataService.optimize_claim_dtypes(raw)
+    report = DataService.memory_report(raw, typed)
+
+    assert isinstance(typed["status"].dtype, pd.CategoricalDtype)
+    assert isinstance(typed["provider_id"].dtype, pd.CategoricalDtype)
+    assert str(typed["claim_date"].dtype) == "datetime64[ns]"
+    assert str(typed["patient_age"].dtype) == "Int16"
+    assert typed["patient_age"].isna().tolist() == [False, True, False, False]
+    assert report["rows"] == 4
+    assert report["after_bytes"] < report["before_bytes"]
+    assert report["columns"]["status"]["dtype"] == "category"
+
+
+def test_optimize_claim_dtypes_keeps_unparseable_dates(sample_claims_df):
+    raw = sample_claims_df.copy()
+    raw.loc[0, "claim_date"] = "not a date"
+
+    typed = DataService.optimize_claim_dtypes(raw)
+
+    assert typed["claim_date"].tolist() == raw["claim_date"].tolist()
+
+
+def test_status_update_adds_new_category_values():
+    ClaimsService.update_claim_status("CLM-002", "denied", reason="Duplicate claim")
+
+    row = DataService.get_claims().set_index("id").loc["CLM-002"]
+    assert row["status"] == "denied"
+    assert row["denial_reason"] == "Duplicate claim"
+    assert isinstance(row["processed_date"], pd.Timestamp)
+    assert ClaimsService.filter_claims(status="denied")["total"] == 1
+
+
+def test_hash_index_lookups_match_scans():
+    claims_df = DataService.get_claims()
+    index = DataService.get_hash_index()
+
+    assert index.position_of("CLM-003") == 2
+    assert index.position_of("CLM-999") is None
+    for provider_id in ("PROV-1", "PROV-2", "PROV-3", "PROV-9"):
+        expected = np.flatnonzero((claims_df["provider_id"] == provider_id).to_numpy())
+        assert DataService.find_claim_positions("provider_id", provider_id).tolist() == expected.tolist()
+
+
+def test_hash_index_patched_on_cache_writes():
+    index = DataService.get_hash_index()
+
+    DataService.update_claim_cache("CLM-001", {"provider_id": "PROV-2", "risk_score": 0.5})
+    DataService.recompute_risk_aging(now=datetime.now() + timedelta(days=1))
+
+    # Re-filed into a new index; the one readers held is left as it was
+    patched = DataService.get_hash_index()
+    assert patched is not index and patched.version == DataService.get_data_version()
+    assert patched._ids is index._ids
+    assert index.positions("provider_id", "PROV-1").tolist() == [0]
+    assert DataService.find_claim_positions("provider_id", "PROV-1").tolist() == []
+    assert DataService.find_claim_positions("provider_id", "PROV-2").tolist() == [0, 1, 3]
+
+
+def test_quick_stats_use_group_lookups():
+    _, quick_stats = ClaimsService.update_claim_status("CLM-002", "approved")
+
+    assert quick_stats["provider_summary"] == "Returning provider (1 prior claims, 100% approval)."
+
+
+def test_chunked_load_matches_single_read(tmp_path, sample_claims_df):
+    rows = pd.concat([sample_claims_df] * 6, ignore_index=True)
+    rows["id"] = [f"CLM-{i:03d}" for i in range(len(rows))]
+    # A chunk with no status at all still merges with its neighbours' categories
+    rows.loc[20:, "status"] = None
+    rows.loc[5, "status"] = "appealed"
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}")
+    rows.to_sql("claims", engine, index=False)
+
+    seen = []
+    typed, raw_bytes = DataService.read_claims_chunked(
+        engine, chunk_rows=10, progress=lambda loaded, total: seen.append((loaded, total))
+    )
+    expected = DataService.optimize_claim_dtypes(
+        DataService._ensure_claim_columns(pd.read_sql_table("claims", engine))
+    )
+    engine.dispose()
+
+    assert seen == [(0, 24), (10, 24), (20, 24), (24, 24)]
+    assert DataService.get_load_progress()["done"] is True
+    assert isinstance(typed["status"].dtype, pd.CategoricalDtype)
+    assert typed["status"].tolist() == rows["status"].tolist()
+    categorical = {column: object for column in typed.columns if typed[column].dtype == "category"}
+    pd.testing.assert_frame_equal(typed.astype(categorical), expected.astype(categorical))
+    assert raw_bytes["id"] > 0
+
+
+def test_warm_start_uses_snapshot_file_until_table_changes(tmp_path, monkeypatch, sample_claims_df):
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}")
+    sample_claims_df.to_sql("claims", engine, index=False)
+    monkeypatch.setattr("backend.services.data_service.get_engine", lambda: engine)
+    monkeypatch.setattr(DataService, "_snapshot_file", str(tmp_path / "claims.snapshot"))
+    monkeypatch.setattr(DataService, "_snapshot_file_current", False)
+    monkeypatch.setattr(DataService, "_snapshot_source", None)
+    monkeypatch.setattr(DataService, "_change_tracking", True)
+    monkeypatch.setattr(DataService, "_delta_watermark", None)
+    reads = []
+    read_claims_chunked = DataService.read_claims_chunked
+    monkeypatch.setattr(
+        DataService, "read_claims_chunked", lambda *args: reads.append(1) or read_claims_chunked(*args)
+    )
+
+    cold = DataService.load_claims_from_db()
+    warm = DataService.load_claims_from_db()
+    assert len(reads) == 1
+    pd.testing.assert_frame_equal(warm, cold)
+
+    DataService.run_write(lambda conn: conn.execute(text("DELETE FROM claims WHERE id = 'CLM-004'")))
+    assert not (tmp_path / "claims.snapshot").exists()
+    # The cache no longer matches any fingerprint it was read with, so shutdown saves nothing
+    assert DataService.save_snapshot_file() is False
+    assert not (tmp_path / "claims.snapshot").exists()
+    assert len(DataService.load_claims_from_db()) == 3
+    assert len(reads) == 2
+    engine.dispose()
+
+
+def test_warm_start_needs_change_seq_triggers(tmp_path, monkeypatch, sample_claims_df):
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}")
+    # A change_seq column nothing stamps, as older init_db scripts created it
+    sample_claims_df.assign(change_seq=None).to_sql("claims", engine, index=False)
+    monkeypatch.setattr("backend.services.data_service.get_engine", lambda: engine)
+    monkeypatch.setattr(DataService, "_snapshot_file", str(tmp_path / "claims.snapshot"))
+    monkeypatch.setattr(DataService, "_snapshot_file_current", False)
+    monkeypatch.setattr(DataService, "_snapshot_source", None)
+    monkeypatch.setattr(DataService, "_change_tracking", False)
+
+    DataService._read_typed_claims(engine)
+    assert DataService.save_snapshot_file() is False
+    assert not (tmp_path / "claims.snapshot").exists()
+
+    # Loading with a snapshot file configured installs the triggers first
+    DataService.load_claims_from_db()
+    assert DataService.save_snapshot_file() is True
+    assert (tmp_path / "claims.snapshot").exists()
+    engine.dispose()
+
+
+def test_refresh_delta_merges_changed_rows(tmp_path, monkeypatch, sample_claims_df):
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}")
+    sample_claims_df.to_sql("claims", engine, index=False)
+    monkeypatch.setattr("backend.services.data_service.get_engine", lambda: engine)
+    monkeypatch.setattr(DataService, "_snapshot_file", None)
+    monkeypatch.setattr(DataService, "_change_tracking", True)
+    monkeypatch.setattr(DataService, "_delta_watermark", None)
+
+    DataService.load_claims_from_db()
+    assert "change_seq" in DataService.get_claims().columns
+    assert DataService.refresh_delta() == {"updated": 0, "appended": 0, "reloaded": False}
+
+    with engine.begin() as conn:
+        # An external writer that knows nothing about change_seq
+        conn.execute(text("UPDATE claims SET status = 'denied' WHERE id = 'CLM-002'"))
+        conn.execute(text("INSERT INTO claims (id, status, claim_amount) VALUES ('CLM-005', 'review', 900.0)"))
+    result = DataService.refresh_delta()
+
+    assert result == {"updated": 1, "appended": 1, "reloaded": False}
+    claims = DataService.get_claims().set_index("id")
+    assert claims.loc["CLM-002", "status"] == "denied"
+    assert claims.loc["CLM-005", "status"] == "review"
+    assert DataService.find_claim_position("CLM-005") == 4
+    assert claims["risk_score"].notna().all()
+    bitmaps = DataService.get_bitmap_index()
+    assert bitmaps.facet_counts("status") == {"approved": 2, "denied": 1, "flagged": 1, "review": 1}
+    assert bitmaps.to_mask(bitmaps.bits("provider_id", "PROV-2")).tolist() == [False, True, False, True, False]
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM claims WHERE id = 'CLM-001'"))
+    assert DataService.refresh_delta()["reloaded"] is True
+    assert len(DataService.get_claims()) == 4
+    engine.dispose()
+
+
+def test_refresh_delta_scores_only_changed_rows(tmp_path, monkeypatch, sample_claims_df):
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}")
+    sample_claims_df.assign(processor_notes=None).to_sql("claims", engine, index=False)
+    monkeypatch.setattr("backend.services.data_service.get_engine", lambda: engine)
+    monkeypatch.setattr(DataService, "_snapshot_file", None)
+    monkeypatch.setattr(DataService, "_change_tracking", True)
+    monkeypatch.setattr(DataService, "_delta_watermark", None)
+    DataService.load_claims_from_db()
+
+    # This process's own write: the cache keeps "" where the table stores NULL
+    DataService.submit_claim_update("CLM-001", {"processor_notes": None}).result()
+    DataService.update_claim_cache("CLM-001", {"processor_notes": ""})
+    assert DataService.refresh_delta() == {"updated": 0, "appended": 0, "reloaded": False}
+
+    materialize_risk_scores = DataService.materialize_risk_scores
+    full_scorings = []
+    monkeypatch.setattr(
+        DataService,
+        "materialize_risk_scores",
+        lambda *args, **kwargs: full_scorings.append(1) or materialize_risk_scores(*args, **kwargs),
+    )
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE claims SET claim_amount = 12000.0 WHERE id = 'CLM-004'"))
+        conn.execute(text("INSERT INTO claims (id, status, claim_amount, provider_id) VALUES ('CLM-005', 'pending', 900.0, 'PROV-1')"))
+    assert DataService.refresh_delta() == {"updated": 1, "appended": 1, "reloaded": False}
+    assert full_scorings == []
+
+    incremental = DataService.get_claims().copy()
+    materialize_risk_scores(DataService.get_claims())
+    full = DataService.get_claims()
+    np.testing.assert_array_equal(incremental["risk_score"].to_numpy(), full["risk_score"].to_numpy())
+    np.testing.assert_array_equal(incremental["_risk_hits"].to_numpy(), full["_risk_hits"].to_numpy())
+    assert DataService.get_risk_band_counts() == _full_band_counts()
+    engine.dispose()
+
+
+def test_refresh_delta_rereads_lookback_window(tmp_path, monkeypatch, sample_claims_df):
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}")
+    sample_claims_df.to_sql("claims", engine, index=False)
+    monkeypatch.setattr("backend.services.data_service.get_engine", lambda: engine)
+    monkeypatch.setattr(DataService, "_snapshot_file", None)
+    monkeypatch.setattr(DataService, "_change_tracking", True)
+    monkeypatch.setattr(DataService, "_delta_watermark", None)
+    monkeypatch.setattr(DataService, "_delta_lookback", staticmethod(lambda engine: 5))
+    DataService.load_claims_from_db()
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE claims SET status = 'denied' WHERE id = 'CLM-001'"))
+    assert DataService.refresh_delta()["updated"] == 1
+
+    with engine.begin() as conn:
+        # A PostgreSQL transaction that took its number before the last one but committed after
+        conn.execute(text("DROP TRIGGER claims_change_seq_update"))
+        conn.execute(text("UPDATE claims SET status = 'flagged', change_seq = change_seq - 1 WHERE id = 'CLM-004'"))
+    watermark = DataService._delta_watermark
+    assert DataService.refresh_delta() == {"updated": 1, "appended": 0, "reloaded": False}
+    assert DataService.get_claims().set_index("id").loc["CLM-004", "status"] == "flagged"
+    assert DataService._delta_watermark == watermark
+    engine.dispose()
+
+
+def test_claim_date_order_survives_corrections_and_appends(tmp_path, monkeypatch, sample_claims_df):
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}")
+    sample_claims_df.to_sql("claims", engine, index=False)
+    monkeypatch.setattr("backend.services.data_service.get_engine", lambda: engine)
+    monkeypatch.setattr(DataService, "_snapshot_file", None)
+    monkeypatch.setattr(DataService, "_change_tracking", True)
+    monkeypatch.setattr(DataService, "_delta_watermark", None)
+
+    DataService.load_claims_from_db()
+    index = DataService._sort_index
+    assert "claim_date" in index.orders
+
+    def ids_between(start, end):
+        order = DataService.get_sort_order("claim_date")
+        claims = DataService.get_claims()
+        return claims["id"].take(order.key_range(pd.Timestamp(start).value, pd.Timestamp(end).value)).tolist()
+
+    assert ids_between("2023-12-01", "2024-01-31") == ["CLM-002", "CLM-001"]
+
+    DataService.update_claim_cache("CLM-004", {"claim_date": pd.Timestamp("2023-12-20")})
+    assert ids_between("2023-12-01", "2024-01-31") == ["CLM-002", "CLM-004", "CLM-001"]
+
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE claims SET claim_date = '2024-01-05' WHERE id = 'CLM-003'"))
+        conn.execute(text("INSERT INTO claims (id, status, claim_amount, claim_date) VALUES ('CLM-005', 'pending', 900.0, '2023-12-01')"))
+    assert DataService.refresh_delta() == {"updated": 1, "appended": 1, "reloaded": False}
+
+    # Carried over and patched, not rebuilt
+    assert DataService._sort_index is index
+    assert ids_between("2023-12-01", "2024-01-31") == ["CLM-005", "CLM-002", "CLM-004", "CLM-003", "CLM-001"]
+    engine.dispose()
@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import text
+
+from backend import database
+
+
+@pytest.fixture
+def sqlite_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    yield url
+    engine = database._engines.pop(url, None)
+    database._metrics.pop(url, None)
+    if engine is not None:
+        engine.dispose()
+
+
+def test_get_engine_is_shared_per_url(sqlite_url):
+    assert database.get_engine(sqlite_url) is database.get_engine(sqlite_url)
+
+
+def test_sqlite_connections_get_pragmas(sqlite_url):
+    with database.get_engine(sqlite_url).connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        # NORMAL
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+
+
+def test_pool_metrics_count_checkouts(sqlite_url):
+    assert database.pool_metrics(sqlite_url)["initialized"] is False
+
+    engine = database.get_engine(sqlite_url)
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    metrics = database.pool_metrics(sqlite_url)
+    assert metrics["checkouts"] == 3
+    assert metrics["checkins"] == 3
+    assert metrics["checked_out"] == 0
+    assert metrics["connects"] == 1
+    assert metrics["pool"] == "QueuePool"
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.services.db_writer import DatabaseWriter
+
+
+@pytest.fixture
+def claims_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE claims (id TEXT PRIMARY KEY, status TEXT)"))
+        conn.execute(
+            text("INSERT INTO claims (id, status) VALUES (:id, 'pending')"),
+            [{"id": f"CLM-{i:03d}"} for i in range(100)],
+        )
+    yield engine
+    engine.dispose()
+
+
+def _set_status(claim_id, status):
+    def apply(conn):
+        return conn.execute(
+            text("UPDATE claims SET status = :status WHERE id = :id"), {"status": status, "id": claim_id}
+        ).rowcount
+
+    return apply
+
+
+def test_concurrent_writes_all_commit_through_one_thread(claims_engine):
+    writer = DatabaseWriter(lambda: claims_engine, max_batch=16)
+    writer.start()
+    futures = []
+    futures_lock = threading.Lock()
+
+    def submit_range(start):
+        for i in range(start, start + 25):
+            future = writer.submit(_set_status(f"CLM-{i:03d}", "approved"))
+            with futures_lock:
+                futures.append(future)
+
+    threads = [threading.Thread(target=submit_range, args=(start,)) for start in (0, 25, 50, 75)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results = [future.result(timeout=10) for future in futures]
+    writer.stop()
+
+    assert results == [1] * 100
+    with claims_engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM claims WHERE status = 'approved'")).scalar() == 100
+    metrics = writer.metrics()
+    assert metrics["committed"] == 100
+    assert metrics["transactions"] <= 100
+    assert metrics["queue_depth"] == 0
+
+
+def test_failing_write_does_not_roll_back_its_batch(claims_engine):
+    writer = DatabaseWriter(lambda: claims_engine)
+    release = threading.Event()
+    writer.start()
+    # Hold the writer so the next three writes are committed as one batch
+    blocker = writer.submit(lambda conn: release.wait(5))
+    good = writer.submit(_set_status("CLM-001", "denied"))
+    bad = writer.submit(lambda conn: conn.execute(text("UPDATE missing_table SET x = 1")))
+    other = writer.submit(_set_status("CLM-002", "flagged"))
+    release.set()
+
+    assert blocker.result(timeout=10) is True
+    assert good.result(timeout=10) == 1
+    assert other.result(timeout=10) == 1
+    with pytest.raises(Exception):
+        bad.result(timeout=10)
+    writer.stop()
+
+    assert writer.metrics()["failed"] == 1
+
+
+def test_submit_requires_running_writer(claims_engine):
+    writer = DatabaseWriter(lambda: claims_engine)
+    with pytest.raises(RuntimeError):
+        writer.submit(_set_status("CLM-001", "denied"))
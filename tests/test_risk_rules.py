@@ -0,0 +1,133 @@
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from backend.services.data_service import DataService
+from backend.services.risk_rules import RiskRuleEngine, RiskRuleError, compile_rules
+
+
+def _rule(rule_id, field, op, value, weight, group=None, label=None):
+    return {
+        "id": rule_id,
+        "field": field,
+        "op": op,
+        "value": value,
+        "weight": weight,
+        "group": group,
+        "label": label,
+    }
+
+
+def test_grouped_rules_apply_first_match_only():
+    ruleset = compile_rules(
+        {
+            "rules": [
+                _rule("big", "claim_amount", "gt", 1000, 0.5, group="amount", label="Big"),
+                _rule("medium", "claim_amount", "gt", 100, 0.2, group="amount", label="Medium"),
+                _rule("flagged", "status", "eq", "flagged", 0.3, label="Flagged"),
+            ]
+        }
+    )
+    claims_df = pd.DataFrame(
+        [
+            {"claim_amount": 5000.0, "status": "flagged"},
+            {"claim_amount": 500.0, "status": "approved"},
+            {"claim_amount": 50.0, "status": None},
+        ]
+    )
+
+    scores, hits = ruleset.evaluate(claims_df, datetime.now(), {})
+
+    assert scores.tolist() == [0.8, 0.2, 0.0]
+    assert [ruleset.labels_for(int(mask)) for mask in hits] == [["Big", "Flagged"], ["Medium"], []]
+
+
+def test_not_in_reference_ignores_missing_values_and_empty_sets():
+    ruleset = compile_rules({"rules": [_rule("unknown", "provider_id", "not_in", "@providers", 0.2)]})
+    claims_df = pd.DataFrame({"provider_id": ["P1", "P2", None, ""]})
+
+    scores, _ = ruleset.evaluate(claims_df, datetime.now(), {"providers": frozenset({"P1"})})
+    assert scores.tolist() == [0.0, 0.2, 0.0, 0.0]
+
+    scores, _ = ruleset.evaluate(claims_df, datetime.now(), {"providers": frozenset()})
+    assert scores.tolist() == [0.0, 0.0, 0.0, 0.0]
+
+
+def test_where_clause_scopes_a_label_only_rule():
+    ruleset = compile_rules(
+        {
+            "rules": [
+                _rule("aging", "claim_age_days", "gt", 30, 0.3),
+                {
+                    **_rule("pending_aging", "claim_age_days", "gt", 30, 0, label="Pending > 30 days"),
+                    "where": [{"field": "status", "op": "eq", "value": "pending"}],
+                },
+            ]
+        }
+    )
+    claims_df = pd.DataFrame(
+        [
+            {"claim_date": "2024-01-01", "status": "pending"},
+            {"claim_date": "2024-01-01", "status": "approved"},
+            {"claim_date": "2024-03-01", "status": "pending"},
+        ]
+    )
+
+    scores, hits = ruleset.evaluate(claims_df, datetime(2024, 3, 10), {})
+
+    assert scores.tolist() == [0.3, 0.3, 0.0]
+    assert [ruleset.labels_for(int(mask)) for mask in hits] == [["Pending > 30 days"], [], []]
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        _rule("bad_op", "claim_amount", "between", 1, 0.1),
+        _rule("bad_value", "claim_amount", "gt", "lots", 0.1),
+        _rule("bad_age", "claim_age_days", "eq", 30, 0.1),
+        _rule("bad_reference", "provider_id", "not_in", "providers", 0.1),
+        {**_rule("bad_where", "status", "eq", "pending", 0.1), "where": [{"field": "claim_age_days", "op": "gt", "value": 30}]},
+    ],
+)
+def test_compile_rules_rejects_invalid_rules(rule):
+    with pytest.raises(RiskRuleError):
+        compile_rules({"rules": [rule]})
+
+
+def test_rule_file_hot_reload_rescores_cache(monkeypatch, tmp_path):
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps({"rules": [_rule("pending", "status", "eq", "pending", 0.5)]}))
+
+    monkeypatch.setattr(RiskRuleEngine, "_ruleset", None)
+    monkeypatch.setattr(RiskRuleEngine, "_mtime_ns", None)
+    monkeypatch.setattr(RiskRuleEngine, "_path", str(rules_path))
+
+    scores = DataService.get_claims().set_index("id")["risk_score"]
+    assert scores["CLM-002"] == 0.5
+    assert scores["CLM-001"] == 0.0
+
+    rules_path.write_text(json.dumps({"rules": [_rule("approved", "status", "eq", "approved", 0.25)]}))
+    stat = os.stat(rules_path)
+    os.utime(rules_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    scores = DataService.get_claims().set_index("id")["risk_score"]
+    assert scores["CLM-002"] == 0.0
+    assert scores["CLM-001"] == 0.25
+
+
+def test_invalid_rule_file_keeps_previous_rules(monkeypatch, tmp_path):
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps({"rules": [_rule("pending", "status", "eq", "pending", 0.5)]}))
+    monkeypatch.setattr(RiskRuleEngine, "_ruleset", None)
+    monkeypatch.setattr(RiskRuleEngine, "_mtime_ns", None)
+    monkeypatch.setattr(RiskRuleEngine, "_path", str(rules_path))
+    ruleset = RiskRuleEngine.get_ruleset()
+
+    rules_path.write_text("{not json")
+    stat = os.stat(rules_path)
+    os.utime(rules_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert RiskRuleEngine.get_ruleset() is ruleset
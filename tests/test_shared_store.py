@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.services.data_service import DataService
+from backend.services.shared_store import SharedClaimsStore
+
+
+@pytest.fixture
+def shared_store(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}")
+    monkeypatch.setattr("backend.services.data_service.get_engine", lambda: engine)
+    monkeypatch.setattr(DataService, "_snapshot_file", None)
+    monkeypatch.setattr(DataService, "_snapshot_file_current", False)
+    monkeypatch.setattr(DataService, "_change_tracking", False)
+    monkeypatch.setattr(DataService, "_delta_watermark", None)
+    DataService.start_shared_store(str(tmp_path / "store"))
+    yield engine
+    DataService._shared_store = None
+    DataService._shared_version = 0
+    engine.dispose()
+
+
+def test_publish_attach_and_lock(tmp_path):
+    store = SharedClaimsStore(str(tmp_path / "store"))
+    other = SharedClaimsStore(str(tmp_path / "store"))
+    assert store.attach() is None
+
+    with store.lock():
+        with other.lock(blocking=False) as acquired:
+            assert acquired is False
+        for amount in (1.0, 2.0, 3.0):
+            version = store.publish(pd.DataFrame({"claim_amount": [amount]}), {"rows": 1})
+
+    assert version == 3
+    attached_version, df, fingerprint = other.attach()
+    assert attached_version == 3
+    assert df["claim_amount"].tolist() == [3.0]
+    assert fingerprint == {"rows": 1}
+    assert sorted(path.name for path in (tmp_path / "store").glob("claims-*")) == [
+        "claims-00000002.snapshot",
+        "claims-00000003.snapshot",
+    ]
+
+
+def test_workers_attach_and_pick_up_writes(shared_store, sample_claims_df):
+    sample_claims_df.to_sql("claims", shared_store, index=False)
+
+    DataService.load_claims_from_db()
+    assert DataService._shared_version == 1
+    # A second load with an unchanged table attaches instead of republishing
+    DataService.load_claims_from_db()
+    assert DataService._shared_version == 1
+    assert not DataService.sync_shared_store()
+
+    DataService.run_write(lambda conn: conn.execute(text("UPDATE claims SET status = 'denied' WHERE id = 'CLM-002'")))
+    assert DataService._shared_store.is_dirty()
+    assert DataService.sync_shared_store()
+
+    # Folded in as a delta; the shared version is not rewritten
+    assert DataService._shared_version == 1
+    assert not DataService._shared_store.is_dirty()
+    claims = DataService.get_claims().set_index("id")
+    assert claims.loc["CLM-002", "status"] == "denied"
+    assert not DataService.sync_shared_store()
+
+
+def test_large_or_deleting_deltas_republish(shared_store, sample_claims_df, monkeypatch):
+    sample_claims_df.to_sql("claims", shared_store, index=False)
+    DataService.load_claims_from_db()
+    monkeypatch.setattr("backend.services.data_service.SHARED_CLAIMS_MAX_DELTA_ROWS", 1)
+
+    DataService.run_write(lambda conn: conn.execute(text("UPDATE claims SET status = 'denied' WHERE id = 'CLM-001'")))
+    assert DataService.sync_shared_store()
+    assert DataService._shared_version == 1
+
+    DataService.run_write(lambda conn: conn.execute(text("UPDATE claims SET status = 'denied' WHERE id = 'CLM-003'")))
+    assert DataService.sync_shared_store()
+    assert DataService._shared_version == 2
+
+    DataService.run_write(lambda conn: conn.execute(text("DELETE FROM claims WHERE id = 'CLM-004'")))
+    assert DataService.sync_shared_store()
+    assert DataService._shared_version == 3
+    claims = DataService.get_claims().set_index("id")
+    assert sorted(claims.index) == ["CLM-001", "CLM-002", "CLM-003"]
+    assert (claims.loc[["CLM-001", "CLM-003"], "status"] == "denied").all()
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from backend.services.data_service import DataService
+from backend.services.snapshot_file import SnapshotFormatError, read_fingerprint, read_snapshot, write_snapshot
+
+
+def test_snapshot_round_trips_typed_claims(tmp_path, sample_claims_df):
+    raw = sample_claims_df.copy()
+    raw["patient_age"] = [34.0, None, 61.0, 47.0]
+    raw.loc[1, "provider_id"] = None
+    raw.loc[2, "id"] = "CLM-00ß"
+    typed = DataService.optimize_claim_dtypes(DataService._ensure_claim_columns(raw))
+    path = str(tmp_path / "claims.snapshot")
+
+    write_snapshot(path, typed, {"rows": 4})
+    loaded, fingerprint = read_snapshot(path)
+
+    assert fingerprint == {"rows": 4}
+    assert read_fingerprint(path) == {"rows": 4}
+    pd.testing.assert_frame_equal(loaded, typed)
+    # Fixed-width columns are views of the mapped file, not copies
+    assert not loaded["claim_amount"].to_numpy().flags.writeable
+
+
+def test_snapshot_rejects_unsupported_values(tmp_path):
+    path = str(tmp_path / "claims.snapshot")
+    with pytest.raises(SnapshotFormatError):
+        write_snapshot(path, pd.DataFrame({"codes": [["A1"], ["B2"]]}), {})
+
+    with open(path, "wb") as handle:
+        handle.write(b"not a snapshot")
+    assert read_fingerprint(path) is None
+    with pytest.raises(SnapshotFormatError):
+        read_snapshot(path)
@@ -0,0 +1,132 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.services.write_behind import WriteBehindQueue
+
+
+@pytest.fixture
+def claims_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE claims (id TEXT PRIMARY KEY, status TEXT, processor_notes TEXT)"))
+        conn.execute(
+            text("INSERT INTO claims (id, status) VALUES (:id, 'pending')"),
+            [{"id": f"CLM-{i:03d}"} for i in range(1, 4)],
+        )
+    yield engine
+    engine.dispose()
+
+
+def _rows(engine):
+    with engine.connect() as conn:
+        return {row.id: (row.status, row.processor_notes) for row in conn.execute(text("SELECT * FROM claims"))}
+
+
+def test_updates_are_coalesced_and_flushed_in_one_batch(tmp_path, claims_engine):
+    queue = WriteBehindQueue(lambda: claims_engine, str(tmp_path / "writes.journal"), interval=3600)
+    queue.start()
+    queue.enqueue("CLM-001", {"status": "flagged"})
+    queue.enqueue("CLM-001", {"status": "approved", "processor_notes": "ok"})
+    queue.enqueue("CLM-002", {"status": "denied"})
+
+    assert queue.metrics()["queue_depth"] == 2
+    assert _rows(claims_engine)["CLM-001"] == ("pending", None)
+
+    assert queue.flush() == 2
+    metrics = queue.metrics()
+    queue.stop()
+
+    assert _rows(claims_engine) == {
+        "CLM-001": ("approved", "ok"),
+        "CLM-002": ("denied", None),
+        "CLM-003": ("pending", None),
+    }
+    assert metrics["enqueued"] == 3
+    assert metrics["coalesced"] == 1
+    assert metrics["flushes"] == 1
+    assert metrics["queue_depth"] == 0
+    assert metrics["journal_segments"] == 0
+
+
+def test_journal_replays_unflushed_updates_after_crash(tmp_path, claims_engine):
+    journal_path = str(tmp_path / "writes.journal")
+    crashed = WriteBehindQueue(lambda: claims_engine, journal_path, interval=3600)
+    crashed.start()
+    crashed.enqueue("CLM-003", {"status": "flagged"})
+    # Simulate a crash: the flush thread dies and nothing is written
+    crashed._stop.set()
+    crashed._wake.set()
+    crashed._thread.join()
+
+    restarted = WriteBehindQueue(lambda: claims_engine, journal_path, interval=3600)
+    assert restarted.start() == 1
+    restarted.stop()
+
+    assert _rows(claims_engine)["CLM-003"] == ("flagged", None)
+
+
+def test_failed_flush_keeps_updates_queued(tmp_path, claims_engine):
+    engines = {"current": None}
+    queue = WriteBehindQueue(lambda: engines["current"], str(tmp_path / "writes.journal"), interval=3600)
+    queue.start()
+    queue.enqueue("CLM-002", {"status": "flagged"})
+
+    assert queue.flush() == 0
+    queue.enqueue("CLM-002", {"processor_notes": "later"})
+    engines["current"] = claims_engine
+    assert queue.flush() == 1
+    metrics = queue.metrics()
+    queue.stop()
+
+    assert _rows(claims_engine)["CLM-002"] == ("flagged", "later")
+    assert metrics["failed_flushes"] == 1
+    assert metrics["journal_segments"] == 0
+
+
+def test_unwritable_update_does_not_block_the_batch(tmp_path, claims_engine):
+    queue = WriteBehindQueue(lambda: claims_engine, str(tmp_path / "writes.journal"), interval=3600)
+    queue.start()
+
+    assert queue.accepts({"status": "denied", "processor_notes": "x"})
+    assert not queue.accepts({"no_such_column": 1})
+
+    queue.enqueue("CLM-001", {"status": "denied"})
+    queue.enqueue("CLM-002", {"no_such_column": 1})
+    assert queue.flush() == 1
+    metrics = queue.metrics()
+    queue.stop()
+
+    assert _rows(claims_engine)["CLM-001"] == ("denied", None)
+    assert metrics["queue_depth"] == 1
+    # The failed update was carried into the live journal, so no segment is pinned
+    assert metrics["journal_segments"] == 0
+
+
+def test_update_that_keeps_failing_is_dead_lettered(tmp_path, claims_engine):
+    journal_path = str(tmp_path / "writes.journal")
+    queue = WriteBehindQueue(lambda: claims_engine, journal_path, interval=3600, max_attempts=2)
+    queue.start()
+    queue.enqueue("CLM-001", {"status": "denied"})
+    queue.enqueue("CLM-002", {"no_such_column": 1})
+    assert queue.flush() == 1
+    queue.enqueue("CLM-003", {"status": "flagged"})
+    assert queue.flush() == 1
+    metrics = queue.metrics()
+    queue.stop()
+
+    assert metrics["queue_depth"] == 0
+    assert metrics["dead_lettered"] == 1
+    assert metrics["journal_segments"] == 0
+    with open(f"{journal_path}.dead", encoding="utf-8") as handle:
+        dead = [json.loads(line) for line in handle]
+    assert [(entry["id"], entry["updates"]) for entry in dead] == [("CLM-002", {"no_such_column": 1})]
+
+    # Neither the dead letter nor the updates already written are replayed
+    with claims_engine.begin() as conn:
+        conn.execute(text("UPDATE claims SET status = 'approved' WHERE id = 'CLM-001'"))
+    restarted = WriteBehindQueue(lambda: claims_engine, journal_path, interval=3600)
+    assert restarted.start() == 0
+    restarted.stop()
+    assert _rows(claims_engine)["CLM-001"] == ("approved", None)